@@ -0,0 +1,37 @@
+
+import numpy as np
+
+from flutterpy.buffeting import BuffetingSolver, von_karman_spectra
+from flutterpy.structure import StructuralModel
+from .generators import known_derivatives
+
+
+class BuffetingResponse():
+
+    # Multi-mode buffeting analysis of a 20-mode span with 100 points
+    params = ([100, 1000, 4000],)
+    param_names = ['n_frequencies']
+    size_param = 'n_frequencies'
+
+    def setup(self, n_frequencies):
+
+        n_points, n_modes = 100, 20
+        positions = np.linspace(0, 1000, n_points)
+        mode_shapes = np.zeros((n_points, 3, n_modes))
+        for mode in range(n_modes):
+            mode_shapes[:,mode % 3,mode] = np.sin((mode//3 + 1)*np.pi*positions/1000)
+        self.structure = StructuralModel(np.full(n_modes, 1e6), np.linspace(0.1, 2, n_modes),
+            np.full(n_modes, 0.005), mode_shapes, np.full(n_points, 10.0), positions)
+
+        derivatives = {deriv: (lambda Ured, value=value: value*Ured) for deriv, value in known_derivatives().items()}
+        self.solver = BuffetingSolver(derivatives, 20.0, 1.25, {'C_D': 0.1, 'C_L': 0.2, 'dC_L': 4.0, 'dC_M': 1.0},
+            von_karman_spectra((0.1, 0.05), (100.0, 30.0)))
+        self.frequencies = np.linspace(0.01, 3, n_frequencies)
+
+    def time_solve(self, n_frequencies):
+
+        self.solver.solve(self.structure, 30.0, self.frequencies)
+
+    def peakmem_solve(self, n_frequencies):
+
+        self.solver.solve(self.structure, 30.0, self.frequencies)
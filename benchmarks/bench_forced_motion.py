@@ -0,0 +1,29 @@
+
+import numpy as np
+
+from flutterpy.derivatives import FlutterDerivatives
+from .generators import sample_sizes, sim_params, frequency, synthetic_forced_motion
+
+
+class CalculateDerivativesFromForcedMotion():
+
+    # Derivatives of one run (one motion and three forces)
+    params = (sample_sizes, ['fixed', 'free'])
+    param_names = ['n_samples', 'omega']
+    size_param = 'n_samples'
+
+    def setup(self, n_samples, omega):
+
+        self.data = synthetic_forced_motion('pitch', n_samples)
+        if omega == 'fixed':
+            self.data['omega'] = 2*np.pi*frequency
+
+    def time_calculate(self, n_samples, omega):
+
+        fd = FlutterDerivatives()
+        fd.calculate_derivatives_from_forced_motion(**sim_params, **self.data)
+
+    def peakmem_calculate(self, n_samples, omega):
+
+        fd = FlutterDerivatives()
+        fd.calculate_derivatives_from_forced_motion(**sim_params, **self.data)
@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from flutterpy.derivatives import FlutterDerivatives, Campaign, read_table
+from .generators import sim_params, frequency, synthetic_forced_motion
+
+
+class ReadForceTable():
+
+    # Parsing of an OpenFOAM-like forces.dat (time and 9 force components)
+    params = ([10**4, 10**6],)
+    param_names = ['n_samples']
+    size_param = 'n_samples'
+
+    def setup(self, n_samples):
+
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'forces.dat')
+        data = np.random.default_rng(0).standard_normal((n_samples, 10))
+        np.savetxt(self.path, data, header='Time ' + ' '.join('f' + str(i) for i in range(9)), fmt='%.9e')
+
+    def teardown(self, n_samples):
+
+        shutil.rmtree(self.folder)
+
+    def time_read(self, n_samples):
+
+        read_table(self.path, {'lift': 'f1', 'moment': 'f5', 'drag': 'f0'}, format='openfoam')
+
+
+class ProcessCampaign():
+
+    # Derivatives of a sweep of 8 runs stored as text files, with the next
+    # run read in the background while the current one is fitted
+    params = ([10**4, 10**5],)
+    param_names = ['n_samples']
+    size_param = 'n_samples'
+
+    def setup(self, n_samples):
+
+        self.folder = tempfile.mkdtemp()
+        columns = ['pitch', 'lift', 'moment', 'drag']
+        for run in range(8):
+            run_path = os.path.join(self.folder, 'run' + str(run))
+            os.makedirs(run_path)
+            data = synthetic_forced_motion('pitch', n_samples, seed=run)
+            np.savetxt(os.path.join(run_path, 'data.csv'), np.column_stack([data[name] for name in columns]),
+                delimiter=',', header=','.join(columns), comments='', fmt='%.9e')
+        self.campaign = Campaign(self.folder, {'data.csv': {name: name for name in columns}},
+            parameters=dict(sim_params, omega=2*np.pi*frequency))
+
+    def teardown(self, n_samples):
+
+        shutil.rmtree(self.folder)
+
+    def time_process(self, n_samples):
+
+        fd = FlutterDerivatives()
+        fd.calculate_derivatives_from_campaign(self.campaign)
@@ -0,0 +1,47 @@
+
+from flutterpy.derivatives import available_notations, complex2real_notation
+from .generators import Ured_sizes, synthetic_base_derivatives, synthetic_complex_derivatives
+
+
+class NotationConvert():
+
+    # Conversion of the base derivatives into each notation
+    params = (Ured_sizes, list(available_notations))
+    param_names = ['n_Ured', 'notation']
+    size_param = 'n_Ured'
+
+    def setup(self, n_Ured, notation):
+
+        self.fd_data = synthetic_base_derivatives(n_Ured)
+        self.notation = available_notations[notation]
+
+        # Exclude one-time loading costs from the measurements
+        self.notation.convert(synthetic_base_derivatives(2))
+
+    def time_convert(self, n_Ured, notation):
+
+        self.notation.convert(self.fd_data)
+
+    def peakmem_convert(self, n_Ured, notation):
+
+        self.notation.convert(self.fd_data)
+
+
+class Complex2RealNotation():
+
+    # Conversion of complex (c_xy) derivatives into real ones
+    params = (Ured_sizes,)
+    param_names = ['n_Ured']
+    size_param = 'n_Ured'
+
+    def setup(self, n_Ured):
+
+        self.fd_complex = synthetic_complex_derivatives(n_Ured)
+
+    def time_complex2real(self, n_Ured):
+
+        complex2real_notation(self.fd_complex)
+
+    def peakmem_complex2real(self, n_Ured):
+
+        complex2real_notation(self.fd_complex)
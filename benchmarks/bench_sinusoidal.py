@@ -0,0 +1,49 @@
+
+import numpy as np
+
+import flutterpy.derivatives.sinusoidal_utilities as util
+from .generators import sample_sizes, sim_params, frequency, synthetic_forced_motion
+
+
+class ExtractSinusoidalParameters():
+
+    # Sinusoidal fit of a motion time series, with known (fixed) or
+    # estimated (free) frequency
+    params = (sample_sizes, ['fixed', 'free'])
+    param_names = ['n_samples', 'omega']
+    size_param = 'n_samples'
+
+    def setup(self, n_samples, omega):
+
+        self.time = np.arange(n_samples)*sim_params['delta_t']
+        self.motion = synthetic_forced_motion('heave', n_samples)['heave']
+        self.omega = 2*np.pi*frequency if omega == 'fixed' else None
+
+    def time_extract(self, n_samples, omega):
+
+        util.extract_sinusoidal_parameters(self.time, self.motion, omega=self.omega)
+
+    def peakmem_extract(self, n_samples, omega):
+
+        util.extract_sinusoidal_parameters(self.time, self.motion, omega=self.omega)
+
+
+class GuessFrequency():
+
+    # Estimation of the main frequency of a time series
+    params = (sample_sizes,)
+    param_names = ['n_samples']
+    size_param = 'n_samples'
+
+    def setup(self, n_samples):
+
+        self.time = np.arange(n_samples)*sim_params['delta_t']
+        self.motion = synthetic_forced_motion('heave', n_samples)['heave']
+
+    def time_guess(self, n_samples):
+
+        util.GuessFrequency(self.time, self.motion)
+
+    def peakmem_guess(self, n_samples):
+
+        util.GuessFrequency(self.time, self.motion)
@@ -0,0 +1,72 @@
+
+import os
+import numpy as np
+
+
+# Problem sizes of the benchmarks. The largest ones (10^8 samples, 10^5 Ured
+# points) need several GB of memory and are only used when the environment
+# variable FLUTTERPY_BENCHMARK_LARGE is set.
+large = bool(os.environ.get('FLUTTERPY_BENCHMARK_LARGE'))
+sample_sizes = [10**3, 10**5, 10**7] + ([10**8] if large else [])
+Ured_sizes = [10, 10**3] + ([10**5] if large else [10**4])
+
+# Simulation parameters shared by the synthetic runs
+sim_params = {'U': 12.0, 'B': 0.5, 'delta_t': 0.002, 'fluid_dens': 1.2}
+frequency = 2.5
+
+
+def known_derivatives():
+
+    # Base derivatives with known (arbitrary, different) values
+    return {letter+str(number): (number - 3.5)*(1 + 'dlm'.index(letter))
+        for letter in 'dlm' for number in range(1,7)}
+
+
+def synthetic_forced_motion(m_name, n_samples, derivs=None, omega=2*np.pi*frequency,
+    ampl=0.1, phase=0.3, noise=0.01, seed=0, offset=0.0, **params):
+
+    # Forced motion time series with forces built from known base derivatives:
+    # force = 0.5*dens*U^2*B*f1*f2 * (d_0*motion'/U + d_1*motion/B) + offset
+    # The simulation parameters (U, B, fluid_dens, delta_t) not given in
+    # **params are the shared ones. Also used by the tests.
+    if derivs is None:
+        derivs = known_derivatives()
+    params = dict(sim_params, **params)
+    U, B, fluid_dens = params['U'], params['B'], params['fluid_dens']
+
+    rng = np.random.default_rng(seed)
+    time = np.arange(n_samples)*params['delta_t']
+    motion = ampl*np.sin(omega*time + phase)
+    motion_dot = ampl*omega*np.cos(omega*time + phase)
+
+    numbers = {'heave':(3,4), 'pitch':(5,6), 'sway':(1,2)}[m_name]
+    data = {m_name: motion}
+    for f_name, letter in [('lift','l'), ('moment','m'), ('drag','d')]:
+        f1 = B if m_name == 'pitch' else 1
+        f2 = B if f_name == 'moment' else 1
+        d_0 = derivs[letter+str(numbers[0])]
+        d_1 = derivs[letter+str(numbers[1])]
+        force = 0.5*fluid_dens*U**2*B*f1*f2 * (d_0*motion_dot/U + d_1*motion/B)
+        data[f_name] = force + offset + noise*rng.standard_normal(n_samples)
+
+    return data
+
+
+def synthetic_base_derivatives(n_Ured, seed=0):
+
+    # Base derivatives (fd_data format) on n_Ured reduced velocities
+    rng = np.random.default_rng(seed)
+    Ured = np.linspace(1, 20, n_Ured)
+
+    return {deriv: {'values': value*Ured/10 + 0.01*rng.standard_normal(n_Ured), 'Ured': Ured}
+        for deriv, value in known_derivatives().items()}
+
+
+def synthetic_complex_derivatives(n_Ured, seed=0):
+
+    # Complex derivatives (all the c_xy coefficients) on n_Ured reduced frequencies
+    rng = np.random.default_rng(seed)
+    k = np.linspace(0.1, 2, n_Ured)
+
+    return {'c_'+pair: {'values': rng.standard_normal(n_Ured) + 1j*rng.standard_normal(n_Ured), 'k': k}
+        for pair in ['hh', 'ha', 'hp', 'ah', 'aa', 'ap', 'ph', 'pa', 'pp']}
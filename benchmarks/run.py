@@ -0,0 +1,108 @@
+
+import argparse
+import importlib
+import itertools
+import json
+import time
+import tracemalloc
+import warnings
+
+
+# Standalone runner of the benchmarks (they can also be run with asv).
+# For each benchmark and combination of parameters it reports the best
+# time of several repetitions, the throughput (problem size per second)
+# and the peak memory allocated during one call (measured with tracemalloc).
+#   python -m benchmarks.run [-k filter] [--repeat N] [--max-size N] [--json file]
+benchmark_modules = ['bench_sinusoidal', 'bench_forced_motion', 'bench_notation', 'bench_buffeting',
+    'bench_ingestion']
+
+
+def get_benchmark_classes():
+
+    classes = []
+    for module_name in benchmark_modules:
+        module = importlib.import_module('benchmarks.' + module_name)
+        for name, value in vars(module).items():
+            if isinstance(value, type) and value.__module__ == module.__name__ and hasattr(value, 'params'):
+                classes.append(value)
+
+    return classes
+
+
+def run_benchmark(benchmark_class, method_name, params, repeat):
+
+    benchmark = benchmark_class()
+    benchmark.setup(*params)
+    method = getattr(benchmark, method_name)
+
+    # Warm-up call (lazy imports, caches), ignoring the warnings of the package
+    warnings.simplefilter('ignore')
+    method(*params)
+
+    # Best time of several repetitions
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        method(*params)
+        times.append(time.perf_counter() - start)
+
+    # Peak memory of a single call, on top of the memory allocated in setup
+    tracemalloc.start()
+    method(*params)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # Clean-up (e.g. temporary files), as in asv
+    if hasattr(benchmark, 'teardown'):
+        benchmark.teardown(*params)
+
+    return min(times), peak_memory
+
+
+def run_all(keyword=None, repeat=3, max_size=None):
+
+    results = []
+    for benchmark_class in get_benchmark_classes():
+        for method_name in sorted(dir(benchmark_class)):
+            if not method_name.startswith('time_'):
+                continue
+            full_name = benchmark_class.__name__ + '.' + method_name
+            if keyword is not None and keyword not in full_name:
+                continue
+
+            for params in itertools.product(*benchmark_class.params):
+                param_values = dict(zip(benchmark_class.param_names, params))
+                size = param_values[benchmark_class.size_param]
+                if max_size is not None and size > max_size:
+                    continue
+
+                best_time, peak_memory = run_benchmark(benchmark_class, method_name, params, repeat)
+                result = {'benchmark': full_name, 'params': param_values, 'time': best_time,
+                    'throughput': size/best_time, 'peak_memory': peak_memory}
+                results.append(result)
+                print_result(result)
+
+    return results
+
+
+def print_result(result):
+
+    params = ', '.join(key + '=' + str(value) for key, value in result['params'].items())
+    print('{:<55} {:<35} {:>10.4g} s {:>12.4g} /s {:>10.2f} MB'.format(result['benchmark'],
+        params, result['time'], result['throughput'], result['peak_memory']/2**20))
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Run the flutterpy benchmarks.')
+    parser.add_argument('-k', dest='keyword', default=None, help='only run benchmarks whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed repetitions')
+    parser.add_argument('--max-size', type=int, default=None, help='skip problem sizes larger than this')
+    parser.add_argument('--json', default=None, help='file to save the results')
+    args = parser.parse_args()
+
+    results = run_all(args.keyword, args.repeat, args.max_size)
+
+    if args.json is not None:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
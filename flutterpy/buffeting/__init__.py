@@ -0,0 +1,2 @@
+
+from flutterpy.buffeting.buffeting_response import *
@@ -0,0 +1,168 @@
+
+import numpy as np
+
+from flutterpy.derivatives.aerodynamic_matrices import derivative_matrices, interpolated_derivative_functions
+
+
+# Static coefficients of the section (missing ones are zero): drag, lift and
+# moment coefficients referred to B and their slopes with the angle of attack
+static_coefficient_names = ['C_D', 'C_L', 'C_M', 'dC_D', 'dC_L', 'dC_M']
+
+
+# Spectral (frequency domain) buffeting analysis of a structure in
+# turbulent wind. The quasi-steady buffeting forces per unit length,
+#   F_b = 0.5*dens*U^2 * A * [u, w]/U,
+# with F = [lift, moment, drag] and u, w the along-wind and vertical
+# turbulence, are integrated over the modes with the spatial coherence
+#   coh(dx, f) = exp(-decay*f*dx/U)
+# to give the cross-spectral matrix of the modal forces S_Q(f). The modal
+# response is S_q(f) = H(f)*S_Q(f)*H(f)^H, with the aeroelastic frequency
+# response H = (-omega^2*M + i*omega*(C - C_ae) + K - K_ae)^-1, where the
+# self-excited forces use the derivatives at Ured = U/(f*B). All the
+# frequencies are processed at once (broadcast assembly and batched solves).
+class BuffetingSolver():
+
+    def __init__(self, derivatives, B, fluid_dens, static_coefficients, wind_spectra,
+        coherence_decay=(10.0, 6.5), admittance=None):
+
+        # The derivatives are given as in FlutterSolver. wind_spectra is a
+        # function (frequencies, U) -> (S_u, S_w) with the one-sided spectra
+        # of the turbulence components (see von_karman_spectra). The optional
+        # aerodynamic admittance is a function of the reduced frequency
+        # K = 2*pi*f*B/U giving factors broadcastable to (..., 3, 2).
+        if hasattr(derivatives, 'fd_data'):
+            derivatives = interpolated_derivative_functions(derivatives.fd_data)
+
+        unknown = [name for name in static_coefficients if name not in static_coefficient_names]
+        if len(unknown) > 0:
+            msg = 'Unknown static coefficients: ' + str(unknown)[1:-1] + '. '
+            msg += 'They should be among the following: ' + str(static_coefficient_names)[1:-1] + '.'
+            raise Exception(msg)
+
+        self.derivative_functions = derivatives
+        self.B = B
+        self.fluid_dens = fluid_dens
+        self.static_coefficients = {name: static_coefficients.get(name, 0.0) for name in static_coefficient_names}
+        self.wind_spectra = wind_spectra
+        self.coherence_decay = np.asarray(coherence_decay, dtype=np.float64)
+        self.admittance = admittance
+
+        # Buffeting load matrix A (rows: lift, moment, drag; columns: u, w)
+        c = self.static_coefficients
+        self.load_matrix = np.array([
+            [2*c['C_L']*B, (c['dC_L'] + c['C_D'])*B],
+            [2*c['C_M']*B**2, c['dC_M']*B**2],
+            [2*c['C_D']*B, (c['dC_D'] - c['C_L'])*B]])
+
+
+    def solve(self, structure, U, frequencies, max_chunk_memory=2**27):
+
+        # Buffeting response at the mean wind speed U for the frequencies (Hz).
+        # Returns a dictionary with the frequencies, the frequency response
+        # H (n_f, modes, modes), the cross-spectral matrices of the modal
+        # forces and responses, the auto spectra of the heave, pitch and sway
+        # responses at the points of the structure (n_f, points, 3) and their
+        # standard deviations (points, 3), integrated over the frequencies.
+        frequencies = np.asarray(frequencies, dtype=np.float64)
+        if np.any(frequencies <= 0):
+            raise Exception('The frequencies must be positive.')
+
+        frequency_response = self.frequency_response(structure, U, frequencies)
+        force_spectra = self.modal_force_spectra(structure, U, frequencies, max_chunk_memory)
+        response_spectra = frequency_response @ force_spectra @ np.conj(np.swapaxes(frequency_response, -1, -2))
+
+        # Auto spectra at the points: diagonal of phi*S_q*phi^T
+        point_spectra = np.einsum('pim,fmn,pin->fpi', structure.mode_shapes, response_spectra.real,
+            structure.mode_shapes, optimize=True)
+
+        return {'U': U, 'frequencies': frequencies, 'frequency_response': frequency_response,
+            'modal_force_spectra': force_spectra, 'modal_response_spectra': response_spectra,
+            'modal_std': np.sqrt(_integrate(np.einsum('fmm->fm', response_spectra.real), frequencies)),
+            'response_spectra': point_spectra, 'std': np.sqrt(_integrate(point_spectra, frequencies))}
+
+
+    def frequency_response(self, structure, U, frequencies):
+
+        # Aeroelastic frequency response of the modes (n_f, modes, modes),
+        # assembled for all the frequencies at once
+        omega = 2*np.pi*frequencies[:,np.newaxis,np.newaxis]
+        Ured = U/(frequencies*self.B)
+        values = {deriv: function(Ured) for deriv, function in self.derivative_functions.items()}
+        if len(values) > 0:
+            velocity, displacement = derivative_matrices(values, self.B)
+        else:
+            velocity = displacement = np.zeros((len(frequencies), 3, 3))
+
+        mass_matrix, damping_matrix, stiffness_matrix = structure.get_matrices()
+        velocity_modal = np.einsum('fij,ijkl->fkl', velocity, structure.modal_integrals)
+        displacement_modal = np.einsum('fij,ijkl->fkl', displacement, structure.modal_integrals)
+        pressure = 0.5*self.fluid_dens*U**2
+
+        impedance = (-omega**2*mass_matrix + 1j*omega*(damping_matrix - pressure*self.B/U*velocity_modal)
+            + stiffness_matrix - pressure*displacement_modal)
+        identity = np.broadcast_to(np.eye(structure.n_modes, dtype=np.complex128), impedance.shape)
+
+        return np.linalg.solve(impedance, identity)
+
+
+    def modal_force_spectra(self, structure, U, frequencies, max_chunk_memory=2**27):
+
+        # Cross-spectral matrices of the modal buffeting forces (n_f, modes, modes).
+        # The distances between points and the modal load vectors are computed
+        # once; the coherence matrices are built by chunks of frequencies so
+        # their memory stays below max_chunk_memory (bytes).
+        spectra = np.column_stack(self.wind_spectra(frequencies, U))
+        distances = np.abs(structure.positions[:,np.newaxis] - structure.positions)
+        n_points = len(distances)
+
+        # Load vectors of each point, mode and turbulence component:
+        # weight * phi^T * A, with shape (points, modes, 2)
+        # (with the admittance, the sum over the forces is done by chunks)
+        force_loads = np.einsum('p,pim,ic->pmic', structure.weights, structure.mode_shapes, self.load_matrix)
+        loads = force_loads.sum(axis=2)
+        if self.admittance is not None:
+            admittance = np.broadcast_to(self.admittance(2*np.pi*frequencies*self.B/U),
+                (len(frequencies), 3, 2))
+
+        chunk_size = max(1, int(max_chunk_memory // (8*n_points**2)))
+        force_spectra = np.zeros((len(frequencies), structure.n_modes, structure.n_modes))
+        for first in range(0, len(frequencies), chunk_size):
+            chunk = slice(first, first + chunk_size)
+            for component in range(2):
+                coherence = np.multiply(frequencies[chunk,np.newaxis,np.newaxis], -self.coherence_decay[component]/U*distances)
+                np.exp(coherence, out=coherence)
+                if self.admittance is None:
+                    component_loads = loads[:,:,component]
+                    spectrum = np.swapaxes(component_loads, 0, 1) @ coherence @ component_loads
+                else:
+                    component_loads = np.einsum('pmi,fi->fpm', force_loads[...,component], admittance[chunk,:,component])
+                    spectrum = np.swapaxes(component_loads, 1, 2) @ coherence @ component_loads
+                force_spectra[chunk] += spectra[chunk,component,np.newaxis,np.newaxis]*spectrum
+
+        return (0.5*self.fluid_dens*U)**2*force_spectra
+
+
+def von_karman_spectra(intensities, length_scales):
+
+    # Von Karman spectra of the along-wind (u) and vertical (w) turbulence,
+    # with the turbulence intensities and integral length scales (m) of
+    # each component. Returns a function (frequencies, U) -> (S_u, S_w).
+    def spectra(frequencies, U):
+        S = []
+        for component, (intensity, length_scale) in enumerate(zip(intensities, length_scales)):
+            variance = (intensity*U)**2
+            reduced_frequency = frequencies*length_scale/U
+            if component == 0:
+                shape = 4/(1 + 70.8*reduced_frequency**2)**(5/6)
+            else:
+                shape = 4*(1 + 755.2*reduced_frequency**2)/(1 + 283.2*reduced_frequency**2)**(11/6)
+            S.append(variance*length_scale/U*shape)
+        return S[0], S[1]
+
+    return spectra
+
+
+def _integrate(spectra, frequencies):
+
+    # Trapezoidal integration over the first axis
+    return np.sum(0.5*(spectra[1:] + spectra[:-1])*np.diff(frequencies).reshape((-1,) + (1,)*(spectra.ndim-1)), axis=0)
@@ -0,0 +1,2 @@
+
+from flutterpy.criticalspeed.critical_speed import *
@@ -0,0 +1,193 @@
+
+import numpy as np
+import warnings
+
+from flutterpy.derivatives.aerodynamic_matrices import derivative_matrices, interpolated_derivative_functions
+
+
+# Solver of the flutter eigenvalue problem (p-k method).
+# For each wind speed U and reduced velocity Ured the aeroelastic system
+#   M*q'' + (C - C_ae(Ured))*q' + (K - K_ae(Ured))*q = 0
+# is written in state-space form and its eigenvalues are calculated, all
+# the (U, Ured) combinations at once. For each mode, the solution is the
+# Ured whose frequency matches the one of the eigenvalue, and flutter
+# appears when the real part of that eigenvalue becomes positive.
+# The derivatives are evaluated once on the Ured grid, so the same solver
+# can be reused for many structures (e.g. in optimization loops).
+class FlutterSolver():
+
+    def __init__(self, derivatives, B, fluid_dens, Ured_range=(0.5, 30), n_Ured=150):
+
+        # The derivatives can be a FlutterDerivatives object (its data is
+        # interpolated) or a dictionary {base deriv: function of Ured}, such as
+        # the fits given by get_all_fitted_functions(notation='base')
+        if hasattr(derivatives, 'fd_data'):
+            derivatives = interpolated_derivative_functions(derivatives.fd_data)
+        if len(derivatives) == 0:
+            raise Exception('No flutter derivatives were provided.')
+
+        self.derivative_functions = derivatives
+        self.B = B
+        self.fluid_dens = fluid_dens
+
+        # Derivative matrices on the Ured grid, shape (n_Ured, 3, 3)
+        self.Ured_grid = np.linspace(Ured_range[0], Ured_range[1], n_Ured)
+        self.velocity, self.displacement = self._derivative_matrices(self.Ured_grid)
+
+
+    def damping_sweep(self, structure, U_values):
+
+        # Eigenvalue of each mode at each wind speed, at the Ured where its
+        # frequency is consistent. Returns a dictionary with arrays of shape
+        # (n_U, n_modes): real part of the eigenvalue ('damping'), frequency
+        # in Hz, damping ratio and Ured (NaN where no solution was found).
+        U_values = np.atleast_1d(np.asarray(U_values, dtype=np.float64))
+        matrices = self._modal_matrices(structure, self.velocity, self.displacement)
+        eigenvalues = self._mode_eigenvalues(U_values[:,np.newaxis], *matrices, structure.n_modes)
+
+        # Mismatch between the frequency of each eigenvalue and the one
+        # corresponding to the Ured of the aerodynamic matrices
+        omega_Ured = 2*np.pi*U_values[:,np.newaxis]/(self.Ured_grid*self.B)
+        mismatch = eigenvalues.imag - omega_Ured[:,:,np.newaxis]
+
+        # First sign change along the Ured grid, for each U and mode
+        crossing = (mismatch[:,:-1] < 0) & (mismatch[:,1:] >= 0)
+        found = crossing.any(axis=1)
+        index = np.argmax(crossing, axis=1)
+
+        # Linear interpolation between the grid points around the crossing
+        mismatch_0 = np.take_along_axis(mismatch, index[:,np.newaxis], axis=1)[:,0]
+        mismatch_1 = np.take_along_axis(mismatch, index[:,np.newaxis]+1, axis=1)[:,0]
+        fraction = mismatch_0 / (mismatch_0 - mismatch_1)
+        eigenvalue_0 = np.take_along_axis(eigenvalues, index[:,np.newaxis], axis=1)[:,0]
+        eigenvalue_1 = np.take_along_axis(eigenvalues, index[:,np.newaxis]+1, axis=1)[:,0]
+        eigenvalue = eigenvalue_0 + fraction*(eigenvalue_1 - eigenvalue_0)
+        Ured = self.Ured_grid[index] + fraction*(self.Ured_grid[index+1] - self.Ured_grid[index])
+
+        eigenvalue[~found] = np.nan
+        Ured[~found] = np.nan
+
+        return {'U': U_values, 'damping': eigenvalue.real, 'frequency': eigenvalue.imag/2/np.pi,
+            'damping_ratio': -eigenvalue.real/np.abs(eigenvalue), 'Ured': Ured}
+
+
+    def solve(self, structure, U_range, n_U=50, refine=True, tolerance=1e-8):
+
+        # Critical flutter speed in U_range: the lowest U where the damping
+        # of a mode becomes positive. First located on a grid of n_U speeds,
+        # then (optionally) refined with bracketed root finding.
+        U_values = np.linspace(U_range[0], U_range[1], n_U)
+        sweep = self.damping_sweep(structure, U_values)
+
+        # First stable-to-unstable transition of each mode
+        damping = sweep['damping']
+        if np.any(damping[0] > 0):
+            msg = 'The system is already unstable at the lowest wind speed ('
+            msg += str(U_range[0]) + '). Reduce the lower limit of the range.'
+            warnings.warn(msg)
+        onset = (damping[:-1] <= 0) & (damping[1:] > 0)
+        if not onset.any():
+            msg = 'No flutter instability was found in the range of wind speeds '
+            msg += str(tuple(U_range)) + '.'
+            warnings.warn(msg)
+            return {'U': np.nan, 'frequency': np.nan, 'Ured': np.nan, 'mode': None, 'sweep': sweep}
+
+        U_index, mode = np.argwhere(onset)[np.argmin(np.argwhere(onset)[:,0])]
+        U_low, U_high = U_values[U_index], U_values[U_index+1]
+
+        if refine:
+            from scipy.optimize import brentq
+            U_critical = brentq(lambda U: self._mode_solution(structure, U, mode)[0].real,
+                U_low, U_high, xtol=tolerance*U_high)
+        else:
+            # Linear interpolation of the damping between the grid points
+            damping_low, damping_high = damping[U_index, mode], damping[U_index+1, mode]
+            U_critical = U_low + damping_low/(damping_low - damping_high)*(U_high - U_low)
+
+        eigenvalue, Ured = self._mode_solution(structure, U_critical, mode)
+
+        return {'U': U_critical, 'frequency': eigenvalue.imag/2/np.pi, 'Ured': Ured,
+            'mode': int(mode), 'sweep': sweep}
+
+
+    def _derivative_matrices(self, Ureds):
+
+        values = {deriv: function(Ureds) for deriv, function in self.derivative_functions.items()}
+
+        return derivative_matrices(values, self.B)
+
+
+    def _modal_matrices(self, structure, velocity, displacement):
+
+        # Structural matrices and generalized aerodynamic matrices
+        # (per unit of 0.5*dens*U^2) for the modes of the structure
+        mass_matrix, damping_matrix, stiffness_matrix = structure.get_matrices()
+        velocity_modal = np.einsum('...ij,ijkl->...kl', velocity, structure.modal_integrals)
+        displacement_modal = np.einsum('...ij,ijkl->...kl', displacement, structure.modal_integrals)
+
+        return np.linalg.inv(mass_matrix), damping_matrix, stiffness_matrix, velocity_modal, displacement_modal
+
+
+    def _mode_eigenvalues(self, U, mass_inv, damping_matrix, stiffness_matrix,
+        velocity_modal, displacement_modal, n_modes):
+
+        # Eigenvalues with positive frequency, sorted by frequency, for all
+        # the combinations of U (..., 1) and the aerodynamic matrices (n_Ured, n, n)
+        U = np.asarray(U, dtype=np.float64)[...,np.newaxis,np.newaxis]
+        pressure = 0.5*self.fluid_dens*U**2
+        stiffness = stiffness_matrix - pressure*displacement_modal
+        damping = damping_matrix - pressure*self.B/U*velocity_modal
+
+        shape = np.broadcast_shapes(stiffness.shape, damping.shape)
+        state_matrix = np.zeros(shape[:-2] + (2*n_modes, 2*n_modes))
+        state_matrix[...,:n_modes,n_modes:] = np.eye(n_modes)
+        state_matrix[...,n_modes:,:n_modes] = -mass_inv @ stiffness
+        state_matrix[...,n_modes:,n_modes:] = -mass_inv @ damping
+
+        eigenvalues = np.linalg.eigvals(state_matrix)
+
+        # Keep the oscillating solutions (complex pairs), sorted by frequency
+        eigenvalues = np.where(eigenvalues.imag > 0, eigenvalues, complex(np.nan, np.nan))
+        order = np.argsort(eigenvalues.imag, axis=-1)
+        eigenvalues = np.take_along_axis(eigenvalues, order, axis=-1)
+
+        return eigenvalues[...,:n_modes]
+
+
+    def _mode_solution(self, structure, U, mode):
+
+        # Eigenvalue of one mode at one wind speed, with the consistent Ured
+        # found by bracketed root finding using the derivative functions
+        from scipy.optimize import brentq
+
+        def eigenvalue_at(Ured):
+            velocity, displacement = self._derivative_matrices(np.array([Ured]))
+            matrices = self._modal_matrices(structure, velocity, displacement)
+            return self._mode_eigenvalues(U, *matrices, structure.n_modes)[0,mode]
+
+        def mismatch(Ured):
+            return eigenvalue_at(Ured).imag - 2*np.pi*U/(Ured*self.B)
+
+        # Bracket from the grid solution at this wind speed
+        sweep = self.damping_sweep(structure, [U])
+        Ured_grid = sweep['Ured'][0,mode]
+        if np.isnan(Ured_grid):
+            return complex(np.nan, np.nan), np.nan
+
+        index = min(np.searchsorted(self.Ured_grid, Ured_grid), len(self.Ured_grid)-1)
+        Ured_low, Ured_high = self.Ured_grid[max(index-1, 0)], self.Ured_grid[index]
+        if mismatch(Ured_low)*mismatch(Ured_high) > 0:
+            return complex(sweep['damping'][0,mode], 2*np.pi*sweep['frequency'][0,mode]), Ured_grid
+
+        Ured = brentq(mismatch, Ured_low, Ured_high, xtol=1e-12)
+
+        return eigenvalue_at(Ured), Ured
+
+
+def critical_flutter_speed(derivatives, structure, B, fluid_dens, U_range, n_U=50,
+    Ured_range=(0.5, 30), n_Ured=150, refine=True):
+
+    # Convenience function: build the solver and find the critical speed
+    solver = FlutterSolver(derivatives, B, fluid_dens, Ured_range=Ured_range, n_Ured=n_Ured)
+
+    return solver.solve(structure, U_range, n_U=n_U, refine=refine)
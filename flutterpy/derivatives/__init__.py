@@ -1,4 +1,14 @@
 
 from flutterpy.derivatives.flutter_derivatives import *
 from flutterpy.derivatives.independent_functions import *
-from flutterpy.derivatives.notations.notation import *
\ No newline at end of file
+from flutterpy.derivatives.notations.notation import *
+from flutterpy.derivatives.ingestion import *
+from flutterpy.derivatives.campaign import *
+from flutterpy.derivatives.streaming import *
+from flutterpy.derivatives.fitting import *
+from flutterpy.derivatives.rational_approximation import *
+from flutterpy.derivatives.profiling import *
+from flutterpy.derivatives.storage import *
+from flutterpy.derivatives.run_cache import *
+from flutterpy.derivatives.calculators import *
+from flutterpy.derivatives.uncertainty import *
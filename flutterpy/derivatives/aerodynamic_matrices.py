@@ -0,0 +1,60 @@
+
+import numpy as np
+
+from flutterpy.derivatives.derivative_table import base_derivative_names
+
+
+# Rows: forces (lift, moment, drag). Columns: motions (heave, pitch, sway).
+# Each motion-force pair has a derivative multiplying the motion velocity
+# and another multiplying the displacement.
+force_letters = ['l', 'm', 'd']
+motion_numbers = [(3,4), (5,6), (1,2)]
+
+
+def derivative_matrices(values, B):
+
+    # Arrange the base derivatives into the (..., 3, 3) matrices
+    # 'velocity' and 'displacement' of the self-excited forces
+    #   F = 0.5*dens*U^2 * (displacement*x + velocity*B/U*dx/dt)
+    # with F = [lift, moment, drag] (per unit length) and x = [heave, pitch, sway].
+    # In the frequency domain, F = 0.5*dens*U^2 * (displacement + i*K*velocity) * x,
+    # with K = B*omega/U. The values are given as {deriv: array} (missing
+    # derivatives are zero) and the scaling follows the one used to calculate
+    # them from forced motion (moments and pitch motions carry a factor B).
+    shape = np.shape(next(iter(values.values()))) if len(values) > 0 else ()
+    velocity = np.zeros(shape + (3,3))
+    displacement = np.zeros(shape + (3,3))
+
+    for row, letter in enumerate(force_letters):
+        for column, (number_velocity, number_displacement) in enumerate(motion_numbers):
+            scale = B**((row == 1) + (column == 1))
+            if letter+str(number_velocity) in values:
+                velocity[...,row,column] = scale*np.asarray(values[letter+str(number_velocity)])
+            if letter+str(number_displacement) in values:
+                displacement[...,row,column] = scale*np.asarray(values[letter+str(number_displacement)])
+
+    return velocity, displacement
+
+
+def interpolated_derivative_functions(fd_data):
+
+    # Functions Ured -> value of each base derivative, interpolating the
+    # data linearly (constant outside the range). Derivatives without
+    # data are not included.
+    functions = {}
+    for deriv in base_derivative_names:
+        Ureds = np.asarray(fd_data[deriv]['Ured'], dtype=np.float64)
+        if len(Ureds) == 0:
+            continue
+        order = np.argsort(Ureds)
+        functions[deriv] = _interpolator(Ureds[order], np.asarray(fd_data[deriv]['values'], dtype=np.float64)[order])
+
+    return functions
+
+
+def _interpolator(Ureds, values):
+
+    def function(Ured):
+        return np.interp(Ured, Ureds, values)
+
+    return function
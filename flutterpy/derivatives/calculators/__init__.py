@@ -0,0 +1,3 @@
+
+from flutterpy.derivatives.calculators.broadband import *
+from flutterpy.derivatives.calculators.free_vibration import *
@@ -0,0 +1,102 @@
+
+import numpy as np
+
+
+# Calculation of flutter derivatives at many frequencies from a single
+# forced motion record with broadband excitation (chirp or multi-sine).
+# The transfer function force/motion is estimated with Welch's method,
+#   H(f) = P_motion,force(f) / P_motion,motion(f),
+# and at each frequency it plays the role of the complex force/motion ratio
+# of the single-harmonic method, so the derivatives are obtained with the
+# same scaling factors.
+def calculate_derivatives_from_broadband_motion(fd, excitation='chirp', frequencies=None, band=None,
+    nperseg=None, min_coherence=0.9, min_power=1e-3, **kwargs):
+
+    # The parameters are given as in calculate_derivatives_from_forced_motion
+    # (without the motion frequency). The frequencies (Hz) where the
+    # derivatives are calculated are either given or selected among the
+    # frequencies of the spectrum in 'band' (Hz) where the motion has at
+    # least min_power times its maximum power and the coherence between
+    # motion and all the forces is at least min_coherence. With a
+    # 'multisine' excitation only the peaks of the motion spectrum are used.
+    from scipy.signal import csd, welch
+
+    sim_params = fd._fill_with_default_simulation_parameters(**kwargs)
+    provided_motions, provided_forces = fd._check_motion_force_input(**kwargs)
+    m_name = provided_motions[0]
+    series = [np.asarray(s, dtype=np.float64) for s in fd._load_time_series(provided_motions, provided_forces, kwargs)]
+    sampling_frequency = 1/sim_params['delta_t']
+
+    # Spectral estimates (mean removed in each segment)
+    if nperseg is None:
+        nperseg = max(len(series[0])//8, 16)
+    welch_settings = {'fs': sampling_frequency, 'nperseg': nperseg, 'detrend': 'constant'}
+    frequency_bins, motion_psd = welch(series[0], **welch_settings)
+    transfer_functions = []
+    coherences = []
+    for force in series[1:]:
+        _, cross_psd = csd(series[0], force, **welch_settings)
+        _, force_psd = welch(force, **welch_settings)
+        transfer_functions.append(cross_psd / motion_psd)
+        coherences.append(np.abs(cross_psd)**2 / (motion_psd*force_psd))
+    transfer_functions = np.array(transfer_functions)
+    coherences = np.array(coherences)
+
+    selected = _select_frequency_bins(frequency_bins, motion_psd, coherences, excitation, frequencies,
+        band, min_coherence, min_power)
+    if len(selected) == 0:
+        msg = 'No frequency of the spectrum in the band ' + str(band) + ' Hz fulfils the power and coherence '
+        msg += 'conditions (min_power ' + str(min_power) + ', min_coherence ' + str(min_coherence) + '). '
+        msg += 'Consider reducing min_coherence or min_power, or changing the band.'
+        raise Exception(msg)
+
+    # Derivatives at each selected frequency, with the single-harmonic scaling
+    omega = 2*np.pi*frequency_bins[selected]
+    values = {}
+    for f_index, f_name in enumerate(provided_forces):
+        derivs_to_calc = fd._get_derivatives_to_calculate(m_name, f_name)
+        values[derivs_to_calc[0]], values[derivs_to_calc[1]], Ured = fd._derivative_pair_values(m_name, f_name,
+            sim_params, omega, transfer_functions[f_index, selected])
+
+    # Equivalent amplitude of the motion in each frequency bin
+    amplitude = np.sqrt(2*motion_psd[selected]*(frequency_bins[1] - frequency_bins[0]))
+
+    # All the frequencies belong to the same run. The coherence of each force
+    # with the motion is kept under its own key ('forces' holds the residual
+    # norms of the sinusoidal fits in the other methods).
+    diagnostics = {'motion': m_name, 'method': 'broadband', 'excitation': excitation, 'nperseg': nperseg,
+        'coherence': {f_name: coherences[f_index, selected].tolist() for f_index, f_name in enumerate(provided_forces)},
+        'omega': omega.tolist(), 'Ured': np.atleast_1d(Ured).tolist(), 'motion_amplitude': amplitude.tolist()}
+    fd._store_run_results(Ured, omega, amplitude, values, [diagnostics], runs=np.zeros(len(selected), dtype=np.int64))
+
+
+def _select_frequency_bins(frequency_bins, motion_psd, coherences, excitation, frequencies,
+    band, min_coherence, min_power):
+
+    # Nearest bins to the requested frequencies
+    if frequencies is not None:
+        frequencies = np.atleast_1d(np.asarray(frequencies, dtype=np.float64))
+        return np.unique(np.abs(frequency_bins[:,np.newaxis] - frequencies).argmin(axis=0))
+
+    valid = frequency_bins > 0
+    if band is not None:
+        valid &= (frequency_bins >= band[0]) & (frequency_bins <= band[1])
+    if not valid.any():
+        msg = 'No frequency of the spectrum is in the band ' + str(band) + ' Hz '
+        msg += '(resolution ' + str(frequency_bins[1] - frequency_bins[0]) + ' Hz). '
+        msg += 'Consider widening the band or increasing nperseg.'
+        raise Exception(msg)
+    valid &= motion_psd >= min_power*motion_psd[valid].max()
+    valid &= np.all(coherences >= min_coherence, axis=0)
+
+    if excitation == 'multisine':
+        # Local maxima of the motion spectrum (the excited frequencies)
+        peaks = np.zeros(len(motion_psd), dtype=bool)
+        peaks[1:-1] = (motion_psd[1:-1] >= motion_psd[:-2]) & (motion_psd[1:-1] > motion_psd[2:])
+        valid &= peaks
+    elif excitation != 'chirp':
+        msg = "The excitation '" + str(excitation) + "' is not recognised. "
+        msg += "Choose one of the following: 'chirp', 'multisine'."
+        raise Exception(msg)
+
+    return np.flatnonzero(valid)
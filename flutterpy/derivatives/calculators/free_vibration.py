@@ -0,0 +1,224 @@
+
+import itertools
+import numpy as np
+
+from flutterpy.derivatives.ingestion import load_time_series
+from flutterpy.derivatives.aerodynamic_matrices import force_letters, motion_numbers
+from flutterpy.structure.structural_model import section_dofs
+
+
+# Identification methods of the modal parameters from free vibration records:
+#   'era': Eigensystem Realization Algorithm, with the Hankel matrix of the
+#          free decay record itself.
+#   'ssi': covariance-driven Stochastic Subspace Identification, with the
+#          Hankel matrix of the output correlations (estimated with FFTs).
+identification_methods = ['era', 'ssi']
+
+
+def identify_modal_parameters(records, delta_t, method='era', order=None, n_block_rows=20, n_columns=None,
+    svd=None):
+
+    # Modal parameters of the linear system of the records, an array with
+    # shape (samples, outputs). 'order' is the size of the state space model
+    # (by default, twice the number of outputs). The realization uses the
+    # singular vectors of a Hankel matrix with n_block_rows block rows and
+    # n_columns block columns (ERA only, by default all the record). For
+    # wide Hankel matrices (svd='truncated', the default when it has many
+    # more columns than rows) only the leading singular vectors are computed,
+    # without building the whole matrix, so long records scale linearly.
+    # Returns the continuous eigenvalues, frequencies (Hz), damping ratios,
+    # mode shapes (outputs, modes) and contribution of each mode, with one
+    # mode per complex conjugate pair (positive imaginary part).
+    records = np.asarray(records, dtype=np.float64)
+    if records.ndim == 1:
+        records = records[:,np.newaxis]
+    n_samples, n_outputs = records.shape
+    if order is None:
+        order = 2*n_outputs
+
+    if method == 'era':
+        markov = records[:,:,np.newaxis]
+    elif method == 'ssi':
+        markov = _output_correlations(records - records.mean(axis=0), 2*n_block_rows)[1:]
+    else:
+        msg = "The identification method '" + str(method) + "' is not recognised. "
+        msg += 'Choose one of the following: ' + str(identification_methods)[1:-1] + '.'
+        raise Exception(msg)
+
+    max_columns = len(markov) - n_block_rows + 1
+    if n_columns is None or n_columns > max_columns:
+        n_columns = max_columns
+    if n_block_rows*n_outputs <= order or n_columns*markov.shape[2] < order:
+        msg = 'The Hankel matrix is too small for a model of order ' + str(order) + '. '
+        msg += 'Increase n_block_rows or the number of samples.'
+        raise Exception(msg)
+
+    # Truncated SVD of the Hankel matrix H[(a,p),(b,q)] = markov[a+b,p,q]
+    if svd is None:
+        svd = 'truncated' if n_columns*markov.shape[2] > 4*n_block_rows*n_outputs else 'full'
+    if svd == 'truncated':
+        left, singular_values, right = _truncated_hankel_svd(markov, n_block_rows, n_columns, order)
+    elif svd == 'full':
+        hankel = _hankel_matrix(markov, n_block_rows, n_columns)
+        left, singular_values, right = np.linalg.svd(hankel, full_matrices=False)
+        left, singular_values, right = left[:,:order], singular_values[:order], right[:order].T
+    else:
+        raise Exception("The svd must be 'truncated' or 'full'.")
+
+    # Realization: observability O = U*S^0.5, controllability S^0.5*V^T
+    # and state matrix from the shift invariance of O
+    observability = left * np.sqrt(singular_values)
+    input_matrix = (np.sqrt(singular_values)[:,np.newaxis] * right[:markov.shape[2]].T)
+    output_matrix = observability[:n_outputs]
+    state_matrix = np.linalg.lstsq(observability[:-n_outputs], observability[n_outputs:], rcond=None)[0]
+
+    # Continuous eigenvalues and mode shapes (one per conjugate pair)
+    discrete_eigenvalues, eigenvectors = np.linalg.eig(state_matrix)
+    eigenvalues = np.log(discrete_eigenvalues.astype(np.complex128))/delta_t
+    mode_shapes = output_matrix @ eigenvectors
+    participation = np.linalg.solve(eigenvectors, input_matrix.astype(np.complex128))
+    contributions = np.linalg.norm(mode_shapes, axis=0) * np.linalg.norm(participation, axis=1)
+
+    modes = np.flatnonzero(eigenvalues.imag > 0)
+    modes = modes[np.argsort(-contributions[modes])]
+    eigenvalues = eigenvalues[modes]
+
+    return {'eigenvalues': eigenvalues, 'frequencies': np.abs(eigenvalues)/(2*np.pi),
+        'damping_ratios': -eigenvalues.real/np.abs(eigenvalues), 'mode_shapes': mode_shapes[:,modes],
+        'contributions': contributions[modes], 'singular_values': singular_values}
+
+
+def calculate_derivatives_from_free_vibration(fd, structure, method='era', order=None, n_block_rows=20,
+    n_columns=None, svd=None, **kwargs):
+
+    # Flutter derivatives of all the motion-force pairs of a section model
+    # from a free vibration record in wind (displacements heave, pitch and
+    # optionally sway, given as in calculate_derivatives_from_forced_motion).
+    # The structure (StructuralModel.section, with one mode per motion in the
+    # same order) gives the still-air mass, damping and stiffness matrices.
+    # The identified state matrix of the system in wind
+    #   M*x'' + (C - C_ae)*x' + (K - K_ae)*x = 0
+    # gives the aerodynamic matrices C_ae and K_ae of the self-excited forces
+    #   F = C_ae*x' + K_ae*x = 0.5*dens*U^2 * (displacement*x + velocity*B/U*x'),
+    # and so the derivatives. The derivatives of each motion are stored at
+    # the reduced velocity of the mode dominated by that motion.
+    sim_params = fd._fill_with_default_simulation_parameters(**kwargs)
+    provided_motions = [m_name for m_name in section_dofs if m_name in kwargs]
+    if provided_motions not in (['heave', 'pitch'], ['heave', 'pitch', 'sway']):
+        msg = 'Free vibration records must include the heave and pitch motions (and optionally sway).'
+        raise Exception(msg)
+    n_dofs = len(provided_motions)
+    if structure.n_modes != n_dofs:
+        msg = 'The structure must have one mode per motion (' + str(n_dofs) + '), '
+        msg += 'in the order ' + str(provided_motions)[1:-1] + '.'
+        raise Exception(msg)
+
+    series = [load_time_series(kwargs[m_name]) for m_name in provided_motions]
+    if len({len(s) for s in series}) > 1:
+        raise Exception('The motion time series must have the same length.')
+    records = np.column_stack(series)
+
+    # Structural modes in wind
+    identified = identify_modal_parameters(records, sim_params['delta_t'], method=method, order=order,
+        n_block_rows=n_block_rows, n_columns=n_columns, svd=svd)
+    if len(identified['eigenvalues']) < n_dofs:
+        msg = 'Only ' + str(len(identified['eigenvalues'])) + ' oscillating modes were identified, '
+        msg += 'but ' + str(n_dofs) + ' are needed.'
+        raise Exception(msg)
+    modes = _assign_modes_to_motions(identified['mode_shapes'][:,:n_dofs])
+    eigenvalues = identified['eigenvalues'][modes]
+    mode_shapes = identified['mode_shapes'][:,modes]
+
+    # Physical state matrix [[0, I], [-M^-1*K_eff, -M^-1*C_eff]] from the
+    # modes and their complex conjugates
+    state_modes = np.vstack([mode_shapes, mode_shapes*eigenvalues])
+    state_modes = np.hstack([state_modes, state_modes.conj()])
+    state_eigenvalues = np.concatenate([eigenvalues, eigenvalues.conj()])
+    state_matrix = np.real(np.linalg.solve(state_modes.T, (state_modes*state_eigenvalues).T).T)
+
+    mass, damping, stiffness = structure.get_matrices()
+    aero_damping = damping + mass @ state_matrix[n_dofs:,n_dofs:]
+    aero_stiffness = stiffness + mass @ state_matrix[n_dofs:,:n_dofs]
+
+    # Derivatives, with the scaling of aerodynamic_matrices.derivative_matrices
+    U, B = sim_params['U'], sim_params['B']
+    dynamic_pressure = 0.5*sim_params['fluid_dens']*U**2
+    omega = np.abs(eigenvalues)
+    Ured = 2*np.pi*U/(omega*B)
+    values = {}
+    for row in range(n_dofs):
+        for column in range(n_dofs):
+            scale = B**((row == 1) + (column == 1))
+            number_velocity, number_displacement = motion_numbers[column]
+            value_velocity = np.full(n_dofs, np.nan)
+            value_displacement = np.full(n_dofs, np.nan)
+            value_velocity[column] = aero_damping[row,column]*U/(dynamic_pressure*B*scale)
+            value_displacement[column] = aero_stiffness[row,column]/(dynamic_pressure*scale)
+            values[force_letters[row]+str(number_velocity)] = value_velocity
+            values[force_letters[row]+str(number_displacement)] = value_displacement
+
+    # One run, with a row per motion
+    diagnostics = {'motions': provided_motions, 'method': method, 'omega': omega.tolist(), 'Ured': Ured.tolist(),
+        'damping_ratios': (-eigenvalues.real/omega).tolist(),
+        'mode_shapes': {'real': mode_shapes.real.tolist(), 'imag': mode_shapes.imag.tolist()},
+        'singular_values': identified['singular_values'].tolist()}
+    amplitude = np.max(np.abs(records), axis=0)
+    fd._store_run_results(Ured, omega, amplitude, values, [diagnostics], runs=np.zeros(n_dofs, dtype=np.int64))
+
+
+def _output_correlations(records, n_lags):
+
+    # Correlations R[k] = E[y(t+k) y(t)^T] for k = 0, ..., n_lags-1, with
+    # FFTs of the zero-padded records. The biased estimate (divided by the
+    # number of samples) keeps the exponential decay of free vibration records.
+    n_samples = len(records)
+    n_fft = 1 << int(np.ceil(np.log2(2*n_samples)))
+    spectra = np.fft.rfft(records, n=n_fft, axis=0)
+    correlations = np.fft.irfft(spectra[:,:,np.newaxis] * spectra[:,np.newaxis,:].conj(), n=n_fft, axis=0)[:n_lags]
+
+    return correlations / n_samples
+
+
+def _hankel_matrix(markov, n_block_rows, n_columns):
+
+    n_samples, n_outputs, n_inputs = markov.shape
+    blocks = np.lib.stride_tricks.sliding_window_view(markov[:n_block_rows+n_columns-1], n_columns, axis=0)
+    # (row block, output, input, column block) -> (row block, output, column block, input)
+    return blocks.transpose(0, 1, 3, 2).reshape(n_block_rows*n_outputs, n_columns*n_inputs)
+
+
+def _truncated_hankel_svd(markov, n_block_rows, n_columns, rank, chunk_size=2**16):
+
+    # Leading singular values and vectors of a wide Hankel matrix from its
+    # Gram matrix H*H^T (rows x rows), accumulated over chunks of columns,
+    # so the memory used is that of one chunk. Only the first block column
+    # of the right singular vectors (H^T*U/S) is needed by the realization.
+    gram = np.zeros((n_block_rows*markov.shape[1],)*2)
+    for first in range(0, n_columns, chunk_size):
+        columns = min(chunk_size, n_columns - first)
+        chunk = _hankel_matrix(markov[first:], n_block_rows, columns)
+        gram += chunk @ chunk.T
+
+    squared_values, left = np.linalg.eigh(gram)
+    order = np.argsort(squared_values)[::-1][:rank]
+    singular_values = np.sqrt(np.maximum(squared_values[order], 0))
+    left = left[:,order]
+    first_columns = _hankel_matrix(markov, n_block_rows, 1)
+    right = (first_columns.T @ left) / singular_values
+
+    return left, singular_values, right
+
+
+def _assign_modes_to_motions(mode_shapes):
+
+    # Mode dominated by each motion: the assignment maximising the product
+    # of the normalized mode shape components (each motion is normalized by
+    # its largest component, so the units do not matter)
+    magnitudes = np.abs(mode_shapes)
+    magnitudes = magnitudes / magnitudes.max(axis=1, keepdims=True)
+    n_dofs = len(mode_shapes)
+
+    best = max(itertools.permutations(range(n_dofs)),
+        key=lambda modes: np.sum(np.log(magnitudes[np.arange(n_dofs), list(modes)] + 1e-300)))
+
+    return np.array(best)
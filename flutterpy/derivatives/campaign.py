@@ -0,0 +1,116 @@
+import os
+import copy
+import json
+import warnings
+import numpy as np
+
+from flutterpy.derivatives.ingestion import read_table, prefetch
+
+
+# Forced motion runs of a test campaign or simulation sweep, with one folder
+# per run under a root folder (at any depth). Each run folder contains the
+# same text files, e.g. the motion record and the forces.dat of a CFD run:
+#   files = {'motion.dat': {'heave': 1},
+#            'postProcessing/forces/0/forces.dat': {'lift': 'total_y', 'time': 0}}
+# with the column mapping of each file (see ingestion.read_table). The
+# parameters of each run (U, omega, delta_t...) are the common ones, updated
+# with the ones in its parameter file (JSON) and the ones returned by the
+# 'parameters' function of the run folder, if given. If a 'time' column is
+# read, delta_t is taken from it. When the runs are loaded in other processes
+# (for_workers), the 'parameters' function is evaluated in the calling one,
+# so it does not need to be picklable (lambdas and closures can be used).
+class Campaign():
+
+    def __init__(self, root, files, parameters=None, parameter_file='parameters.json', formats=None,
+        n_prefetch=1):
+
+        if not os.path.isdir(root):
+            msg = "The campaign folder '" + str(root) + "' does not exist."
+            raise Exception(msg)
+
+        self.root = root
+        self.files = files
+        self.parameters = parameters
+        self.parameter_file = parameter_file
+        self.formats = {} if formats is None else formats
+        self.n_prefetch = n_prefetch
+
+        # Parameters of each run computed beforehand with the 'parameters'
+        # function (see for_workers)
+        self._run_parameters = {}
+
+        # Folders with all the files of a run, in alphabetical order
+        self.run_paths = []
+        for folder, subfolders, _ in os.walk(root):
+            subfolders.sort()
+            if all(os.path.isfile(os.path.join(folder, file)) for file in files):
+                self.run_paths.append(folder)
+        if len(self.run_paths) == 0:
+            msg = "No run folders with the files " + str(list(files))[1:-1] + " were found in '" + str(root) + "'."
+            raise Exception(msg)
+
+    def __len__(self):
+
+        return len(self.run_paths)
+
+    def __iter__(self):
+
+        # The next runs are read in a background thread while the current
+        # one is processed
+        return prefetch(map(self.load_run, self.run_paths), self.n_prefetch)
+
+    def load_run(self, run_path):
+
+        # **kwargs of calculate_derivatives_from_forced_motion for one run
+        run = {}
+        if isinstance(self.parameters, dict):
+            run.update(self.parameters)
+        if self.parameter_file is not None:
+            parameter_path = os.path.join(run_path, self.parameter_file)
+            if os.path.isfile(parameter_path):
+                with open(parameter_path, 'r') as file:
+                    run.update(json.load(file))
+        if callable(self.parameters):
+            run.update(self.parameters(run_path))
+        elif run_path in self._run_parameters:
+            run.update(self._run_parameters[run_path])
+
+        for file, columns in self.files.items():
+            run.update(read_table(os.path.join(run_path, file), columns, format=self.formats.get(file)))
+
+        # The time step measured from the time column replaces the given one
+        if 'time' in run:
+            delta_t = _time_step(run.pop('time'), run_path)
+            if 'delta_t' in run and abs(run['delta_t'] - delta_t) > 1e-6*abs(delta_t):
+                msg = "The time step of the run '" + str(run_path) + "' (" + str(run['delta_t']) + ') does not '
+                msg += 'match the one of its time column (' + str(delta_t) + '). The latter is used.'
+                warnings.warn(msg)
+            run['delta_t'] = delta_t
+
+        return run
+
+    def for_workers(self):
+
+        # Copy of the campaign to load the runs in other processes: the
+        # 'parameters' function is evaluated here for all the runs, since it
+        # may not be picklable
+        campaign = copy.copy(self)
+        if callable(self.parameters):
+            campaign.parameters = None
+            campaign._run_parameters = {run_path: self.parameters(run_path) for run_path in self.run_paths}
+
+        return campaign
+
+
+def _time_step(time, run_path):
+
+    # Mean time step of the samples, warning if it is not constant
+    # (e.g. CFD with adaptive time steps)
+    time_steps = np.diff(time)
+    delta_t = (time[-1] - time[0])/len(time_steps)
+    if np.max(np.abs(time_steps - delta_t)) > 1e-6*abs(delta_t):
+        msg = "The time step of the run '" + str(run_path) + "' is not constant. "
+        msg += 'The series should be resampled before calculating the derivatives.'
+        warnings.warn(msg)
+
+    return delta_t
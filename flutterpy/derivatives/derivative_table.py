@@ -0,0 +1,125 @@
+
+import numpy as np
+
+
+# Names of the base derivatives, in the order used in all the package,
+# and of the columns with their standard deviations
+base_derivative_names = [letter+str(number) for letter in 'dlm' for number in range(1,7)]
+std_column_names = [deriv+'_std' for deriv in base_derivative_names]
+
+
+# Growable column-oriented storage of flutter derivatives.
+# Each row is one operating point (one run and motion), with columns for
+# the run index, Ured, omega, the motion amplitude, the 18 base
+# derivatives (NaN when a derivative was not calculated in that row) and
+# their standard deviations (NaN when they are not known).
+# Rows which do not come from a processed run have the run index -1.
+class DerivativeTable():
+
+    __slots__ = ('columns', 'size', 'capacity')
+
+    info_columns = {'run': np.int64, 'Ured': np.float64, 'omega': np.float64, 'amplitude': np.float64}
+
+    def __init__(self, capacity=16):
+
+        self.size = 0
+        self.capacity = capacity
+        self.columns = {}
+        for name, dtype in self.info_columns.items():
+            self.columns[name] = np.empty(capacity, dtype=dtype)
+        for deriv in base_derivative_names + std_column_names:
+            self.columns[deriv] = np.empty(capacity, dtype=np.float64)
+
+    @classmethod
+    def from_columns(cls, columns):
+
+        # Table using the given arrays (e.g. memory maps) as columns, without
+        # copying them. They are only copied when new rows are appended.
+        # Missing standard deviations (e.g. older stores) are unknown (NaN).
+        names = list(cls.info_columns) + base_derivative_names
+        missing = [name for name in names if name not in columns]
+        if len(missing) > 0:
+            raise Exception('Missing columns of the derivative table: ' + str(missing)[1:-1] + '.')
+
+        sizes = {len(columns[name]) for name in names + [name for name in std_column_names if name in columns]}
+        if len(sizes) > 1:
+            raise Exception('All the columns of the derivative table must have the same length.')
+
+        table = cls(capacity=0)
+        table.size = table.capacity = sizes.pop()
+        table.columns = {name: columns[name] for name in names}
+        for name in std_column_names:
+            table.columns[name] = columns[name] if name in columns else np.full(table.size, np.nan)
+
+        return table
+
+    def __len__(self):
+
+        return self.size
+
+    def append(self, run, Ured, omega, amplitude, values, std=None):
+
+        # Add one or several rows. 'values' and 'std' are dictionaries
+        # {deriv: values}, the derivatives not included are filled with NaN.
+        Ured = np.atleast_1d(np.asarray(Ured, dtype=np.float64))
+        n_rows = len(Ured)
+        self._reserve(self.size + n_rows)
+
+        rows = slice(self.size, self.size + n_rows)
+        self.columns['run'][rows] = run
+        self.columns['Ured'][rows] = Ured
+        self.columns['omega'][rows] = omega
+        self.columns['amplitude'][rows] = amplitude
+        if std is None:
+            std = {}
+        for deriv in base_derivative_names:
+            self.columns[deriv][rows] = values.get(deriv, np.nan)
+            self.columns[deriv+'_std'][rows] = std.get(deriv, np.nan)
+
+        self.size += n_rows
+
+    def column(self, name):
+
+        # Read-only view of the filled part of a column (no copy)
+        view = self.columns[name][:self.size]
+        view.flags.writeable = False
+
+        return view
+
+    def derivative(self, deriv):
+
+        # Values, Ured and standard deviations of one derivative, only in the
+        # rows where it was calculated. They are views of the table if no
+        # row is missing.
+        values = self.column(deriv)
+        Ured = self.column('Ured')
+        std = self.column(deriv+'_std')
+
+        available = ~np.isnan(values)
+        if available.all():
+            return {'values': values, 'Ured': Ured, 'std': std}
+
+        return {'values': values[available], 'Ured': Ured[available], 'std': std[available]}
+
+    def clear_derivative(self, deriv):
+
+        self.columns[deriv][:self.size] = np.nan
+        self.columns[deriv+'_std'][:self.size] = np.nan
+
+    def rows(self):
+
+        # Copy of the filled part of all the columns
+        return {name: column[:self.size].copy() for name, column in self.columns.items()}
+
+    def _reserve(self, n_rows):
+
+        # Grow the capacity geometrically, so appending is amortized O(1)
+        if n_rows <= self.capacity:
+            return
+
+        new_capacity = max(2*self.capacity, n_rows)
+        for name, column in self.columns.items():
+            new_column = np.empty(new_capacity, dtype=column.dtype)
+            new_column[:self.size] = column[:self.size]
+            self.columns[name] = new_column
+        self.capacity = new_capacity
@@ -0,0 +1,94 @@
+
+import numpy as np
+
+
+# Methods available to fit the derivatives as functions of Ured
+fit_methods = ['polynomial', 'pchip']
+
+
+def fit_derivative(Ureds, values, degree=3, fixed_start=True, method='polynomial'):
+
+    # Fit the values of a derivative as a function of Ured. Returns a
+    # function which evaluates the fit for a scalar or an array of Ured.
+    # With 'fixed_start' the fit is forced to pass through the origin
+    # (no constant term). Complex values are fitted in their real and
+    # imaginary parts.
+    Ureds = np.asarray(Ureds, dtype=np.float64)
+    values = np.asarray(values)
+    if not np.iscomplexobj(values):
+        values = values.astype(np.float64)
+
+    if Ureds.shape != values.shape or Ureds.ndim != 1:
+        raise Exception('The values and Ured data must be 1-D arrays with the same length.')
+
+    if method == 'polynomial':
+        return _fit_polynomial(Ureds, values, degree, fixed_start)
+    elif method == 'pchip':
+        return _fit_pchip(Ureds, values, fixed_start)
+    else:
+        msg = "The fit method '" + str(method) + "' is not recognised. "
+        msg += 'Choose one of the following: ' + str(fit_methods)[1:-1] + '.'
+        raise Exception(msg)
+
+
+def _fit_polynomial(Ureds, values, degree, fixed_start):
+
+    # Powers of Ured in the fit (the constant term is removed with fixed_start)
+    powers = np.arange(1 if fixed_start else 0, degree + 1)
+    if len(Ureds) < len(powers):
+        msg = 'A polynomial of degree ' + str(degree) + ' needs at least '
+        msg += str(len(powers)) + ' points, but only ' + str(len(Ureds)) + ' are available.'
+        raise Exception(msg)
+
+    # Least squares fit, with Ured scaled to keep the system well conditioned
+    scale = np.max(np.abs(Ureds))
+    if scale == 0:
+        scale = 1.0
+    design_matrix = (Ureds[:,np.newaxis]/scale)**powers
+    scaled_coefficients = np.linalg.lstsq(design_matrix, values, rcond=None)[0]
+
+    # Coefficients in decreasing powers, as used by np.polyval
+    coefficients = np.zeros(degree + 1, dtype=scaled_coefficients.dtype)
+    coefficients[degree - powers] = scaled_coefficients/scale**powers
+
+    def function(Ured):
+        return np.polyval(coefficients, Ured)
+
+    function.coefficients = coefficients
+
+    return function
+
+
+def _fit_pchip(Ureds, values, fixed_start):
+
+    # Monotone piecewise cubic interpolation (scipy is only loaded here)
+    from scipy.interpolate import PchipInterpolator
+
+    # The interpolation needs strictly increasing Ured: repeated
+    # operating points are averaged
+    Ureds_unique, inverse, counts = np.unique(Ureds, return_inverse=True, return_counts=True)
+    values_unique = np.zeros(len(Ureds_unique), dtype=values.dtype)
+    np.add.at(values_unique, inverse, values)
+    values_unique /= counts
+
+    if fixed_start and Ureds_unique[0] > 0:
+        Ureds_unique = np.concatenate(([0.0], Ureds_unique))
+        values_unique = np.concatenate(([0.0], values_unique))
+
+    if len(Ureds_unique) < 2:
+        raise Exception('At least 2 different Ured values are needed for a spline fit.')
+
+    # Real and imaginary parts are interpolated together as two columns
+    if np.iscomplexobj(values_unique):
+        interpolator = PchipInterpolator(Ureds_unique, np.stack([values_unique.real, values_unique.imag], axis=-1))
+
+        def function(Ured):
+            result = interpolator(Ured)
+            return result[...,0] + 1j*result[...,1]
+    else:
+        interpolator = PchipInterpolator(Ureds_unique, values_unique)
+
+        def function(Ured):
+            return interpolator(Ured)
+
+    return function
@@ -1,9 +1,28 @@
 
+import os
 import numpy as np
 import warnings
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 import flutterpy.derivatives.sinusoidal_utilities as util
 import flutterpy.derivatives.notations.notation as ntt
+from flutterpy.derivatives.ingestion import load_time_series
+from flutterpy.derivatives.derivative_table import DerivativeTable, base_derivative_names
+from flutterpy.derivatives.fitting import fit_derivative
+from flutterpy.derivatives.rational_approximation import fit_rational_approximation
+from flutterpy.derivatives.profiling import Profiler, no_stage
+from flutterpy.derivatives.storage import write_store, read_store, store_position
+from flutterpy.derivatives.run_cache import RunCache, hash_run
+from flutterpy.derivatives.uncertainty import (ratio_standard_deviation, amplitude_phase_to_cos_sin,
+    bootstrap_counts, resampled_coefficients)
+from flutterpy.derivatives.calculators.broadband import calculate_derivatives_from_broadband_motion
+from flutterpy.derivatives.calculators.free_vibration import calculate_derivatives_from_free_vibration
+
+
+# Version of the extraction code. It is part of the keys of the run cache,
+# so it must be increased whenever the results of a run change.
+extraction_version = 2
 
 
 # Main object to manage flutter derivatives data
@@ -22,18 +41,53 @@ class FlutterDerivatives():
         self.sim_param_keys = ['U', 'B', 'delta_t', 'fluid_dens']
         self.default_sim_params = {}
 
+        # Number of samples read at once from the time series, and maximum
+        # number of samples used to estimate the frequency when not provided
+        self.chunk_size = 2**16
+        self.max_estimation_samples = 2**20
+
+        # Timing of the processing stages (disabled by default)
+        self.profiler = None
+
+        # On-disk cache of the results of each run (disabled by default)
+        self.run_cache = None
+
+        # Settings of the block bootstrap of the forced motion runs (disabled
+        # by default: the standard deviations come from the fit covariances)
+        self.bootstrap = None
+
+        # Settings of the transient trimming and decimation of the forced
+        # motion series before the fits (disabled by default)
+        self.preprocessing = None
+
 
     ########## USER METHODS
 
+    @property
+    def fd_data(self):
+
+        # Dictionary with the data of each base derivative,
+        # {deriv: {'values': array, 'Ured': array, 'std': array}}, built from
+        # the table (the standard deviations are NaN when they are not known)
+        return {deriv: self.table.derivative(deriv) for deriv in base_derivative_names}
+
+
     def reset_all_derivatives(self):
 
-        # Dictionary to store all derivative values, in all notations
-        self.fd_data = {}
-        
-        # Creating/Overwriting derivatives dictionary (base notation)
-        for letter in 'dlm':
-            for number in range(1,7):
-                self.fd_data[letter+str(number)] = {'values':[], 'Ured':[]}
+        # Creating/Overwriting the table storing the derivatives (base notation),
+        # with one row per operating point
+        self.table = DerivativeTable()
+
+        # Fit diagnostics of each processed run (in processing order)
+        self.run_diagnostics = []
+
+        # Derivatives already converted to other notations, and fitted functions
+        self._notation_cache = {}
+        self._fit_cache = {}
+
+        # Store holding the first rows and runs of the table, and position of
+        # the table in it (so appends only write the new ones)
+        self._store = None
 
 
     def reset_derivative(self, deriv):
@@ -42,20 +96,94 @@ class FlutterDerivatives():
         self._check_derivative_name(deriv)
         
         # Clean the derivative data
-        self.fd_data[deriv] = {'values':[], 'Ured':[]}
+        self.table.clear_derivative(deriv)
+        self._clear_caches()
 
         # TODO: Think about ways to clean the deerivatives.
         #   - Maybe it is necessary to clean its pair.
         #   - Would be cool to erase from other notations' keys
 
 
-    def reset_from_dictionary(self, dict):
+    def reset_from_dictionary(self, fd_data, notation='base'):
+
+        # Replace all the data by the derivatives of a self.fd_data-type
+        # dictionary {deriv: {'values': array, 'Ured': array}}, given in any
+        # notation. Derivatives with the same Ured values share the rows of
+        # the table. These rows do not belong to any run (run index -1).
+        # The standard deviations ('std') are optional.
+        ntt._check_notation_key(notation)
+        if notation != 'base':
+            fd_data = ntt.notation2base(fd_data, notation)
+
+        # Check the format of the input before modifying anything
+        groups = []
+        for deriv, deriv_data in fd_data.items():
+            self._check_derivative_name(deriv)
+            if not isinstance(deriv_data, dict) or 'values' not in deriv_data or 'Ured' not in deriv_data:
+                msg = "The data of the derivative '" + deriv + "' must be a dictionary "
+                msg += "with the keys 'values' and 'Ured'."
+                raise Exception(msg)
+
+            values = np.asarray(deriv_data['values'], dtype=np.float64)
+            Ureds = np.asarray(deriv_data['Ured'], dtype=np.float64)
+            if values.ndim != 1 or values.shape != Ureds.shape:
+                msg = "The values and Ured of the derivative '" + deriv + "' must be "
+                msg += '1-D arrays with the same length.'
+                raise Exception(msg)
+            if not np.all(np.isfinite(Ureds)):
+                raise Exception("The Ured values of the derivative '" + deriv + "' must be finite.")
+            std = np.asarray(deriv_data.get('std', np.full(len(values), np.nan)), dtype=np.float64)
+            if std.shape != values.shape:
+                raise Exception("The std of the derivative '" + deriv + "' must have the same length as its values.")
+            if len(values) == 0:
+                continue
+
+            # Group the derivatives by their Ured values
+            for group_Ureds, group_values, group_std in groups:
+                if np.array_equal(group_Ureds, Ureds):
+                    group_values[deriv] = values
+                    group_std[deriv] = std
+                    break
+            else:
+                groups.append((Ureds, {deriv: values}, {deriv: std}))
+
+        # One vectorized append per group (with the memory reserved at once)
+        self.reset_all_derivatives()
+        self.table._reserve(sum(len(Ureds) for Ureds, _, _ in groups))
+        for Ureds, values, std in groups:
+            self.table.append(-1, Ureds, np.nan, np.nan, values, std)
 
-        # TODO: Function to start a FlutterDerivatives object
-        # from a self.fd_data-type dictionary.
-        # Necessary to check right format in input dictionary.
 
-        pass
+    def save(self, path, append=False):
+
+        # Save the derivatives, the fit diagnostics and the default settings
+        # to a store (a folder with one binary file per column). With append,
+        # the rows and runs are added to an existing store: if the derivatives
+        # were loaded from (or saved to) the same store, only the ones added
+        # afterwards.
+        settings = {'default_notation': self.default_notation, 'default_sim_params': self.default_sim_params}
+        position = None
+        if self._store is not None and self._store[0] == os.path.realpath(path):
+            position = self._store[1]
+        position = write_store(path, self.table, self.run_diagnostics, settings, append=append, position=position)
+        self._store = (os.path.realpath(path), position)
+
+
+    @classmethod
+    def load(cls, path, mmap=True, diagnostics=True):
+
+        # Open a store saved with save(). With mmap the columns are memory-mapped
+        # (read on demand, and copied only when new rows are added). The fit
+        # diagnostics can be skipped to open large stores faster.
+        metadata, columns, run_diagnostics = read_store(path, mmap=mmap, diagnostics=diagnostics)
+
+        fd = cls(metadata['default_notation'])
+        fd.set_default_parameters(**metadata['default_sim_params'])
+        fd.table = DerivativeTable.from_columns(columns)
+        fd.run_diagnostics = run_diagnostics
+        fd._store = (os.path.realpath(path), store_position(metadata))
+
+        return fd
 
     
     def set_default_notation(self, new_notation):
@@ -75,6 +203,37 @@ class FlutterDerivatives():
 
     
     def calculate_derivatives_from_forced_motion(self, **kwargs):
+
+        if self.run_cache is None:
+            return self._calculate_derivatives_from_forced_motion(**kwargs)
+
+        # Take the results from the cache if the same run (same time series
+        # and parameters) was already processed. If not, store them.
+        key = self._run_cache_key(kwargs)
+        run_results = self.run_cache.get(key)
+        if run_results is not None:
+            self._merge_run_results(run_results)
+            return
+
+        first_row = len(self.table)
+        first_run = len(self.run_diagnostics)
+        self._calculate_derivatives_from_forced_motion(**kwargs)
+        self.run_cache.put(key, self._get_run_results(first_row, first_run))
+
+
+    def enable_run_cache(self, path, max_size=2**30):
+
+        # Keep the results of each processed run in the folder 'path' (up to
+        # max_size bytes), so runs which did not change are not processed again
+        self.run_cache = RunCache(path, max_size)
+
+
+    def disable_run_cache(self):
+
+        self.run_cache = None
+
+
+    def _calculate_derivatives_from_forced_motion(self, **kwargs):
         
         # Start checking simulation parameters
         # TODO: consider simply changing the kwargs dictionary with the filled parameters
@@ -85,12 +244,268 @@ class FlutterDerivatives():
         # I not, add 'None' to the dictionary
         sim_params['omega'] = self._check_frequency_input(**kwargs)
 
-        # Check that the right motion and force time series have been provided
-        provided_motion, provided_forces = self._check_motion_force_input(**kwargs)
+        # Check that the right motion and force time series have been provided.
+        # Several motions can be excited at once, each one at its own frequency.
+        provided_motions, provided_forces = self._check_motion_force_input(max_motions=3, **kwargs)
+
+        # Index of the run (used to identify the profiling records)
+        run = len(self.run_diagnostics)
+
+        # Open the time series (arrays, memory maps or files) without copying them
+        with self._stage('load', run):
+            series = self._load_time_series(provided_motions, provided_forces, kwargs)
+
+        # Get the frequency of each motion, estimating it if it was not provided
+        # (only from the first samples, to keep the memory bounded)
+        omegas = self._get_motion_frequencies(sim_params['omega'], provided_motions, series, sim_params['delta_t'])
+
+        # Remove the start-up transient and decimate the series, if enabled
+        delta_t = sim_params['delta_t']
+        preprocessing_info = None
+        if self.preprocessing is not None:
+            with self._stage('preprocess', run, n_samples=len(series[0])) as record:
+                series, delta_t, preprocessing_info = util.preprocess_periodic_series(series, delta_t, omegas,
+                    chunk_size=self.chunk_size, **self.preprocessing)
+                if record is not None:
+                    record.update(preprocessing_info)
+
+        # Fit all the time series in a single pass over the data. With several
+        # motions, all the harmonics are fitted jointly in each series.
+        # With the bootstrap, the statistics of blocks of whole cycles are kept too.
+        with self._stage('fit', run, n_samples=len(series[0]), n_series=len(series)):
+            if self.bootstrap is None:
+                statistics = util.sinusoidal_statistics(series, delta_t, omegas, chunk_size=self.chunk_size)
+            else:
+                block_size = self._bootstrap_block_size(omegas, delta_t)
+                statistics, block_grams, block_xty = util.sinusoidal_block_statistics(series, delta_t,
+                    omegas, block_size, chunk_size=self.chunk_size)
+
+        # Calculating derivatives pair by pair (with one motion and one force),
+        # one row of results per motion
+        n_motions = len(provided_motions)
+        values = {}
+        std = {}
+        motion_diagnostics = []
+        force_residual_norms = {}
+        with self._stage('derivatives', run) as record:
+            for m_index, provided_motion in enumerate(provided_motions):
+
+                # motion = ampl*sin(omega*t + phi)
+                pair_sim_params = dict(sim_params, omega=omegas[m_index])
+                motion_fit = statistics.solve(m_index, function='phase', harmonic=m_index)
+
+                for f_index, provided_force in enumerate(provided_forces):
+                    # force = a + b*cos(omega*t) + c*sin(omega*t) (+ the other harmonics)
+                    force_fit = statistics.solve(n_motions+f_index, function='sin_cos', harmonic=m_index)
+                    pair_values, pair_std, pair_diagnostics = self._calculate_derivative_pair_from_forced_motion(pair_sim_params,
+                        provided_motion, provided_force, motion_fit, force_fit)
+                    for deriv, value in pair_values.items():
+                        values.setdefault(deriv, np.full(n_motions, np.nan))[m_index] = value
+                        std.setdefault(deriv, np.full(n_motions, np.nan))[m_index] = pair_std[deriv]
+                    force_residual_norms[provided_force] = pair_diagnostics.pop('force_residual_norm')
+                motion_diagnostics.append(pair_diagnostics)
+
+            if record is not None:
+                record['motion_residual_norm'] = [d['motion_residual_norm'] for d in motion_diagnostics]
+                record['force_residual_norm'] = dict(force_residual_norms)
+
+        # Fit diagnostics of the run. With several motions, the values of
+        # each motion are given as lists (in the order of the motions).
+        diagnostics = {'motion': provided_motions[0] if n_motions == 1 else provided_motions,
+            'forces': force_residual_norms}
+        for key in motion_diagnostics[0]:
+            key_values = [motion_diagnostic[key] for motion_diagnostic in motion_diagnostics]
+            diagnostics[key] = key_values[0] if n_motions == 1 else key_values
+
+        # Standard deviations from the block bootstrap instead of the covariances
+        if self.bootstrap is not None:
+            with self._stage('bootstrap', run, n_blocks=len(block_grams), n_resamples=self.bootstrap['n_resamples']):
+                std = self._bootstrap_std(sim_params, provided_motions, provided_forces, omegas,
+                    block_grams, block_xty)
+            diagnostics['bootstrap'] = {'n_resamples': self.bootstrap['n_resamples'],
+                'block_size': block_size, 'n_blocks': len(block_grams)}
+        if preprocessing_info is not None:
+            diagnostics['preprocessing'] = preprocessing_info
+
+        # Saving the data of the run (all the rows belong to the same run)
+        self._store_run_results([d['Ured'] for d in motion_diagnostics], omegas,
+            [d['motion_amplitude'] for d in motion_diagnostics], values, [diagnostics], runs=np.zeros(n_motions, dtype=np.int64),
+            std=std)
+
+
+    def calculate_derivatives_from_forced_motion_parallel(self, runs, max_workers=None, chunksize=1, loader=None):
+
+        # Same as calling calculate_derivatives_from_forced_motion for each
+        # run (a dictionary with its **kwargs), but spreading the runs over
+        # a pool of processes. If a 'loader' is given, each run is instead
+        # passed to it inside the worker, which must return the **kwargs
+        # dictionary (e.g. to read the simulation files in parallel).
+        # The loader must be a module-level function so it can be pickled.
+        # The results are merged in the same order as the runs, so they
+        # are identical to the ones from the serial path. With the profiling
+        # enabled, each worker profiles its runs (and the loader, as the
+        # 'read' stage) and its records are merged here with the results,
+        # with the pid of the worker (the callback is called at that point).
+        settings = {'chunk_size': self.chunk_size, 'max_estimation_samples': self.max_estimation_samples,
+            'run_cache': self.run_cache, 'bootstrap': self.bootstrap, 'preprocessing': self.preprocessing,
+            'profiler': None if self.profiler is None else Profiler()}
+        worker = partial(_process_forced_motion_run,
+            default_sim_params=dict(self.default_sim_params), settings=settings, loader=loader)
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for run_results in executor.map(worker, runs, chunksize=chunksize):
+                self._merge_run_results(run_results)
+
+
+    def calculate_derivatives_from_campaign(self, campaign, parallel=False, max_workers=None):
+
+        # Process all the runs of a Campaign (folders with text files), in
+        # order. In series, the next runs are read in a background thread
+        # while the current one is processed. In parallel, each worker reads
+        # the files of its runs (campaign.load_run is used as the loader, with
+        # the parameters of the runs computed beforehand in this process).
+        if parallel:
+            self.calculate_derivatives_from_forced_motion_parallel(campaign.run_paths, max_workers=max_workers,
+                loader=campaign.for_workers().load_run)
+            return
+
+        for run in campaign:
+            self.calculate_derivatives_from_forced_motion(**run)
+
+
+    def calculate_derivatives_from_broadband_motion(self, excitation='chirp', frequencies=None, band=None,
+        nperseg=None, min_coherence=0.9, min_power=1e-3, **kwargs):
+
+        # Derivatives at many reduced velocities from one record with a
+        # broadband (chirp or multi-sine) motion. See calculators.broadband.
+        calculate_derivatives_from_broadband_motion(self, excitation=excitation, frequencies=frequencies,
+            band=band, nperseg=nperseg, min_coherence=min_coherence, min_power=min_power, **kwargs)
+
+
+    def calculate_derivatives_from_free_vibration(self, structure, method='era', order=None, n_block_rows=20,
+        n_columns=None, svd=None, **kwargs):
+
+        # All the heave-pitch (and sway) derivatives at once from a free
+        # vibration record in wind, with ERA or covariance-driven SSI.
+        # See calculators.free_vibration.
+        calculate_derivatives_from_free_vibration(self, structure, method=method, order=order,
+            n_block_rows=n_block_rows, n_columns=n_columns, svd=svd, **kwargs)
+
+
+    def calculate_derivatives_from_forced_motion_batch(self, runs=None, **kwargs):
+
+        # Same as calculate_derivatives_from_forced_motion, but for a whole
+        # set of simulations at once. The time series can be given either:
+        #   - As 2-D arrays (one row per run) in **kwargs.
+        #   - As a list of records (dictionaries with the same keys as
+        #     **kwargs of the single-run method) in 'runs'.
+        # The simulation parameters and the frequency can be scalars
+        # (shared by all runs) or 1-D arrays with one value per run.
+        if runs is not None:
+            kwargs = self._stack_run_records(runs, **kwargs)
+
+        # Check the inputs only once for the whole set (only one motion per run)
+        provided_motions, provided_forces = self._check_motion_force_input(**kwargs)
+        provided_motion = provided_motions[0]
+        motions, forces = self._stack_time_series(provided_motion, provided_forces, kwargs)
+        n_runs, n_samples = motions.shape
 
-        # Calculating derivatives pair by pair (with the motion and one force)
-        for provided_force in provided_forces:
-            self._calculate_derivative_pair_from_forced_motion(sim_params, provided_motion, provided_force, kwargs)
+        sim_params = self._fill_with_default_simulation_parameters(**kwargs)
+        sim_params['omega'] = self._check_frequency_input(**kwargs)
+        for param in sim_params:
+            if sim_params[param] is not None:
+                sim_params[param] = self._broadcast_run_parameter(param, sim_params[param], n_runs)
+
+        # Estimate the frequency of each run when it was not provided
+        first_run = len(self.run_diagnostics)
+        if sim_params['omega'] is None:
+            sim_params['omega'] = np.empty(n_runs)
+            time = np.arange(n_samples)
+            for run in range(n_runs):
+                time_run = time*sim_params['delta_t'][run]
+                with self._stage('frequency', first_run+run) as record:
+                    sim_params['omega'][run] = util.extract_sinusoidal_parameters(time_run, motions[run], info=record)[-1]
+
+        # Runs sharing time step and frequency share the design matrix,
+        # so they are solved together in one least-squares call
+        groups, group_index = np.unique(np.column_stack([sim_params['delta_t'], sim_params['omega']]),
+            axis=0, return_inverse=True)
+        group_index = group_index.ravel()
+
+        ratios = np.empty((len(provided_forces), n_runs), dtype=np.complex128)
+        ratio_std = np.empty((len(provided_forces), n_runs), dtype=np.complex128)
+        motion_ampl = np.empty(n_runs)
+        phi = np.empty(n_runs)
+        motion_residual_norms = np.empty(n_runs)
+        force_residual_norms = np.empty((len(provided_forces), n_runs))
+        for group, (delta_t, omega) in enumerate(groups):
+
+            runs_in_group = np.flatnonzero(group_index == group)
+            time = np.arange(n_samples)*delta_t
+            design_matrix = util.sinusoidal_design_matrix(time, omega, function='sin_cos')
+
+            with self._stage('fit', n_samples=n_samples, n_runs=len(runs_in_group)):
+                # motion = b*cos(omega*t) + c*sin(omega*t)
+                motion_coeffs, motion_rss, _, _ = np.linalg.lstsq(design_matrix[:,1:], motions[runs_in_group].T, rcond=None)
+                motion_ampl[runs_in_group] = np.hypot(*motion_coeffs)
+                phi[runs_in_group] = np.arctan2(*motion_coeffs)
+                motion_residual_norms[runs_in_group] = np.sqrt(motion_rss)
+
+                # force = a + b*cos(omega*t) + c*sin(omega*t), for all forces and runs
+                force_data = forces[:,runs_in_group].reshape(-1, n_samples)
+                force_coeffs, force_rss, _, _ = np.linalg.lstsq(design_matrix, force_data.T, rcond=None)
+                force_coeffs = force_coeffs.reshape(3, len(provided_forces), len(runs_in_group))
+                force_residual_norms[:,runs_in_group] = np.sqrt(force_rss).reshape(len(provided_forces), -1)
+
+            ratios[:,runs_in_group] = self._force_motion_ratio(motion_ampl[runs_in_group], phi[runs_in_group],
+                force_coeffs[1], force_coeffs[2])
+
+            # Covariances of the coefficients: residual variance * (X^T*X)^-1
+            gram_inv = np.linalg.inv(design_matrix.T @ design_matrix)
+            motion_gram_inv = np.linalg.inv(design_matrix[:,1:].T @ design_matrix[:,1:])
+            motion_cov = (motion_rss/(n_samples - 2))[:,np.newaxis,np.newaxis] * motion_gram_inv
+            force_cov = (force_rss.reshape(len(provided_forces), -1)/(n_samples - 3))[...,np.newaxis,np.newaxis] * gram_inv[1:,1:]
+            ratio_std[:,runs_in_group] = ratio_standard_deviation(motion_coeffs.T, motion_cov,
+                np.moveaxis(force_coeffs[1:], 0, -1), force_cov)
+
+        # Calculating all the derivatives
+        values = {}
+        std = {}
+        for f_index, f_name in enumerate(provided_forces):
+            derivs_to_calc = self._get_derivatives_to_calculate(provided_motion, f_name)
+            values[derivs_to_calc[0]], values[derivs_to_calc[1]], Ured = self._derivative_pair_values(provided_motion, f_name,
+                sim_params, sim_params['omega'], ratios[f_index])
+            std_0, std_1, _ = self._derivative_pair_values(provided_motion, f_name, sim_params, sim_params['omega'],
+                ratio_std[f_index])
+            std[derivs_to_calc[0]], std[derivs_to_calc[1]] = np.abs(std_0), np.abs(std_1)
+
+        # Saving the data and the fit diagnostics of each run
+        diagnostics = [{'motion': provided_motion,
+            'forces': {f_name: force_residual_norms[f_index, run] for f_index, f_name in enumerate(provided_forces)},
+            'omega': sim_params['omega'][run], 'Ured': Ured[run],
+            'motion_amplitude': motion_ampl[run], 'motion_phase': phi[run],
+            'motion_residual_norm': motion_residual_norms[run]} for run in range(n_runs)]
+
+        # Standard deviations from the block bootstrap, run by run (the block
+        # statistics depend on the time step and frequency of each run)
+        if self.bootstrap is not None:
+            for run in range(n_runs):
+                run_sim_params = {param: value[run] for param, value in sim_params.items() if value is not None}
+                omegas = np.array([run_sim_params['omega']])
+                block_size = self._bootstrap_block_size(omegas, run_sim_params['delta_t'])
+                with self._stage('bootstrap', first_run+run, n_resamples=self.bootstrap['n_resamples']) as record:
+                    _, block_grams, block_xty = util.sinusoidal_block_statistics([motions[run]] + list(forces[:,run]),
+                        run_sim_params['delta_t'], omegas, block_size, chunk_size=self.chunk_size)
+                    run_std = self._bootstrap_std(run_sim_params, [provided_motion], provided_forces, omegas,
+                        block_grams, block_xty)
+                    if record is not None:
+                        record['n_blocks'] = len(block_grams)
+                for deriv, deriv_std in run_std.items():
+                    std[deriv][run] = deriv_std[0]
+                diagnostics[run]['bootstrap'] = {'n_resamples': self.bootstrap['n_resamples'],
+                    'block_size': block_size, 'n_blocks': len(block_grams)}
+
+        self._store_run_results(Ured, sim_params['omega'], motion_ampl, values, diagnostics, std=std)
 
 
     def get_all_derivatives(self, notation=None):
@@ -101,9 +516,19 @@ class FlutterDerivatives():
         # Return a dictionary with all the derivative data
         if notation == 'base':
             return self.fd_data
-        else:
-            fd_data_converted = ntt.base2notation(self.fd_data,notation)
-            return fd_data_converted
+        
+        # Convert only if the data changed since the last conversion.
+        # The cached arrays are read-only, since they are shared between calls,
+        # and each call gets its own dictionaries.
+        if notation not in self._notation_cache:
+            with self._stage('notation_conversion', notation=notation, n_rows=len(self.table)):
+                fd_data_converted = ntt.base2notation(self.fd_data,notation)
+            for deriv_data in fd_data_converted.values():
+                for array in deriv_data.values():
+                    array.flags.writeable = False
+            self._notation_cache[notation] = fd_data_converted
+
+        return {deriv: dict(deriv_data) for deriv, deriv_data in self._notation_cache[notation].items()}
 
 
     def get_derivative(self, deriv):
@@ -114,67 +539,246 @@ class FlutterDerivatives():
         self._check_derivative_name(deriv)
         
         # Return a small dictionary with only data from one derivative
-        return self.fd_data[deriv]
+        return self.table.derivative(deriv)
     
 
-    def get_all_fitted_functions(self, degree=3, notation=None, fixed_start=True):
+    def enable_bootstrap(self, n_resamples=1000, cycles_per_block=4, seed=0):
 
-        # TODO
-        
-        pass
+        # Standard deviations of the forced motion derivatives from a block
+        # bootstrap: the runs are split into blocks of whole cycles, which
+        # are resampled with replacement n_resamples times. All the resamples
+        # are solved at once from the statistics of the blocks, so the cost is
+        # close to the one of a single fit. Without the bootstrap, they are
+        # propagated from the covariances of the fits. It applies to the
+        # single, parallel and batch runs (in the batch, run by run).
+        self.bootstrap = {'n_resamples': n_resamples, 'cycles_per_block': cycles_per_block, 'seed': seed}
+
+
+    def disable_bootstrap(self):
+
+        self.bootstrap = None
+
+
+    def enable_preprocessing(self, samples_per_cycle=32, tolerance=1e-3, n_stable_cycles=3, trim=True):
+
+        # Before the fits of each forced motion run, remove the start-up
+        # transient (when the cycle-to-cycle changes fall below the tolerance),
+        # keep an integer number of periods and decimate the series to about
+        # samples_per_cycle samples per cycle. See
+        # sinusoidal_utilities.preprocess_periodic_series. It applies to the
+        # single and parallel runs (the batch fits the stacked series as given).
+        self.preprocessing = {'samples_per_cycle': samples_per_cycle, 'tolerance': tolerance,
+            'n_stable_cycles': n_stable_cycles, 'trim': trim}
+
+
+    def disable_preprocessing(self):
+
+        self.preprocessing = None
+
+
+    def enable_profiling(self, callback=None):
+
+        # Start recording the wall time and fit information of the processing
+        # stages. The callback (if given) is called with each new record.
+        self.profiler = Profiler(callback)
+
+
+    def disable_profiling(self):
+
+        self.profiler = None
+
+
+    def get_profiling_report(self):
+
+        # Records of the profiled stages as a dictionary of columns
+        # (e.g. pandas.DataFrame(fd.get_profiling_report()))
+        if self.profiler is None:
+            raise Exception('The profiling is disabled. Call enable_profiling() first.')
+
+        return self.profiler.report()
+
+
+    def get_all_fitted_functions(self, degree=3, notation=None, fixed_start=True, method='polynomial'):
+
+        # Dictionary {deriv: function of Ured} with the fits of all the
+        # derivatives with data in the notation. The functions accept
+        # arrays of Ured and are kept until the data changes.
+        notation = self._fill_with_default_notation(notation)
+        fd_data = self.get_all_derivatives(notation)
+
+        return {deriv: self._get_fit(deriv, notation, degree, fixed_start, method)
+            for deriv in fd_data if len(fd_data[deriv]['Ured']) > 0}
     
 
-    def get_fitted_function(self, deriv, degree=3, fixed_start=True):
+    def get_fitted_function(self, deriv, degree=3, fixed_start=True, notation=None, method='polynomial'):
+
+        # Fitted function of Ured of one derivative (base notation if the
+        # name is a base derivative, the default notation if not)
+        if notation is None and deriv in base_derivative_names:
+            notation = 'base'
+        notation = self._fill_with_default_notation(notation)
+
+        fd_data = self.get_all_derivatives(notation)
+        if deriv not in fd_data:
+            msg = "The derivative '" + str(deriv) + "' is not in the '" + notation + "' notation. "
+            msg += 'It should be one of the following:\n' + str(list(fd_data.keys()))[1:-1]
+            raise Exception(msg)
+        if len(fd_data[deriv]['Ured']) == 0:
+            raise Exception("There is no data of the derivative '" + deriv + "' to fit.")
+
+        return self._get_fit(deriv, notation, degree, fixed_start, method)
 
-        # TODO
-        
-        pass
+
+    def get_rational_approximation(self, B=None, n_lags=2, lags=None, acceleration_term=True):
+
+        # Roger approximation of all the derivatives, for time-domain
+        # simulations (see rational_approximation). B is taken from the
+        # default simulation parameters if not given.
+        if B is None:
+            if 'B' not in self.default_sim_params:
+                raise Exception('The deck width B has no default value. Please provide it.')
+            B = self.default_sim_params['B']
+
+        return fit_rational_approximation(self.fd_data, B, n_lags=n_lags, lags=lags,
+            acceleration_term=acceleration_term)
 
 
 
     ##### INTERNAL METHODS
 
+    def _stage(self, name, run=None, **info):
+
+        # Context manager timing a processing stage (it yields the record
+        # to complete, or None if the profiling is disabled)
+        if self.profiler is None:
+            return no_stage
+
+        return self.profiler.stage(name, run, **info)
+
+    def _get_fit(self, deriv, notation, degree, fixed_start, method):
+
+        # Fit the derivative only if it is not in the cache
+        key = (deriv, notation, degree, fixed_start, method)
+        if key not in self._fit_cache:
+            deriv_data = self.get_all_derivatives(notation)[deriv]
+            self._fit_cache[key] = fit_derivative(deriv_data['Ured'], deriv_data['values'],
+                degree=degree, fixed_start=fixed_start, method=method)
+
+        return self._fit_cache[key]
+
+
     def _check_derivative_name(self, deriv):
 
         # TODO: include the current default notation
         
         # Raise exception if the input is not among the base derivatives
-        if deriv not in self.fd_data:
+        if deriv not in base_derivative_names:
             msg = 'Derivative name not recognised. '
             msg += 'It should be one of the following:\n'
-            msg += str(list(self.fd_data.keys()))[1:-1]
+            msg += str(base_derivative_names)[1:-1]
             raise Exception(msg)
 
 
-    def _check_motion_force_input(self, **kwargs):
+    def _check_motion_force_input(self, max_motions=1, **kwargs):
 
-        # Check that only one motion is provided
+        # Check that at least one motion (and at most max_motions) is provided
         motion_names = {'heave', 'pitch', 'sway'}
-        provided_motion = motion_names.intersection(kwargs)
-        if len(provided_motion) == 0:
+        provided_motions = [m_name for m_name in ('heave', 'pitch', 'sway') if m_name in kwargs]
+        if len(provided_motions) == 0:
             msg = 'No motion time series provided. '
             msg += 'Please provide one of the following variables: '
             msg += str(motion_names)
             raise Exception(msg)
-        elif len(provided_motion) > 1:
-            # TODO: This 'elif' would need to be suppressed if the function
-            # is adapted to calculate from multi-direction simulations
+        elif len(provided_motions) > max_motions:
             msg = 'Too many motion time series provided. '
-            msg += 'Please provide only the excited motion time series.'
+            if max_motions == 1:
+                msg += 'Please provide only the excited motion time series.'
+            else:
+                msg += 'Please provide at most ' + str(max_motions) + ' motion time series.'
             raise Exception(msg)
 
         # Check that at least one force is provided
         force_names = {'lift', 'moment', 'drag'}
-        provided_forces = force_names.intersection(kwargs)
+        provided_forces = [f_name for f_name in ('lift', 'moment', 'drag') if f_name in kwargs]
         if len(provided_forces) == 0:
             msg = 'No force time series provided. '
             msg += 'Please provide at least one of the following variables: '
             msg += str(force_names)
             raise Exception(msg)
 
-        # TODO: check that all time series have the same length
+        return provided_motions, provided_forces
+
+
+    def _load_time_series(self, m_names, f_names, data):
+
+        # Motions and forces as 1-D arrays or memory maps, checking their lengths
+        series = [load_time_series(data[name]) for name in m_names + f_names]
+
+        lengths = {len(s) for s in series}
+        if len(lengths) > 1:
+            msg = 'The motion and force time series must have the same length. '
+            msg += 'Lengths provided: ' + str([len(s) for s in series])[1:-1] + '.'
+            raise Exception(msg)
+
+        return series
+
+
+    def _stack_run_records(self, runs, **kwargs):
+
+        # Convert a list of run records into a single dictionary of stacked
+        # arrays. Values given directly in **kwargs are shared by all runs.
+        if len(runs) == 0:
+            raise Exception('No runs were provided.')
+
+        keys = set(runs[0])
+        for run in runs[1:]:
+            if set(run) != keys:
+                msg = 'All the run records must have the same keys. '
+                msg += 'Expected: ' + str(sorted(keys))[1:-1] + '.'
+                raise Exception(msg)
+
+        stacked = dict(kwargs)
+        for key in keys:
+            if key in kwargs:
+                msg = "The variable '" + key + "' was given both in the run records "
+                msg += 'and as a common value. Provide only one of them.'
+                raise Exception(msg)
+            stacked[key] = [run[key] for run in runs]
+
+        return stacked
+
+
+    def _stack_time_series(self, m_name, f_names, data):
+
+        # Motion as a (runs x samples) array and forces as (forces x runs x samples)
+        try:
+            motions = np.atleast_2d(np.asarray(data[m_name], dtype=np.float64))
+            forces = np.stack([np.atleast_2d(np.asarray(data[f_name], dtype=np.float64))
+                for f_name in f_names])
+        except ValueError:
+            msg = 'The time series of all the runs must have the same length.'
+            raise Exception(msg)
+
+        if motions.ndim != 2 or forces.shape[1:] != motions.shape:
+            msg = 'The motion and force time series must have the same shape '
+            msg += '(one row per run, with the same number of samples).'
+            raise Exception(msg)
+
+        return motions, forces
+
 
-        return list(provided_motion)[0], list(provided_forces)
+    def _broadcast_run_parameter(self, param, value, n_runs):
+
+        # Scalars are shared by all runs, arrays must have one value per run
+        value = np.asarray(value, dtype=np.float64)
+        if value.ndim == 0:
+            return np.full(n_runs, value)
+        elif value.shape == (n_runs,):
+            return value
+        else:
+            msg = "The parameter '" + param + "' must be a scalar or have one value per run "
+            msg += '(' + str(n_runs) + ' runs were provided).'
+            raise Exception(msg)
 
 
     def _check_frequency_input(self, **kwargs):
@@ -190,7 +794,10 @@ class FlutterDerivatives():
             if provided_input == 'omega':
                 omega = kwargs['omega']
             elif provided_input == 'frequency':
-                omega = kwargs['frequency']*2*np.pi
+                if isinstance(kwargs['frequency'], dict):
+                    omega = {m_name: 2*np.pi*frequency for m_name, frequency in kwargs['frequency'].items()}
+                else:
+                    omega = np.asarray(kwargs['frequency'])*2*np.pi
 
         # If none was given, raise exception and ask for frequency data
         elif len(provided_inputs) == 0:
@@ -214,6 +821,43 @@ class FlutterDerivatives():
         return omega
 
 
+    def _get_motion_frequencies(self, omega, m_names, series, delta_t):
+
+        # Angular frequency of each motion. With several motions, omega can be
+        # a dictionary {motion: omega} or a sequence in the order heave, pitch, sway.
+        if omega is None:
+            omegas = []
+            for m_index in range(len(m_names)):
+                with self._stage('frequency', len(self.run_diagnostics), motion=m_names[m_index]) as record:
+                    motion = np.asarray(series[m_index][:self.max_estimation_samples], dtype=np.float64)
+                    time = np.arange(len(motion))*delta_t
+                    omegas.append(util.extract_sinusoidal_parameters(time, motion, info=record)[-1])
+        elif isinstance(omega, dict):
+            missing = [m_name for m_name in m_names if m_name not in omega]
+            if len(missing) > 0:
+                raise Exception('No frequency was provided for the motions: ' + str(missing)[1:-1] + '.')
+            omegas = [omega[m_name] for m_name in m_names]
+        else:
+            omegas = np.atleast_1d(np.asarray(omega, dtype=np.float64)).tolist()
+            if len(omegas) != len(m_names):
+                msg = 'One frequency per motion must be provided ('
+                msg += str(len(m_names)) + ' motions, ' + str(len(omegas)) + ' frequencies).'
+                raise Exception(msg)
+        omegas = np.asarray(omegas, dtype=np.float64)
+
+        # The contributions of the motions can only be separated if their
+        # frequencies differ by more than the resolution of the record
+        if len(omegas) > 1:
+            resolution = 2*np.pi/(len(series[0])*delta_t)
+            if np.min(np.diff(np.sort(omegas))) < resolution:
+                msg = 'The motions must be excited at different frequencies, separated by '
+                msg += 'at least 2*pi/duration = ' + str(resolution) + ' rad/s. '
+                msg += 'Frequencies provided: ' + str(omegas.tolist())[1:-1] + '.'
+                raise Exception(msg)
+
+        return omegas
+
+
     def _fill_with_default_notation(self,notation):
 
         # Use default notation if none was provied
@@ -250,36 +894,146 @@ class FlutterDerivatives():
         return(sim_params)
         
 
-    def _calculate_derivative_pair_from_forced_motion(self, sim_params, m_name, f_name, data):
+    def _calculate_derivative_pair_from_forced_motion(self, sim_params, m_name, f_name, motion_fit, force_fit):
+
+        # Fitted parameters (params, covariance, residual norm) of
+        # motion = ampl*sin(omega*t + phi)
+        # force = a + b*cos(omega*t) + c*sin(omega*t)
+        (motion_ampl, phi), _, motion_residual_norm = motion_fit
+        (_, b, c), _, force_residual_norm = force_fit
+        omega = sim_params['omega']
 
-        # Extract the corresponding motion and force time-series
-        motion = data[m_name]
-        force = data[f_name]
+        # Calculating the derivative values and the 'x-axis' values
+        derivs_to_calc = self._get_derivatives_to_calculate(m_name, f_name)
+        ratio = self._force_motion_ratio(motion_ampl, phi, b, c)
+        values_0, values_1, Ured = self._derivative_pair_values(m_name, f_name, sim_params, omega, ratio)
+        std_0, std_1 = self._derivative_pair_std(m_name, f_name, sim_params, motion_fit, force_fit)
+
+        # Return the values, their standard deviations and the fit diagnostics of this pair
+        values = {derivs_to_calc[0]: values_0, derivs_to_calc[1]: values_1}
+        std = {derivs_to_calc[0]: std_0, derivs_to_calc[1]: std_1}
+        diagnostics = {'omega': omega, 'Ured': Ured, 'motion_amplitude': motion_ampl, 'motion_phase': phi,
+            'motion_residual_norm': motion_residual_norm, 'force_residual_norm': force_residual_norm}
+
+        return values, std, diagnostics
+
+
+    def _bootstrap_block_size(self, omegas, delta_t):
+
+        # Samples of cycles_per_block cycles of the slowest motion
+        period = 2*np.pi/np.min(omegas)
+        return max(int(round(self.bootstrap['cycles_per_block']*period/delta_t)), 1)
+
+
+    def _bootstrap_std(self, sim_params, m_names, f_names, omegas, block_grams, block_xty):
+
+        # Standard deviations of the derivatives of a run over the bootstrap
+        # resamples of its blocks ({deriv: one value per motion}). The series
+        # are the motions followed by the forces; the motions are fitted
+        # without the constant term, as in the point estimate.
+        n_blocks, n_columns, _ = block_grams.shape
+        n_motions = len(m_names)
+        counts = bootstrap_counts(n_blocks, self.bootstrap['n_resamples'], self.bootstrap['seed'])
+        motion_coeffs = resampled_coefficients(counts, block_grams, block_xty, np.arange(1, n_columns))
+        force_coeffs = resampled_coefficients(counts, block_grams, block_xty, np.arange(n_columns))
+
+        std = {}
+        for m_index, m_name in enumerate(m_names):
+            # cos (b) and sin (c) coefficients of the harmonic of this motion
+            motion = motion_coeffs[:,1+2*m_index,m_index] + 1j*motion_coeffs[:,2*m_index,m_index]
+            pair_sim_params = dict(sim_params, omega=omegas[m_index])
+            for f_index, f_name in enumerate(f_names):
+                force = force_coeffs[:,2+2*m_index,n_motions+f_index] + 1j*force_coeffs[:,1+2*m_index,n_motions+f_index]
+                derivs_to_calc = self._get_derivatives_to_calculate(m_name, f_name)
+                values_0, values_1, _ = self._derivative_pair_values(m_name, f_name, pair_sim_params,
+                    omegas[m_index], force/motion)
+                for deriv, deriv_values in zip(derivs_to_calc, (values_0, values_1)):
+                    std.setdefault(deriv, np.full(n_motions, np.nan))[m_index] = np.std(deriv_values, ddof=1)
+
+        return std
+
+
+    def _store_run_results(self, Ured, omega, amplitude, values, diagnostics, runs=None, std=None):
+
+        # Append rows to the table ({deriv: values} with one value per row,
+        # and optionally their standard deviations) and the fit diagnostics
+        # of each run. By default there is one row per run; if not, 'runs'
+        # gives the run of each row (counting from the first new run).
+        if runs is None:
+            runs = np.arange(len(diagnostics))
+        runs = np.asarray(runs) + len(self.run_diagnostics)
+        self.table.append(runs, Ured, omega, amplitude, values, std)
+        self.run_diagnostics.extend(diagnostics)
+        self._clear_caches()
+
+
+    def _merge_run_results(self, run_results):
+
+        # Append the compact results (table rows and diagnostics)
+        # of one or several runs computed elsewhere
+        rows = run_results['rows']
+        values = {deriv: rows[deriv] for deriv in base_derivative_names}
+        std = {deriv: rows[deriv+'_std'] for deriv in base_derivative_names if deriv+'_std' in rows}
+        runs = rows['run'] + len(self.run_diagnostics)
+        self.table.append(runs, rows['Ured'], rows['omega'], rows['amplitude'], values, std)
+        if self.profiler is not None:
+            for record in run_results.get('profile', []):
+                if record['run'] is not None:
+                    record['run'] += len(self.run_diagnostics)
+                self.profiler.add_record(record)
+        self.run_diagnostics.extend(run_results['diagnostics'])
+        self._clear_caches()
+
+
+    def _get_run_results(self, first_row, first_run):
+
+        # Compact results (table rows and diagnostics) of the runs processed
+        # after the given row and run, in the format of _merge_run_results
+        rows = {name: column[first_row:len(self.table)].copy() for name, column in self.table.columns.items()}
+        rows['run'][rows['run'] >= 0] -= first_run
+
+        return {'rows': rows, 'diagnostics': self.run_diagnostics[first_run:]}
+
+
+    def _run_cache_key(self, kwargs):
+
+        # Hash of the time series, the parameters (with their default values),
+        # the settings affecting the results and the extraction code version
+        sim_params = {param: self.default_sim_params.get(param) for param in self.sim_param_keys}
+        series = {}
+        for name, value in kwargs.items():
+            if name in ('heave', 'pitch', 'sway', 'lift', 'moment', 'drag'):
+                series[name] = load_time_series(value)
+            else:
+                sim_params[name] = value
+        params = {'sim_params': sim_params, 'version': extraction_version, 'chunk_size': self.chunk_size,
+            'max_estimation_samples': self.max_estimation_samples, 'bootstrap': self.bootstrap,
+            'preprocessing': self.preprocessing}
 
-        # Create the time time-series
-        # It is just necessary to respect the time step
-        # (the absolute value is not important, it will be shifted later). 
-        time = [i*sim_params['delta_t'] for i in range(len(motion))]
+        return hash_run(series, params)
 
-        # Calculate the amplitude and phase of the motion
-        if sim_params['omega'] == None:
-            motion_ampl, phi, omega = util.extract_sinusoidal_parameters(time, motion)
-        else:
-            omega = sim_params['omega']
-            motion_ampl, phi = util.extract_sinusoidal_parameters(time, motion, omega=omega)
 
-        # Shift time series to ensure that the motion has no phase
-        # (just a pure sinusoidal).
-        time_lag = phi/omega
-        time += time_lag
+    def _clear_caches(self):
 
-        # Fit the sine+cosine function
-        # force = a + b*cos(omega*t) + c*sin(omega*t)
-        _, b, c = util.extract_sinusoidal_parameters(time, force, omega=omega, function='sin_cos')
+        # The converted data and the fitted functions are no longer valid
+        self._notation_cache.clear()
+        self._fit_cache.clear()
 
-        # Get the names of the derivatives asociated
-        # with this particular motion and force directions
-        derivs_to_calc = self._get_derivatives_to_calculate(m_name, f_name)
+
+    @staticmethod
+    def _force_motion_ratio(motion_ampl, phi, b, c):
+
+        # Shifting the time so that the motion has no phase (pure sinusoidal)
+        # rotates the force coefficients by the motion phase:
+        #   (c + i*b)_shifted = (c + i*b) * exp(-i*phi)
+        # Dividing by the motion amplitude gives the complex ratio
+        # force/motion, whose imaginary and real parts are b/ampl and c/ampl
+        # in the shifted time. Works element-wise on arrays.
+        return (c + 1j*b) * np.exp(-1j*phi) / motion_ampl
+
+
+    @staticmethod
+    def _derivative_pair_values(m_name, f_name, sim_params, omega, ratio):
 
         # Calculation of the flutter derivatives
         #       parameter             factor_0             factor_1      factor_2
@@ -291,30 +1045,49 @@ class FlutterDerivatives():
         # m4       c*B      *    2/(dens*U^2*B*ampl)   *     1/B     *      1
         # m5    b*U/omega   *    2/(dens*U^2*B*ampl)   *     1/B     *     1/B
         # m6       c*B      *    2/(dens*U^2*B*ampl)   *     1/B     *     1/B
-        f0 = 2/(sim_params['fluid_dens']*sim_params['U']**2*sim_params['B']**2*motion_ampl)
+        # with b/ampl and c/ampl given by the imaginary and real parts of the ratio.
+        # All the inputs can be scalars or arrays (one value per run).
+        U = sim_params['U']
+        B = sim_params['B']
+        f0 = 2/(sim_params['fluid_dens']*U**2*B)
         if m_name == 'pitch':
-            f1= 1/sim_params['B']
+            f1= 1/B
         else:
             f1 = 1
         if f_name == 'moment':
-            f2 = 1/sim_params['B']
+            f2 = 1/B
         else:
             f2 = 1
-        
-        # Calculating and saving derivative values
-        self.fd_data[derivs_to_calc[0]]['values'].append(b*sim_params['U']/omega * f0 * f1 * f2)
-        self.fd_data[derivs_to_calc[1]]['values'].append(c*sim_params['B'] * f0 * f1 * f2)
+
+        values_0 = np.imag(ratio)*U/omega * f0 * f1 * f2
+        values_1 = np.real(ratio)*B * f0 * f1 * f2
 
         # Calculating 'x-axis' values (the derivatives depend on them)
         freq = omega/2/np.pi
-        Ured = sim_params['U']/freq/sim_params['B']
+        Ured = U/freq/B
+
+        return values_0, values_1, Ured
+
 
-        # Saving 'x-axis' data
-        self.fd_data[derivs_to_calc[0]]['Ured'].append(Ured)
-        self.fd_data[derivs_to_calc[1]]['Ured'].append(Ured)
+    @staticmethod
+    def _derivative_pair_std(m_name, f_name, sim_params, motion_fit, force_fit):
 
+        # Standard deviations of a pair of derivatives from the covariances of
+        # the motion fit (amplitude, phase) and the force fit (a, b, c). The
+        # derivatives are linear in the real and imaginary parts of the ratio,
+        # so the same scaling applies to their standard deviations.
+        (motion_ampl, phi), motion_cov, _ = motion_fit
+        (_, b, c), force_cov, _ = force_fit
+        motion_coeffs, motion_cov = amplitude_phase_to_cos_sin(motion_ampl, phi, motion_cov)
+        ratio_std = ratio_standard_deviation(motion_coeffs, motion_cov, np.array([b, c]), force_cov[1:,1:])
+        std_0, std_1, _ = FlutterDerivatives._derivative_pair_values(m_name, f_name, sim_params,
+            sim_params['omega'], ratio_std)
 
-    def _get_derivatives_to_calculate(self, m_name, f_name):
+        return np.abs(std_0), np.abs(std_1)
+
+
+    @staticmethod
+    def _get_derivatives_to_calculate(m_name, f_name):
         # Each combination between motion (heave, pitch, sway) and
         # force (lift, moment, drag) has some derivatives associated
         # This function returns the corresponding derivative names
@@ -337,4 +1110,26 @@ class FlutterDerivatives():
         derivs_to_calc = [letter+str(numbers[0]), letter+str(numbers[1])]
 
         return derivs_to_calc
-            
\ No newline at end of file
+
+
+# Worker for the parallel processing of forced motion runs
+def _process_forced_motion_run(run, default_sim_params, settings, loader=None):
+
+    # Process the run with the serial code path (and the same settings)
+    fd = FlutterDerivatives()
+    fd.set_default_parameters(**default_sim_params)
+    for setting, value in settings.items():
+        setattr(fd, setting, value)
+
+    if loader is not None:
+        with fd._stage('read', 0):
+            run = loader(run)
+    fd.calculate_derivatives_from_forced_motion(**run)
+
+    run_results = {'rows': fd.table.rows(), 'diagnostics': fd.run_diagnostics}
+    if fd.profiler is not None:
+        for record in fd.profiler.records:
+            record['worker'] = os.getpid()
+        run_results['profile'] = fd.profiler.records
+
+    return run_results
@@ -2,50 +2,62 @@
 import numpy as np
 
 
-def complex2real_notation(fd_complex):
-
-    fd_real = {'H1':{'values':[],'U_red':[]},
-        'H2':{'values':[],'U_red':[]},
-        'H3':{'values':[],'U_red':[]},
-        'H4':{'values':[],'U_red':[]},
-        'A1':{'values':[],'U_red':[]},
-        'A2':{'values':[],'U_red':[]},
-        'A3':{'values':[],'U_red':[]},
-        'A4':{'values':[],'U_red':[]}}
-    
-    for letter_1 in 'ha':
+# Real derivatives given by the imaginary and real parts of each complex
+# coefficient c_xy (x: force, y: motion; h: heave, a: pitch, p: sway), and
+# the factor of the coefficient (0.5 for each pitch index):
+#   imaginary derivative = pi/2*factor*Im(c_xy),  real derivative = pi/2*factor*Re(c_xy)
+complex_real_relations = {
+    'c_hh': ('H1', 'H4', 1),   'c_ha': ('H2', 'H3', 0.5),  'c_hp': ('H5', 'H6', 1),
+    'c_ah': ('A1', 'A4', 0.5), 'c_aa': ('A2', 'A3', 0.25), 'c_ap': ('A5', 'A6', 0.5),
+    'c_ph': ('P5', 'P6', 1),   'c_pa': ('P2', 'P3', 0.5),  'c_pp': ('P1', 'P4', 1)
+}
 
-        if letter_1 == 'a':
-            factor_1 = 0.5
-            deriv_letter = 'A'
-        else:
-            factor_1 = 1
-            deriv_letter = 'H'
 
-        for letter_2 in 'ha':
-            
-            if letter_2 == 'a':
-                factor_2 = 0.5
-                deriv_numbers = [2,3]
-            else:
-                factor_2 = 1
-                deriv_numbers = [1,4]
+def complex2real_notation(fd_complex):
 
-            for input_value, k in zip(fd_complex['c_'+letter_1+letter_2]['values'], fd_complex['c_'+letter_1+letter_2]['k']):
+    # Real derivatives (values and U_red = pi/k) of all the complex
+    # coefficients in the input, {c_xy: {'values': array, 'k': array}}.
+    # Each coefficient is converted in a single vectorized operation.
+    fd_real = {}
 
-                U_red = np.pi / k
+    for coefficient, (imag_deriv, real_deriv, factor) in complex_real_relations.items():
+        if coefficient not in fd_complex:
+            continue
 
-                output_values = np.array([np.imag(input_value), np.real(input_value)]) * np.pi * 0.5 * factor_1 * factor_2
+        values = np.asarray(fd_complex[coefficient]['values'], dtype=np.complex128) * (np.pi*0.5*factor)
+        U_red = np.pi / np.asarray(fd_complex[coefficient]['k'], dtype=np.float64)
+        if values.shape != U_red.shape:
+            msg = "The values and k of the coefficient '" + coefficient + "' must have the same length."
+            raise Exception(msg)
 
-                for output_value, deriv_number in zip(output_values, deriv_numbers):
-                    fd_real[deriv_letter+str(deriv_number)]['values'].append(output_value)
-                    fd_real[deriv_letter+str(deriv_number)]['U_red'].append(U_red)
+        fd_real[imag_deriv] = {'values': values.imag.copy(), 'U_red': U_red}
+        fd_real[real_deriv] = {'values': values.real.copy(), 'U_red': U_red}
     
     return fd_real
                 
 
 def real2complex_notation(fd_real):
-    pass
+
+    # Inverse of complex2real_notation: each complex coefficient c_xy is
+    # obtained from the pair of real derivatives with the same U_red,
+    #   c_xy = (real derivative + i*imaginary derivative) / (pi/2*factor),
+    # with k = pi/U_red. Only the coefficients with both derivatives are given.
+    fd_complex = {}
+
+    for coefficient, (imag_deriv, real_deriv, factor) in complex_real_relations.items():
+        if imag_deriv not in fd_real or real_deriv not in fd_real:
+            continue
+
+        U_red = np.asarray(fd_real[real_deriv]['U_red'], dtype=np.float64)
+        if not np.array_equal(np.asarray(fd_real[imag_deriv]['U_red'], dtype=np.float64), U_red):
+            msg = "The derivatives '" + imag_deriv + "' and '" + real_deriv
+            msg += "' must have the same U_red values."
+            raise Exception(msg)
+
+        values = np.asarray(fd_real[real_deriv]['values']) + 1j*np.asarray(fd_real[imag_deriv]['values'])
+        fd_complex[coefficient] = {'values': values / (np.pi*0.5*factor), 'k': np.pi / U_red}
+
+    return fd_complex
 
 
 if __name__ == '__main__':
@@ -0,0 +1,195 @@
+
+import io
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+# Formats of the text tables with time histories (read_table):
+#   'openfoam':   forces.dat/moment.dat of the OpenFOAM forces function object,
+#                 with the column names in the last comment line of the header
+#                 (vectors written as '(x y z)' in older versions are split).
+#   'csv':        comma-separated values, optionally with a row of names.
+#   'whitespace': whitespace-delimited data (e.g. DAQ exports), optionally
+#                 with a row of names.
+table_formats = ['openfoam', 'csv', 'whitespace']
+
+
+def load_time_series(source, dtype=np.float64, offset=0):
+
+    # Return a 1-D array-like object with the time series, without reading
+    # the data into memory when it comes from a file:
+    #   - numpy arrays and memory maps are returned as they are.
+    #   - '.npy' files are opened as read-only memory maps.
+    #   - Any other file is read as raw binary data of the given dtype,
+    #     starting at 'offset' bytes (also as a read-only memory map).
+    #   - Lists and other sequences are converted to numpy arrays.
+    if isinstance(source, np.ndarray):
+        series = source
+
+    elif isinstance(source, (str, os.PathLike)):
+        if not os.path.isfile(source):
+            msg = "The time series file '" + str(source) + "' does not exist."
+            raise Exception(msg)
+
+        if str(source).endswith('.npy'):
+            series = np.load(source, mmap_mode='r')
+        else:
+            series = np.memmap(source, dtype=dtype, mode='r', offset=offset)
+
+    else:
+        series = np.asarray(source, dtype=np.float64)
+
+    if series.ndim != 1:
+        msg = 'The time series must be one-dimensional. '
+        msg += 'An array with shape ' + str(series.shape) + ' was provided.'
+        raise Exception(msg)
+
+    return series
+
+
+def read_table(path, columns, format=None, comments='#', block_size=2**24):
+
+    # Read the selected columns of a text table of time histories as
+    # {name: array}. 'columns' maps each name (heave, pitch, sway, lift,
+    # moment, drag, time...) to a column, given by its index or its name in
+    # the header, optionally with a scale factor: {'lift': ('total_y', -1.0)}.
+    # The format is guessed if not given: 'csv' for '.csv' files, 'openfoam'
+    # for '.dat' files or headers with a '# Time ...' comment line, and
+    # 'whitespace' otherwise. The file is
+    # parsed in bulk, by blocks of block_size bytes, while a background
+    # thread reads the next block.
+    if not os.path.isfile(path):
+        msg = "The file '" + str(path) + "' does not exist."
+        raise Exception(msg)
+    if format is None:
+        format = _guess_format(path, comments)
+    if format not in table_formats:
+        msg = "The format '" + str(format) + "' is not recognised. "
+        msg += 'Choose one of the following: ' + str(table_formats)[1:-1] + '.'
+        raise Exception(msg)
+    delimiter = ',' if format == 'csv' else None
+
+    with open(path, 'rb') as file:
+        header, data_start = _read_header(file, format, comments, delimiter)
+    indices, scales = _column_indices(columns, header, path, format)
+
+    # Parsing only the needed columns of each block
+    usecols = sorted(set(indices.values()))
+    parsed = []
+    for block in prefetch(_read_blocks(path, data_start, block_size)):
+        if format == 'openfoam':
+            block = block.translate(_vector_delimiters)
+        parsed.append(np.loadtxt(io.BytesIO(block), delimiter=delimiter, comments=comments,
+            usecols=usecols, ndmin=2))
+    data = np.concatenate(parsed) if len(parsed) > 0 else np.zeros((0, len(usecols)))
+
+    return {name: scales[name]*data[:,usecols.index(index)] for name, index in indices.items()}
+
+
+def prefetch(iterable, n_prefetch=1):
+
+    # Iterate over 'iterable' while a background thread produces the next
+    # n_prefetch items, so reading files overlaps with the computations done
+    # with the current item. Exceptions are raised in the caller.
+    iterator = iter(iterable)
+    done = object()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        futures = deque(executor.submit(next, iterator, done) for _ in range(n_prefetch))
+        while True:
+            item = futures.popleft().result()
+            if item is done:
+                return
+            futures.append(executor.submit(next, iterator, done))
+            yield item
+
+
+# Parentheses of the vectors of older OpenFOAM versions
+_vector_delimiters = bytes.maketrans(b'()', b'  ')
+
+
+def _read_header(file, format, comments, delimiter):
+
+    # Column names (None if there are none) and the position of the first
+    # data line. The names are taken from the last comment line before the
+    # data (OpenFOAM) or from a first line which is not numeric.
+    header = None
+    while True:
+        position = file.tell()
+        line = file.readline()
+        if len(line) == 0:
+            return header, position
+        text = line.decode(errors='replace').strip()
+        if len(text) == 0:
+            continue
+        if text.startswith(comments):
+            if format == 'openfoam':
+                header = text[len(comments):].split()
+            continue
+        names = [name.strip() for name in text.split(delimiter)]
+        try:
+            float(names[0].strip('('))
+        except ValueError:
+            return names, file.tell()
+        return header, position
+
+
+def _guess_format(path, comments):
+
+    if str(path).endswith('.csv'):
+        return 'csv'
+    if str(path).endswith('.dat'):
+        return 'openfoam'
+
+    # Comment lines before the data, looking for the OpenFOAM header
+    with open(path, 'rb') as file:
+        for line in file:
+            text = line.decode(errors='replace').strip()
+            if len(text) == 0:
+                continue
+            if not text.startswith(comments):
+                break
+            if text[len(comments):].split()[:1] == ['Time']:
+                return 'openfoam'
+
+    return 'whitespace'
+
+
+def _column_indices(columns, header, path, format):
+
+    # Index and scale factor of each column
+    indices = {}
+    scales = {}
+    for name, column in columns.items():
+        column, scales[name] = column if isinstance(column, tuple) else (column, 1.0)
+        if isinstance(column, str):
+            if header is None or column not in header:
+                msg = "The column '" + column + "' is not in the file '" + str(path) + "'. "
+                msg += 'Available columns: ' + ('none (use indices)' if header is None else str(header)[1:-1]) + '.'
+                if header is None and format != 'openfoam':
+                    msg += " Names in a comment line are only read with the format 'openfoam'."
+                raise Exception(msg)
+            column = header.index(column)
+        indices[name] = int(column)
+
+    return indices, scales
+
+
+def _read_blocks(path, start, block_size):
+
+    # Blocks of whole lines of the file, from the byte 'start'
+    with open(path, 'rb') as file:
+        file.seek(start)
+        remainder = b''
+        while True:
+            data = file.read(block_size)
+            if len(data) == 0:
+                break
+            data = remainder + data
+            end = data.rfind(b'\n') + 1
+            remainder = data[end:]
+            if end > 0:
+                yield data[:end]
+        if len(remainder.strip()) > 0:
+            yield remainder
@@ -0,0 +1,58 @@
+
+# Generated by notation.write_notation_tables() from _notation_definition.py.
+# Do not edit by hand.
+# {notation: {derivative: [(base derivative, power of Ured, coefficient), ...]}}
+
+notation_tables = {
+    'scanlan': {
+        'H1': [('l3', 1, 0.15915494309189535)],
+        'H2': [('l5', 1, 0.15915494309189535)],
+        'H3': [('l6', 2, 0.025330295910584444)],
+        'H4': [('l4', 2, 0.025330295910584444)],
+        'H5': [('l1', 1, 0.15915494309189535)],
+        'H6': [('l2', 2, 0.025330295910584444)],
+        'A1': [('m3', 1, 0.15915494309189535)],
+        'A2': [('m5', 1, 0.15915494309189535)],
+        'A3': [('m6', 2, 0.025330295910584444)],
+        'A4': [('m4', 2, 0.025330295910584444)],
+        'A5': [('m1', 1, 0.15915494309189535)],
+        'A6': [('m2', 2, 0.025330295910584444)],
+        'P1': [('d1', 1, 0.15915494309189535)],
+        'P2': [('d5', 1, 0.15915494309189535)],
+        'P3': [('d6', 2, 0.025330295910584444)],
+        'P4': [('d2', 2, 0.025330295910584444)],
+        'P5': [('d3', 1, 0.15915494309189535)],
+        'P6': [('d4', 2, 0.025330295910584444)],
+    },
+    'classic': {
+        'H1': [('l3', 1, 0.07957747154594767)],
+        'H2': [('l5', 1, 0.07957747154594767)],
+        'H3': [('l6', 2, 0.012665147955292222)],
+        'H4': [('l4', 2, 0.012665147955292222)],
+        'H5': [('l1', 1, 0.07957747154594767)],
+        'H6': [('l2', 2, 0.012665147955292222)],
+        'A1': [('m3', 1, 0.07957747154594767)],
+        'A2': [('m5', 1, 0.07957747154594767)],
+        'A3': [('m6', 2, 0.012665147955292222)],
+        'A4': [('m4', 2, 0.012665147955292222)],
+        'A5': [('m1', 1, 0.07957747154594767)],
+        'A6': [('m2', 2, 0.012665147955292222)],
+        'P1': [('d1', 1, 0.07957747154594767)],
+        'P2': [('d5', 1, 0.07957747154594767)],
+        'P3': [('d6', 2, 0.012665147955292222)],
+        'P4': [('d2', 2, 0.012665147955292222)],
+        'P5': [('d3', 1, 0.07957747154594767)],
+        'P6': [('d4', 2, 0.012665147955292222)],
+    },
+    'starossek': {
+        'c_hh': [('l3', 1, 0.10132118364233778j), ('l4', 2, 0.016125767216599744)],
+        'c_ha': [('l5', 1, 0.20264236728467555j), ('l6', 2, 0.03225153443319949)],
+        'c_hp': [('l1', 1, 0.10132118364233778j), ('l2', 2, 0.016125767216599744)],
+        'c_ah': [('m3', 1, 0.20264236728467555j), ('m4', 2, 0.03225153443319949)],
+        'c_aa': [('m5', 1, 0.4052847345693511j), ('m6', 2, 0.06450306886639898)],
+        'c_ap': [('m1', 1, 0.20264236728467555j), ('m2', 2, 0.03225153443319949)],
+        'c_ph': [('d3', 1, 0.10132118364233778j), ('d4', 2, 0.016125767216599744)],
+        'c_pa': [('d5', 1, 0.20264236728467555j), ('d6', 2, 0.03225153443319949)],
+        'c_pp': [('d1', 1, 0.10132118364233778j), ('d2', 2, 0.016125767216599744)],
+    },
+}
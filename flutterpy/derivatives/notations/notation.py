@@ -1,81 +1,212 @@
 
 import numpy as np
-import sympy as sym
 
-from ._notation_definition import notation_settings
+from ._notation_tables import notation_tables
 
 class Notation():
 
-    def __init__(self, name, relations):
+    def __init__(self, name, terms):
 
+        # The relations are given as the terms of the linear combination
+        # of base derivatives: {deriv: [(base deriv, power of Ured, coefficient), ...]}
         self.name = name
-        self.relations = relations
+        self.terms = terms
 
         self.base_derivs = []
         for letter in 'dlm':
             for number in range(1,7):
                 self.base_derivs.append(letter+str(number))
-                
+
+        # Compile the relations once into coefficient matrices
+        self._compile_relations()
+
+    @property
+    def relations(self):
+
+        # Symbolic relations (sympy is only loaded when they are requested)
+        from ._notation_definition import notation_settings
+
+        for notation in notation_settings:
+            if notation['name'] == self.name:
+                return notation['relations']
+
+    def transform_matrices(self, Ureds, matrices=None):
+
+        # Matrices T(Ured) with shape (n_Ured, components, base derivatives)
+        # such that components = T(Ured) @ base derivatives at each Ured.
+        # The coefficient matrices of a block can be given instead of the full ones.
+        if matrices is None:
+            matrices = self.matrices
+        Ureds = np.asarray(Ureds, dtype=np.float64)[:,np.newaxis,np.newaxis]
+
+        return sum(Ureds**power * matrix for power, matrix in matrices.items())
+
     def convert(self,fd_in):
 
-        # Initialize the output set of derivatives
+        # Initialize the output set of derivatives. The standard deviations
+        # ('std') are converted too when all the inputs have them, assuming
+        # independent errors: var_out = T^2 @ var_in (element-wise square).
+        # Complex derivatives have the standard deviations of their real and
+        # imaginary parts as the real and imaginary parts of 'std'.
         fd_out = {}
 
-        for deriv in self.relations:
-
-            # Initialize the corresponding derivative in the output set
-            fd_out[deriv] = {'values':[], 'Ured':[]}
-
-            # Take the formula defining this derivative
-            formula = self.relations[deriv]
-
-            # Check which base derivatives are in the formula
-            base_derivs_needed = []
-            for base_deriv in self.base_derivs:
-                if  formula.has(sym.sympify(base_deriv)):
-                    base_derivs_needed.append(base_deriv)
-
-            # Obtain Ured (x-axis) data
-            Ureds = fd_in[base_derivs_needed[0]]['Ured']
-            
-            # Check that the Ureds of the needed derivatives are identical
-            if len(base_derivs_needed) > 1:
-                for base_deriv in base_derivs_needed[1:]:
-                    if fd_in[base_deriv]['Ured'] != Ureds:
-                        msg = "The derivative '" + deriv + "' requires values from "
-                        msg += 'several base derivatives (' + str(base_derivs_needed)[1:-1]
-                        msg += ') which do not have the same U_red values (x-axis data). '
-                        msg += 'It is thus impossible to convert the data into the '
-                        msg += "'" + self.name + "' notation without losing information."
-                        raise Exception(msg)
-
-            # Calculate the values for each Ured
-            for index, Ured in enumerate(Ureds):
-
-                # Substitute the formula and evaluate
-                deriv_value = formula.subs(sym.sympify('Ured'), Ured)
-                for base_deriv in base_derivs_needed:
-                    value = fd_in[base_deriv]['values'][index]
-                    deriv_value = deriv_value.subs(sym.sympify(base_deriv), value)
-                deriv_value = deriv_value.evalf()
-                
-                # Convert to standard python complex (if it is a complex number)
-                if deriv_value.has(sym.I):
-                    deriv_value = complex(deriv_value)
-
-                # Fill the values of the new derivative
-                fd_out[deriv]['values'].append(deriv_value)
-            
-            # Fill the Ured data
-            fd_out[deriv]['Ured'] = Ureds
+        for derivs, columns, matrices in self.blocks:
 
-        return fd_out
+            # Obtain Ured (x-axis) data, which must be the same for all the
+            # base derivatives of the block
+            base_derivs_needed = [self.base_derivs[column] for column in columns]
+            Ureds = self._common_Ured(fd_in, base_derivs_needed, derivs)
+
+            # Evaluate the relations for all the Ured values at once:
+            # components = sum(Ured**power * values @ matrix^T)
+            values = np.stack([np.asarray(fd_in[base_deriv]['values'], dtype=np.float64)
+                for base_deriv in base_derivs_needed], axis=-1)
+            components = sum(Ureds[:,np.newaxis]**power * (values @ matrix.T) for power, matrix in matrices.items())
+
+            std_components = None
+            if all('std' in fd_in[base_deriv] for base_deriv in base_derivs_needed):
+                std = np.stack([np.asarray(fd_in[base_deriv]['std'], dtype=np.float64)
+                    for base_deriv in base_derivs_needed], axis=-1)
+                std_components = _propagate_std(self.transform_matrices(Ureds, matrices), std)
+
+            # Fill the new derivatives
+            fd_out.update(self._components_to_derivatives(derivs, components, Ureds, std_components))
+
+        # Same order as in the relations
+        return {deriv: fd_out[deriv] for deriv in self.terms}
     
     def deconvert(self,fd_in):
 
-        # TODO: implement inverse convert
+        # Inverse conversion, from this notation to the base derivatives.
+        # Each block of derivatives is solved independently, so blocks
+        # without data give empty base derivatives.
+        fd_out = {base_deriv: {'values': np.zeros(0), 'Ured': np.zeros(0)} for base_deriv in self.base_derivs}
+
+        for derivs, columns, matrices in self.blocks:
+
+            available = [deriv for deriv in derivs if deriv in fd_in and len(fd_in[deriv]['values']) > 0]
+            if len(available) == 0:
+                continue
+            if len(available) < len(derivs) or len(self._component_rows(derivs)) != len(columns):
+                msg = 'The base derivatives ' + str([self.base_derivs[column] for column in columns])[1:-1]
+                msg += " can only be obtained from the derivatives " + str(derivs)[1:-1]
+                msg += " of the '" + self.name + "' notation all together."
+                raise Exception(msg)
+
+            Ureds = self._common_Ured(fd_in, derivs, derivs)
+            components = self._derivatives_to_components(fd_in, derivs)
+            transform = self.transform_matrices(Ureds, matrices)
+            if len(columns) == 1:
+                inverse = 1/transform
+                values = components * inverse[:,0]
+            else:
+                inverse = np.linalg.inv(transform)
+                values = (inverse @ components[...,np.newaxis])[...,0]
+
+            std = None
+            if all('std' in fd_in[deriv] for deriv in derivs):
+                std = _propagate_std(inverse, self._derivatives_to_components(fd_in, derivs, 'std'))
+
+            for index, column in enumerate(columns):
+                fd_out[self.base_derivs[column]] = {'values': values[:,index], 'Ured': Ureds}
+                if std is not None:
+                    fd_out[self.base_derivs[column]]['std'] = std[:,index]
+
+        return fd_out
 
-        fd_out = fd_in
+    def _compile_relations(self):
+
+        # Real components of the notation: one per real derivative and two
+        # (real and imaginary parts) per complex derivative, as (deriv, part)
+        self.components = []
+        for deriv, terms in self.terms.items():
+            if any(isinstance(coefficient, complex) for _, _, coefficient in terms):
+                self.components.extend([(deriv, 'real'), (deriv, 'imag')])
+            else:
+                self.components.append((deriv, None))
+
+        # Coefficient matrices of each power of Ured: {power: (components, base derivs)},
+        # so T(Ured) = sum(Ured**power * matrix)
+        self.matrices = {0: np.zeros((len(self.components), len(self.base_derivs)))}
+        for row, (deriv, part) in enumerate(self.components):
+            for base_deriv, power, coefficient in self.terms[deriv]:
+                if power not in self.matrices:
+                    self.matrices[power] = np.zeros((len(self.components), len(self.base_derivs)))
+                coefficient = complex(coefficient)
+                value = coefficient.imag if part == 'imag' else coefficient.real
+                self.matrices[power][row, self.base_derivs.index(base_deriv)] += value
+
+        # Blocks of derivatives related to the same base derivatives, which
+        # are converted independently: (derivs, base columns, coefficient
+        # matrices of the block for each power of Ured)
+        groups = []
+        for deriv, terms in self.terms.items():
+            derivs = [deriv]
+            columns = {self.base_derivs.index(base_deriv) for base_deriv, _, _ in terms}
+            for group in [group for group in groups if group[1] & columns]:
+                groups.remove(group)
+                derivs = group[0] + derivs
+                columns |= group[1]
+            groups.append((derivs, columns))
+
+        self.blocks = []
+        for derivs, columns in groups:
+            rows = self._component_rows(derivs)
+            columns = np.array(sorted(columns))
+            matrices = {power: matrix[rows][:,columns] for power, matrix in self.matrices.items()
+                if np.any(matrix[rows][:,columns] != 0)}
+            self.blocks.append((derivs, columns, matrices))
+
+    def _component_rows(self, derivs):
+
+        return [row for row, (deriv, _) in enumerate(self.components) if deriv in derivs]
+
+    def _common_Ured(self, fd_in, derivs_needed, derivs_out):
+
+        # Check that the Ureds of the needed derivatives are identical
+        Ureds = np.asarray(fd_in[derivs_needed[0]]['Ured'], dtype=np.float64)
+        for deriv in derivs_needed[1:]:
+            if not np.array_equal(fd_in[deriv]['Ured'], Ureds):
+                msg = 'The derivatives ' + str(derivs_out)[1:-1] + ' require values from '
+                msg += 'several derivatives (' + str(derivs_needed)[1:-1]
+                msg += ') which do not have the same U_red values (x-axis data). '
+                msg += 'It is thus impossible to convert the data '
+                msg += 'without losing information.'
+                raise Exception(msg)
+
+        return Ureds
+
+    def _derivatives_to_components(self, fd_in, derivs, key='values'):
+
+        # Array (n_Ured, components) with the real components of the derivatives
+        # (or of their standard deviations, with key='std')
+        components = []
+        for deriv, part in self.components:
+            if deriv in derivs:
+                values = np.asarray(fd_in[deriv][key])
+                if part == 'imag':
+                    components.append(np.imag(values))
+                else:
+                    components.append(np.real(values))
+
+        return np.stack(components, axis=-1).astype(np.float64)
+
+    def _components_to_derivatives(self, derivs, components, Ureds, std_components=None):
+
+        # Inverse of _derivatives_to_components (with the standard deviations
+        # of the components, if given)
+        fd_out = {}
+        rows = self._component_rows(derivs)
+        for index, row in enumerate(rows):
+            deriv, part = self.components[row]
+            if part is None:
+                fd_out[deriv] = {'values': components[:,index].copy(), 'Ured': Ureds}
+                if std_components is not None:
+                    fd_out[deriv]['std'] = std_components[:,index].copy()
+            elif part == 'real':
+                fd_out[deriv] = {'values': components[:,index] + 1j*components[:,index+1], 'Ured': Ureds}
+                if std_components is not None:
+                    fd_out[deriv]['std'] = std_components[:,index] + 1j*std_components[:,index+1]
 
         return fd_out
 
@@ -88,7 +219,29 @@ class Notation():
 
 
 def notation2notation(fd_in, notation_in, notation_out):
-    
+
+    _check_notation_key(notation_in)
+    _check_notation_key(notation_out)
+
+    # Direct conversion when all the derivatives share the same Ured:
+    # a batched product with T_out(Ured) @ inverse(T_in(Ured))
+    if 'base' not in (notation_in, notation_out):
+        n_in = available_notations[notation_in]
+        n_out = available_notations[notation_out]
+        derivs_in = list(n_in.terms)
+        if all(deriv in fd_in and len(fd_in[deriv]['values']) > 0 for deriv in derivs_in):
+            Ureds = np.asarray(fd_in[derivs_in[0]]['Ured'], dtype=np.float64)
+            if len(n_in.components) == len(n_in.base_derivs) and all(
+                np.array_equal(fd_in[deriv]['Ured'], Ureds) for deriv in derivs_in):
+                components = n_in._derivatives_to_components(fd_in, derivs_in)
+                transform = n_out.transform_matrices(Ureds) @ np.linalg.inv(n_in.transform_matrices(Ureds))
+                components = (transform @ components[...,np.newaxis])[...,0]
+                std_components = None
+                if all('std' in fd_in[deriv] for deriv in derivs_in):
+                    std_components = _propagate_std(transform, n_in._derivatives_to_components(fd_in, derivs_in, 'std'))
+                return n_out._components_to_derivatives(list(n_out.terms), components, Ureds, std_components)
+
+    # If not, through the base derivatives (block by block)
     fd_base = notation2base(fd_in, notation_in)
     fd_out = base2notation(fd_base, notation_out)
 
@@ -98,6 +251,8 @@ def notation2notation(fd_in, notation_in, notation_out):
 def notation2base(fd_in, notation_in):
 
     _check_notation_key(notation_in)
+    if notation_in == 'base':
+        return fd_in
     
     fd_out = available_notations[notation_in].deconvert(fd_in)
     
@@ -107,12 +262,21 @@ def notation2base(fd_in, notation_in):
 def base2notation(fd_in, notation_out):
 
     _check_notation_key(notation_out)
+    if notation_out == 'base':
+        return fd_in
     
     fd_out = available_notations[notation_out].convert(fd_in)
     
     return fd_out
 
 
+def _propagate_std(transform, std):
+
+    # Standard deviations of transform @ x (batched over the first axis)
+    # from the ones of x, with independent components
+    return np.sqrt(np.einsum('nij,nj->ni', transform**2, std**2))
+
+
 def _check_notation_key(notation_key):
 
     if notation_key not in available_notations and notation_key != 'base':
@@ -121,6 +285,72 @@ def _check_notation_key(notation_key):
         raise Exception(msg)
 
 
+def build_notation_tables():
+
+    # Expand the symbolic relations in _notation_definition into the terms
+    # used by the Notation objects. Only needed when the definitions change
+    # (to regenerate _notation_tables.py), so sympy is not loaded otherwise.
+    import sympy as sym
+    from ._notation_definition import notation_settings
+
+    Ured = sym.Symbol('Ured')
+    base_derivs = [letter+str(number) for letter in 'dlm' for number in range(1,7)]
+
+    tables = {}
+    for notation in notation_settings:
+        tables[notation['name']] = {}
+        for deriv, formula in notation['relations'].items():
+
+            formula = sym.expand(formula)
+            terms = []
+            remainder = formula
+            for base_deriv in base_derivs:
+                coefficient = formula.coeff(sym.Symbol(base_deriv))
+                if coefficient == 0:
+                    continue
+                remainder = sym.expand(remainder - coefficient*sym.Symbol(base_deriv))
+                for (power,), value in sym.Poly(coefficient, Ured).terms():
+                    value = complex(value)
+                    if value.imag == 0:
+                        value = value.real
+                    terms.append((base_deriv, int(power), value))
+
+            # The relations must be linear in the base derivatives
+            if remainder != 0:
+                msg = "The relation of '" + deriv + "' in the '" + notation['name'] + "' notation "
+                msg += 'is not linear in the base derivatives.'
+                raise Exception(msg)
+
+            tables[notation['name']][deriv] = terms
+
+    return tables
+
+
+def write_notation_tables(path=None):
+
+    # Regenerate the module with the precomputed notation tables
+    import os
+
+    if path is None:
+        path = os.path.join(os.path.dirname(__file__), '_notation_tables.py')
+
+    lines = ['',
+        '# Generated by notation.write_notation_tables() from _notation_definition.py.',
+        '# Do not edit by hand.',
+        '# {notation: {derivative: [(base derivative, power of Ured, coefficient), ...]}}',
+        '',
+        'notation_tables = {']
+    for name, table in build_notation_tables().items():
+        lines.append("    '" + name + "': {")
+        for deriv, terms in table.items():
+            lines.append("        '" + deriv + "': " + repr(terms) + ',')
+        lines.append('    },')
+    lines.append('}')
+
+    with open(path, 'w') as file:
+        file.write('\n'.join(lines) + '\n')
+
+
 available_notations = {}
-for notation in notation_settings:
-    available_notations[notation['name']] = Notation(notation['name'],notation['relations'])
+for name, terms in notation_tables.items():
+    available_notations[name] = Notation(name, terms)
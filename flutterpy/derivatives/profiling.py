@@ -0,0 +1,63 @@
+
+import time
+from contextlib import contextmanager, nullcontext
+
+
+# Context manager used when the profiling is disabled (does nothing)
+no_stage = nullcontext()
+
+
+# Collector of timing and fit information of the processing stages.
+# Each record is a dictionary with the run index, the stage name, its wall
+# time (s) and any other information of the stage (number of samples,
+# residuals, function evaluations...). The optional callback is called
+# with each record as soon as it is produced.
+class Profiler():
+
+    def __init__(self, callback=None):
+
+        self.callback = callback
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, run=None, **info):
+
+        # Time the code inside the 'with' block. The yielded dictionary can
+        # be filled with information known only at the end of the stage.
+        record = {'run': run, 'stage': name, 'time': None}
+        record.update(info)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['time'] = time.perf_counter() - start
+            self.add_record(record)
+
+    def add_record(self, record):
+
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def report(self):
+
+        # Records as a dictionary of columns (missing values are None),
+        # which can be given directly to pandas.DataFrame
+        keys = ['run', 'stage', 'time']
+        for record in self.records:
+            keys.extend(key for key in record if key not in keys)
+
+        return {key: [record.get(key) for record in self.records] for key in keys}
+
+    def total_times(self):
+
+        # Total wall time of each stage
+        totals = {}
+        for record in self.records:
+            totals[record['stage']] = totals.get(record['stage'], 0.0) + record['time']
+
+        return totals
+
+    def reset(self):
+
+        self.records = []
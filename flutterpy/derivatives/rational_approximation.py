@@ -0,0 +1,186 @@
+
+import numpy as np
+
+import flutterpy.derivatives.notations.notation as ntt
+from flutterpy.derivatives.aerodynamic_matrices import force_letters, motion_numbers
+
+
+# Rational function approximation (Roger) of the self-excited forces.
+# With the reduced frequency K = B*omega/U = 2*pi/Ured and p = i*K, the
+# forces of aerodynamic_matrices.derivative_matrices are
+#   F = 0.5*dens*U^2 * Q(p) * x,  Q(i*K) = displacement + i*K*velocity,
+# which is approximated by
+#   Q(p) = A_0 + A_1*p + A_2*p^2 + sum_l A_(l+3)*p/(p + lag_l).
+# In the time domain (p = s*B/U) each lag term is a set of aerodynamic
+# states w_l, with
+#   dw_l/dt = -lag_l*U/B * w_l + A_(l+3) * dx/dt,
+#   F = 0.5*dens*U^2 * (A_0*x + A_1*B/U*dx/dt + A_2*(B/U)^2*d2x/dt2 + sum_l w_l),
+# which avoids the convolution integrals of the frequency-dependent forces.
+class RationalApproximation():
+
+    def __init__(self, matrices, lags, B):
+
+        # Matrices with shape (3 + lags, 3, 3): A_0, A_1, A_2 and one per lag
+        self.matrices = np.asarray(matrices, dtype=np.float64)
+        self.lags = np.atleast_1d(np.asarray(lags, dtype=np.float64))
+        self.B = B
+        if self.matrices.shape != (3 + len(self.lags), 3, 3):
+            msg = 'There must be 3 + ' + str(len(self.lags)) + ' matrices (one per lag) with shape (3, 3).'
+            raise Exception(msg)
+
+    @property
+    def n_lags(self):
+
+        return len(self.lags)
+
+    def evaluate(self, K):
+
+        # Q(i*K) with shape K.shape + (3, 3)
+        p = 1j*np.asarray(K, dtype=np.float64)[...,np.newaxis,np.newaxis]
+        Q = self.matrices[0] + self.matrices[1]*p + self.matrices[2]*p**2
+        for lag, matrix in zip(self.lags, self.matrices[3:]):
+            Q = Q + matrix*p/(p + lag)
+
+        return Q
+
+    def get_derivatives(self, Ured):
+
+        # Base derivatives of the approximation at the given reduced velocities
+        # (the inverse of the scaling of derivative_matrices)
+        Ured = np.asarray(Ured, dtype=np.float64)
+        K = 2*np.pi/Ured
+        Q = self.evaluate(K)
+
+        values = {}
+        for row, letter in enumerate(force_letters):
+            for column, (number_velocity, number_displacement) in enumerate(motion_numbers):
+                scale = self.B**((row == 1) + (column == 1))
+                values[letter+str(number_velocity)] = Q[...,row,column].imag/K/scale
+                values[letter+str(number_displacement)] = Q[...,row,column].real/scale
+
+        return values
+
+    def get_initial_states(self, shape=()):
+
+        # Aerodynamic states at rest, with shape shape + (lags, 3)
+        return np.zeros(tuple(np.atleast_1d(shape).astype(int)) + (self.n_lags, 3))
+
+    def get_forces(self, displacement, velocity, acceleration, states, U, fluid_dens):
+
+        # Self-excited forces [lift, moment, drag] of a batch of sections.
+        # The motions have shape (..., 3) and the states (..., lags, 3); U can
+        # be a scalar or an array with the batch shape.
+        U = np.asarray(U, dtype=np.float64)[...,np.newaxis]
+        time_scale = self.B/U
+        forces = displacement @ self.matrices[0].T
+        forces += time_scale*(velocity @ self.matrices[1].T)
+        if acceleration is not None:
+            forces += time_scale**2*(acceleration @ self.matrices[2].T)
+        forces += np.sum(states, axis=-2)
+
+        return 0.5*fluid_dens*U**2*forces
+
+    def step(self, states, velocity, new_velocity, U, delta_t):
+
+        # Aerodynamic states after a time step, with the velocity varying
+        # linearly within the step (exact integration of the lag equations)
+        U = np.asarray(U, dtype=np.float64)[...,np.newaxis]
+        decay_rates = (self.lags*U/self.B)[...,np.newaxis]
+        decay = np.exp(-decay_rates*delta_t)
+        weight_start = (1 - decay)/decay_rates
+        weight_end = (1 - weight_start/delta_t)/decay_rates
+
+        # Inputs A_(l+3)*dx/dt of each lag, with shape (..., lags, 3)
+        lag_matrices = self.matrices[3:]
+        input_start = np.einsum('lij,...j->...li', lag_matrices, velocity)
+        input_end = np.einsum('lij,...j->...li', lag_matrices, new_velocity)
+
+        return decay*states + (weight_start - weight_end)*input_start + weight_end*input_end
+
+    def simulate(self, displacement, U, delta_t, fluid_dens, velocity=None, acceleration=None, states=None):
+
+        # Self-excited forces for the time histories of the motions, with shape
+        # (time steps, ..., 3) (the other dimensions are sections, load
+        # cases...). Missing velocities are obtained by finite differences.
+        # Returns the forces and the final aerodynamic states.
+        displacement = np.asarray(displacement, dtype=np.float64)
+        if velocity is None:
+            velocity = np.gradient(displacement, delta_t, axis=0)
+        if states is None:
+            states = self.get_initial_states(displacement.shape[1:-1])
+
+        forces = np.empty(displacement.shape)
+        for step in range(len(displacement)):
+            if step > 0:
+                states = self.step(states, velocity[step-1], velocity[step], U, delta_t)
+            step_acceleration = None if acceleration is None else acceleration[step]
+            forces[step] = self.get_forces(displacement[step], velocity[step], step_acceleration, states,
+                U, fluid_dens)
+
+        return forces, states
+
+
+def fit_rational_approximation(fd_data, B, n_lags=2, lags=None, acceleration_term=True, notation='base'):
+
+    # Least squares fit of the Roger approximation to the derivatives in
+    # fd_data (in any notation). The lags (reduced frequencies) are spread
+    # logarithmically over the range of the data if not given. For given lags
+    # the approximation is linear in the matrices, so the 9 force-motion
+    # entries are fitted at once (one right-hand side per entry) when their
+    # derivatives share the same Ured values.
+    fd_data = ntt.notation2base(fd_data, notation)
+
+    # Derivatives of each entry: (row, column, velocity, displacement)
+    entries = []
+    for row, letter in enumerate(force_letters):
+        for column, (number_velocity, number_displacement) in enumerate(motion_numbers):
+            derivs = [letter+str(number_velocity), letter+str(number_displacement)]
+            data = [(np.asarray(fd_data[deriv]['Ured'], dtype=np.float64),
+                np.asarray(fd_data[deriv]['values'], dtype=np.float64)) if deriv in fd_data
+                else (np.zeros(0), np.zeros(0)) for deriv in derivs]
+            if len(data[0][0]) + len(data[1][0]) > 0:
+                entries.append((row, column, data[0], data[1]))
+    if len(entries) == 0:
+        raise Exception('There are no derivatives to fit.')
+
+    if lags is None:
+        K = 2*np.pi/np.concatenate([data[0] for entry in entries for data in entry[2:]])
+        K_min, K_max = np.min(K), np.max(K)
+        lags = K_min*(K_max/K_min)**((np.arange(n_lags) + 0.5)/n_lags)
+    lags = np.atleast_1d(np.asarray(lags, dtype=np.float64))
+    terms = [0, 1] + [2]*acceleration_term + list(range(3, 3 + len(lags)))
+
+    # Entries with the same Ured values share the design matrix
+    groups = {}
+    for entry in entries:
+        key = (entry[2][0].tobytes(), entry[3][0].tobytes())
+        groups.setdefault(key, []).append(entry)
+
+    matrices = np.zeros((3 + len(lags), 3, 3))
+    for group in groups.values():
+        Ured_velocity, Ured_displacement = group[0][2][0], group[0][3][0]
+        design_matrix = np.vstack([_velocity_basis(2*np.pi/Ured_velocity, lags),
+            _displacement_basis(2*np.pi/Ured_displacement, lags)])[:,terms]
+        values = np.column_stack([np.concatenate([velocity[1], displacement[1]])
+            for _, _, velocity, displacement in group])
+        coefficients = np.linalg.lstsq(design_matrix, values, rcond=None)[0]
+
+        # The fit is done on the derivatives: scale them as in derivative_matrices
+        for index, (row, column, _, _) in enumerate(group):
+            matrices[terms,row,column] = coefficients[:,index]*B**((row == 1) + (column == 1))
+
+    return RationalApproximation(matrices, lags, B)
+
+
+def _displacement_basis(K, lags):
+
+    # Real parts of the terms 1, p, p^2 and p/(p + lag) at p = i*K
+    K = K[:,np.newaxis]
+    return np.hstack([np.ones_like(K), np.zeros_like(K), -K**2, K**2/(lags**2 + K**2)])
+
+
+def _velocity_basis(K, lags):
+
+    # Imaginary parts of the same terms, divided by K
+    K = K[:,np.newaxis]
+    return np.hstack([np.zeros_like(K), np.ones_like(K), np.zeros_like(K), lags/(lags**2 + K**2)])
@@ -0,0 +1,122 @@
+
+import os
+import json
+import hashlib
+import zipfile
+import numpy as np
+
+from flutterpy.derivatives.storage import _to_json
+
+
+# On-disk cache of the results of forced motion runs.
+# The key of a run is a hash of the contents of its time series, its
+# parameters and the version of the extraction code, so unchanged runs are
+# not processed again. Each entry is an '.npz' file with the table rows and
+# the fit diagnostics of the run. When the total size exceeds max_size
+# (bytes), the least recently used entries are removed.
+class RunCache():
+
+    def __init__(self, path, max_size=2**30):
+
+        self.path = path
+        self.max_size = max_size
+        os.makedirs(path, exist_ok=True)
+
+    def get(self, key):
+
+        # Results of the run ({'rows': ..., 'diagnostics': ...}) or None if
+        # it is not in the cache. The entry is marked as recently used.
+        # Corrupt or truncated entries are removed (and processed again).
+        file_path = self._file_path(key)
+        try:
+            with np.load(file_path, allow_pickle=False) as entry:
+                rows = {name[5:]: entry[name] for name in entry.files if name.startswith('rows_')}
+                diagnostics = json.loads(str(entry['diagnostics']))
+            os.utime(file_path)
+        except FileNotFoundError:
+            # Missing entry (or removed by another process while reading it)
+            return None
+        except (OSError, EOFError, ValueError, KeyError, zipfile.BadZipFile):
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+            return None
+
+        return {'rows': rows, 'diagnostics': diagnostics}
+
+    def put(self, key, run_results):
+
+        # Write to a temporary file first, so other processes never read
+        # incomplete entries
+        file_path = self._file_path(key)
+        temporary_path = file_path + '.' + str(os.getpid()) + '.tmp'
+        arrays = {'rows_' + name: column for name, column in run_results['rows'].items()}
+        arrays['diagnostics'] = np.array(json.dumps(run_results['diagnostics'], default=_to_json))
+        with open(temporary_path, 'wb') as file:
+            np.savez(file, **arrays)
+        os.replace(temporary_path, file_path)
+
+        self._evict()
+
+    def clear(self):
+
+        for file_name in os.listdir(self.path):
+            if file_name.endswith('.npz'):
+                os.remove(os.path.join(self.path, file_name))
+
+    def size(self):
+
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+
+        # Remove the least recently used entries until the size limit is met
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total_size = sum(size for _, size, _ in entries)
+        for file_path, size, _ in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+            total_size -= size
+
+    def _entries(self):
+
+        # (path, size, last use time) of each entry
+        entries = []
+        for file_name in os.listdir(self.path):
+            if file_name.endswith('.npz'):
+                file_path = os.path.join(self.path, file_name)
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                entries.append((file_path, stat.st_size, stat.st_mtime))
+
+        return entries
+
+    def _file_path(self, key):
+
+        return os.path.join(self.path, key + '.npz')
+
+
+def hash_run(series, params, block_size=2**24):
+
+    # Hash of the time series {name: array} (contents, dtype and length)
+    # and of the parameters (a JSON-serializable dictionary). Memory maps
+    # are read in blocks, so the memory used is bounded.
+    run_hash = hashlib.blake2b(digest_size=20)
+    run_hash.update(json.dumps(params, sort_keys=True, default=_to_json).encode())
+
+    for name in sorted(series):
+        array = series[name]
+        run_hash.update((name + ':' + array.dtype.str + ':' + str(len(array))).encode())
+        for first in range(0, len(array), block_size):
+            block = np.ascontiguousarray(array[first:first+block_size])
+            run_hash.update(memoryview(block).cast('B'))
+
+    return run_hash.hexdigest()
+
@@ -1,7 +1,6 @@
 
+import warnings
 import numpy as np
-from scipy.optimize import curve_fit
-from scipy.fft import fft
 
 
 def sin_func(t, A, phi, omega):
@@ -12,48 +11,621 @@ def sin_cos_func(t, a, b, c, omega):
     return a + b*np.cos(omega*t) + c*np.sin(omega*t)
 
 
-def extract_sinusoidal_parameters(x, y, omega=None, function='phase'):
+def extract_sinusoidal_parameters(x, y, omega=None, function='phase', refine_omega=False, info=None):
+
+    # If a dictionary is given as 'info', it is filled with information
+    # about the fit (estimated frequency, function evaluations...)
+    if info is not None:
+        info['n_samples'] = len(y)
 
     if omega == None:
 
+        # Estimate the frequency from the spectrum and solve the linear
+        # problem at that frequency. Optionally, use the result as the
+        # starting point of a nonlinear fit with a free frequency.
         omega_guess = GuessFrequency(np.array(x), np.array(y))*2*np.pi
+        params, _, residual_norm = linear_sinusoidal_fit(x, y, omega_guess, function=function)
+        params = np.append(params, omega_guess)
+        nfev = 0
 
-        if function == 'phase':
-            params, cov = curve_fit(sin_func, x, y, p0=[1,0,omega_guess], bounds=([0, -np.pi, 0], [np.inf, np.pi, np.inf]))
+        if refine_omega:
+            # scipy is only loaded when a nonlinear fit is requested
+            from scipy.optimize import curve_fit
 
-        elif function == 'sin_cos':
-            params, cov = curve_fit(sin_cos_func, x, y, p0=[0,1,1,omega_guess], bounds=([-np.inf, 0, 0], [np.inf, np.inf, np.inf]))
+            # Count the evaluations of the function (nfev)
+            model = {'phase': sin_func, 'sin_cos': sin_cos_func}[function]
+            def counted_model(*args):
+                nonlocal nfev
+                nfev += 1
+                return model(*args)
 
-        print('Freq guess: '+str(omega_guess/2/np.pi))
-        print('Freq final: '+str(params[-1]/2/np.pi))
+            if function == 'phase':
+                params, cov = curve_fit(counted_model, x, y, p0=params, bounds=([0, -np.pi, 0], [np.inf, np.pi, np.inf]))
 
-    else:
+            elif function == 'sin_cos':
+                params, cov = curve_fit(counted_model, x, y, p0=params)
+
+            residual_norm = np.linalg.norm(y - model(np.asarray(x), *params))
+
+        if info is not None:
+            info.update({'omega_guess': omega_guess, 'omega': params[-1], 'nfev': nfev,
+                'residual_norm': residual_norm})
 
-        if function == 'phase':
-            def custom_func(t, A, phi):
-                return A*np.sin(omega*t+phi)
+    else:
 
-        elif function == 'sin_cos':
-            def custom_func(t, a, b, c):
-                return a + b*np.cos(omega*t) + c*np.sin(omega*t)
+        # With a known frequency the model is linear in its unknowns
+        params, _, residual_norm = linear_sinusoidal_fit(x, y, omega, function=function)
 
-        params, cov = curve_fit(custom_func, x, y)
+        if info is not None:
+            info.update({'omega': omega, 'nfev': 0, 'residual_norm': residual_norm})
 
     return params
 
 
+def sinusoidal_design_matrix(x, omega, function='phase'):
+
+    # Columns of the linear model evaluated at the times x:
+    #   'phase':   [cos(omega*t), sin(omega*t)]
+    #   'sin_cos': [1, cos(omega*t), sin(omega*t)]
+    omega_t = omega*np.asarray(x, dtype=np.float64)
+
+    if function == 'phase':
+        columns = [np.cos(omega_t), np.sin(omega_t)]
+    elif function == 'sin_cos':
+        columns = [np.ones_like(omega_t), np.cos(omega_t), np.sin(omega_t)]
+    else:
+        _raise_function_not_recognised(function)
+
+    return np.column_stack(columns)
+
+
+def linear_sinusoidal_fit(x, y, omega, function='phase', design_matrix=None):
+
+    # Direct least-squares fit of a sinusoid with known frequency:
+    #   'phase':   y = A*sin(omega*t + phi) = b*cos(omega*t) + c*sin(omega*t)
+    #   'sin_cos': y = a + b*cos(omega*t) + c*sin(omega*t)
+    # Returns the parameters (in the same order as the nonlinear fit),
+    # their covariance matrix and the norm of the residuals.
+    # A precomputed design matrix can be passed to reuse it between calls.
+
+    y = np.asarray(y, dtype=np.float64)
+    if design_matrix is None:
+        design_matrix = sinusoidal_design_matrix(x, omega, function)
+
+    n_samples, n_params = design_matrix.shape
+    if n_samples <= n_params:
+        msg = 'Not enough samples to fit the sinusoidal function. '
+        msg += 'At least ' + str(n_params+1) + ' samples are needed.'
+        raise Exception(msg)
+
+    # Solve the linear least-squares problem
+    coeffs, _, rank, _ = np.linalg.lstsq(design_matrix, y, rcond=None)
+    if rank < n_params:
+        msg = 'The sinusoidal design matrix is rank deficient. '
+        msg += 'Check that the time series covers enough of a period '
+        msg += 'and that omega is not a multiple of the sampling frequency.'
+        raise Exception(msg)
+
+    # Residual norm and covariance of the fitted coefficients
+    # (same scaling as scipy.optimize.curve_fit with absolute_sigma=False)
+    residual = y - design_matrix @ coeffs
+    residual_norm = np.sqrt(residual @ residual)
+    variance = residual_norm**2 / (n_samples - n_params)
+    cov = variance * np.linalg.inv(design_matrix.T @ design_matrix)
+
+    if function == 'sin_cos':
+        return coeffs, cov, residual_norm
+
+    # Amplitude and phase from the cosine and sine coefficients:
+    # A*sin(omega*t + phi) = A*sin(phi)*cos(omega*t) + A*cos(phi)*sin(omega*t)
+    params, jacobian = _cos_sin_to_amplitude_phase(coeffs[0], coeffs[1])
+    cov = jacobian @ cov @ jacobian.T
+
+    return params, cov, residual_norm
+
+
+class SinusoidalStatistics():
+
+    # Sufficient statistics of the linear model
+    #   y = a + b*cos(omega*t) + c*sin(omega*t),   t = i*delta_t
+    # for one or several series sharing the time vector. The samples can be
+    # added block by block, so the time array is never materialized and the
+    # memory used does not depend on the length of the record.
+    # With several frequencies (omega as an array) the model has one cosine
+    # and one sine per frequency,
+    #   y = a + sum_k (b_k*cos(omega_k*t) + c_k*sin(omega_k*t)),
+    # and the harmonics are fitted jointly, separating their contributions.
+    # With a forgetting factor (0 < factor <= 1) the weight of each sample
+    # decays exponentially with the number of newer samples.
+
+    def __init__(self, omega, delta_t, n_series=1, forgetting_factor=None):
+
+        self.omega = omega
+        self.omegas = np.atleast_1d(np.asarray(omega, dtype=np.float64))
+        self.delta_t = delta_t
+        self.n_series = n_series
+        self.forgetting_factor = forgetting_factor
+        self.reset()
+
+    def reset(self):
+
+        # gram = X^T*W*X, xty = X^T*W*y, yty = y^T*W*y, with X = [1, cos, sin]
+        # (a cos and sin pair per frequency) and W the sample weights
+        # (identity without forgetting)
+        n_columns = 1 + 2*len(self.omegas)
+        self.gram = np.zeros((n_columns, n_columns))
+        self.xty = np.zeros((n_columns, self.n_series))
+        self.yty = np.zeros(self.n_series)
+
+        # Total weight of the samples (number of samples without forgetting)
+        # and index of the next sample (defines its time)
+        self.n_samples = 0
+        self.next_sample = 0
+
+    def update(self, y_block):
+
+        # Add the next block of samples (one row per series)
+        y_block = np.asarray(y_block, dtype=np.float64).reshape(self.n_series, -1)
+        n_block = y_block.shape[1]
+        design_matrix = self._design_matrix(self.next_sample, n_block)
+
+        if self.forgetting_factor is None:
+            weights = None
+            weighted_design_matrix = design_matrix
+            weighted_y_block = y_block
+            n_samples = n_block
+        else:
+            # Forget the old statistics and weight the new samples
+            decay = self.forgetting_factor**n_block
+            self.gram *= decay
+            self.xty *= decay
+            self.yty *= decay
+            self.n_samples *= decay
+            weights = self.forgetting_factor**np.arange(n_block-1, -1, -1)
+            weighted_design_matrix = design_matrix*weights[:,np.newaxis]
+            weighted_y_block = y_block*weights
+            n_samples = weights.sum()
+
+        self.gram += weighted_design_matrix.T @ design_matrix
+        self.xty += weighted_design_matrix.T @ y_block.T
+        self.yty += np.einsum('ij,ij->i', weighted_y_block, y_block)
+        self.n_samples += n_samples
+        self.next_sample += n_block
+
+    def get_state(self):
+
+        # Copy of the accumulated statistics (e.g. to remove them later)
+        return (self.gram.copy(), self.xty.copy(), self.yty.copy(), self.n_samples)
+
+    def subtract_state(self, state):
+
+        # Remove statistics previously returned by get_state (or the
+        # difference between two states). The time index is not changed.
+        gram, xty, yty, n_samples = state
+        self.gram -= gram
+        self.xty -= xty
+        self.yty -= yty
+        self.n_samples -= n_samples
+
+    def solve(self, series=0, function='sin_cos', harmonic=0):
+
+        # Same outputs as linear_sinusoidal_fit for the selected series, with
+        # the parameters of the selected harmonic (index of its frequency).
+        # All the harmonics are fitted together.
+        n_harmonics = len(self.omegas)
+        if function == 'sin_cos':
+            columns = slice(0, 1 + 2*n_harmonics)
+            selected = [0, 1 + 2*harmonic, 2 + 2*harmonic]
+        elif function == 'phase':
+            columns = slice(1, 1 + 2*n_harmonics)
+            selected = [2*harmonic, 1 + 2*harmonic]
+        else:
+            _raise_function_not_recognised(function)
+
+        gram = self.gram[columns, columns]
+        xty = self.xty[columns, series]
+        n_params = gram.shape[0]
+        if self.n_samples <= n_params:
+            msg = 'Not enough samples to fit the sinusoidal function. '
+            msg += 'At least ' + str(n_params+1) + ' samples are needed.'
+            raise Exception(msg)
+
+        gram_inv = np.linalg.inv(gram)
+        coeffs = gram_inv @ xty
+
+        # Residual sum of squares from the statistics
+        # (clipped to avoid negative values from rounding errors)
+        rss = max(self.yty[series] - coeffs @ xty, 0.0)
+        residual_norm = np.sqrt(rss)
+        cov = rss / (self.n_samples - n_params) * gram_inv
+
+        coeffs = coeffs[selected]
+        cov = cov[np.ix_(selected, selected)]
+        if function == 'sin_cos':
+            return coeffs, cov, residual_norm
+
+        params, jacobian = _cos_sin_to_amplitude_phase(coeffs[0], coeffs[1])
+        cov = jacobian @ cov @ jacobian.T
+
+        return params, cov, residual_norm
+
+    def _design_matrix(self, first_sample, n_block):
+
+        time = self.delta_t*np.arange(first_sample, first_sample+n_block)
+        omega_t = time[:,np.newaxis]*self.omegas
+        design_matrix = np.empty((n_block, 1 + 2*len(self.omegas)))
+        design_matrix[:,0] = 1
+        design_matrix[:,1::2] = np.cos(omega_t)
+        design_matrix[:,2::2] = np.sin(omega_t)
+
+        return design_matrix
+
+
+def sinusoidal_statistics(series, delta_t, omega, chunk_size=2**16):
+
+    # Accumulate the statistics of several equally long series (arrays,
+    # memory maps...) reading them in chunks of fixed size
+    n_samples = len(series[0])
+    statistics = SinusoidalStatistics(omega, delta_t, n_series=len(series))
+
+    y_block = np.empty((len(series), min(chunk_size, n_samples)))
+    for first in range(0, n_samples, chunk_size):
+        last = min(first+chunk_size, n_samples)
+        for index, y in enumerate(series):
+            y_block[index,:last-first] = y[first:last]
+        statistics.update(y_block[:,:last-first])
+
+    return statistics
+
+
+def sinusoidal_block_statistics(series, delta_t, omega, block_size, chunk_size=2**16):
+
+    # Same as sinusoidal_statistics, but also keeping the statistics of
+    # consecutive blocks of block_size samples (the last one may be shorter),
+    # e.g. for a block bootstrap. Returns the statistics of the whole series
+    # and the arrays X^T*X (blocks, columns, columns) and X^T*y (blocks,
+    # columns, series) of each block. The data is still read only once.
+    n_samples = len(series[0])
+    statistics = SinusoidalStatistics(omega, delta_t, n_series=len(series))
+    chunk_size = max(chunk_size // block_size, 1)*block_size
+
+    block_grams = []
+    block_xty = []
+    y_block = np.empty((len(series), min(chunk_size, n_samples)))
+    for first in range(0, n_samples, chunk_size):
+        last = min(first+chunk_size, n_samples)
+        for index, y in enumerate(series):
+            y_block[index,:last-first] = y[first:last]
+        design_matrix = statistics._design_matrix(first, last-first)
+
+        # Complete blocks of the chunk and the remaining samples
+        n_complete = (last-first)//block_size*block_size
+        blocks = [(design_matrix[:n_complete].reshape(-1, block_size, design_matrix.shape[1]),
+            y_block[:,:n_complete].reshape(len(series), -1, block_size))]
+        if n_complete < last-first:
+            blocks.append((design_matrix[np.newaxis,n_complete:], y_block[:,np.newaxis,n_complete:last-first]))
+        for block_design, block_y in blocks:
+            block_grams.append(np.einsum('kbi,kbj->kij', block_design, block_design))
+            block_xty.append(np.einsum('kbi,skb->kis', block_design, block_y))
+
+        statistics.yty += np.einsum('ij,ij->i', y_block[:,:last-first], y_block[:,:last-first])
+
+    block_grams = np.concatenate(block_grams)
+    block_xty = np.concatenate(block_xty)
+    statistics.gram += block_grams.sum(axis=0)
+    statistics.xty += block_xty.sum(axis=0)
+    statistics.n_samples = statistics.next_sample = n_samples
+
+    return statistics, block_grams, block_xty
+
+
+def cycle_coefficients(y, delta_t, omega, chunk_size=2**16):
+
+    # Coefficients (a, b, c) of y = a + b*cos(omega*t) + c*sin(omega*t)
+    # fitted on each whole cycle of the series, with shape (cycles, 3), and
+    # the first sample of each cycle (plus the end of the last one). With
+    # several frequencies, all the harmonics are fitted jointly on each cycle
+    # of the lowest one: (a, b_1, c_1, b_2, c_2...), with shape
+    # (cycles, 1 + 2*frequencies). The series is read in chunks of whole
+    # cycles (of about chunk_size samples), and the statistics of the cycles
+    # of each chunk are accumulated at once with reduceat.
+    omegas = np.atleast_1d(np.asarray(omega, dtype=np.float64))
+    n_columns = 1 + 2*len(omegas)
+    if 2*np.pi/(np.max(omegas)*delta_t) < 4:
+        raise Exception('At least 4 samples per cycle are needed to fit each cycle.')
+    samples_per_cycle = 2*np.pi/(np.min(omegas)*delta_t)
+    n_cycles = int(len(y) // samples_per_cycle)
+    boundaries = np.round(np.arange(n_cycles+1)*samples_per_cycle).astype(np.int64)
+    if n_cycles == 0:
+        return np.zeros((0, n_columns)), boundaries
+
+    gram = np.empty((n_cycles, n_columns, n_columns))
+    xty = np.empty((n_cycles, n_columns))
+    cycles_per_chunk = max(int(chunk_size // samples_per_cycle), 1)
+    for first_cycle in range(0, n_cycles, cycles_per_chunk):
+        last_cycle = min(first_cycle+cycles_per_chunk, n_cycles)
+        first, last = boundaries[first_cycle], boundaries[last_cycle]
+        y_chunk = np.asarray(y[first:last], dtype=np.float64)
+        columns = [np.ones(last-first)]
+        for omega_k in omegas:
+            omega_t = omega_k*delta_t*np.arange(first, last)
+            columns += [np.cos(omega_t), np.sin(omega_t)]
+        starts = boundaries[first_cycle:last_cycle] - first
+        for i in range(n_columns):
+            xty[first_cycle:last_cycle,i] = np.add.reduceat(columns[i]*y_chunk, starts)
+            for j in range(i, n_columns):
+                gram[first_cycle:last_cycle,i,j] = gram[first_cycle:last_cycle,j,i] = np.add.reduceat(
+                    columns[i]*columns[j], starts)
+
+    return np.linalg.solve(gram, xty[...,np.newaxis])[...,0], boundaries
+
+
+def detect_steady_state(y, delta_t, omega, tolerance=1e-3, n_stable_cycles=3, chunk_size=2**16):
+
+    # First sample of the periodic regime of the series: the start of the
+    # first cycle after which the mean and the harmonics (b, c) change from
+    # cycle to cycle less than tolerance times the final amplitude (of the
+    # largest harmonic), for at least n_stable_cycles cycles. With several
+    # frequencies, the cycles are the ones of the lowest frequency. None if
+    # the series does not settle.
+    coeffs, boundaries = cycle_coefficients(y, delta_t, omega, chunk_size=chunk_size)
+    if len(coeffs) < n_stable_cycles:
+        return None
+
+    scale = np.max(np.hypot(coeffs[-1,1::2], coeffs[-1,2::2]))
+    if scale == 0:
+        return 0
+    changes = np.max(np.abs(np.diff(coeffs, axis=0)), axis=1)/scale
+    unsettled = np.flatnonzero(changes >= tolerance)
+    first_cycle = unsettled[-1] + 1 if len(unsettled) > 0 else 0
+    if len(coeffs) - first_cycle < n_stable_cycles:
+        return None
+
+    return int(boundaries[first_cycle])
+
+
+def preprocess_periodic_series(series, delta_t, omega, samples_per_cycle=32, tolerance=1e-3, n_stable_cycles=3,
+    trim=True, chunk_size=2**16):
+
+    # Preprocessing of long periodic records (e.g. CFD outputs sampled at
+    # the solver time step) before the sinusoidal fits:
+    #   1. Start-up transients are removed (with trim): the series start at
+    #      the latest steady state sample of all of them (detect_steady_state,
+    #      with all the frequencies fitted on each cycle of the slowest one).
+    #   2. The series are cut to an integer number of periods of the slowest
+    #      frequency, so the fits are not biased by incomplete cycles.
+    #   3. They are decimated with a polyphase anti-aliasing filter (the one
+    #      of scipy's resample_poly, with the series extended periodically at
+    #      the ends) to about samples_per_cycle samples per cycle of the
+    #      fastest frequency.
+    # The series are read in chunks of about chunk_size samples, so only the
+    # decimated series are kept in memory.
+    # Returns the processed series, their time step and a dictionary with
+    # the first and last samples kept, the number of cycles, the decimation
+    # factor and whether the series settled.
+    omegas = np.atleast_1d(np.asarray(omega, dtype=np.float64))
+    n_samples = len(series[0])
+
+    first_sample = 0
+    settled = True
+    if trim:
+        starts = [detect_steady_state(y, delta_t, omegas, tolerance, n_stable_cycles, chunk_size)
+            for y in series]
+        if None in starts:
+            msg = 'The time series did not settle into a periodic regime (tolerance ' + str(tolerance) + '). '
+            msg += 'The whole series are used.'
+            warnings.warn(msg)
+            settled = False
+        else:
+            first_sample = max(starts)
+
+    samples_per_period = 2*np.pi/(np.min(omegas)*delta_t)
+    n_cycles = int((n_samples - first_sample) // samples_per_period)
+    if n_cycles == 0:
+        raise Exception('The time series do not contain a whole period after the transient.')
+    last_sample = first_sample + int(round(n_cycles*samples_per_period))
+
+    # (the small tolerance avoids losing a sample per cycle to rounding errors)
+    factor = max(int(2*np.pi/(np.max(omegas)*delta_t)/samples_per_cycle + 1e-9), 1)
+    if factor > 1:
+        # scipy is only loaded when the series are decimated. The Kaiser
+        # window (beta = 10) keeps the passband ripple (the error of the
+        # amplitudes) around 1e-6, since the harmonics are far from the cutoff.
+        from scipy.signal import firwin
+        half_length = 10*factor
+        taps = firwin(2*half_length + 1, 1/factor, window=('kaiser', 10.0))
+        processed = [_decimate_periodic(y, first_sample, last_sample, factor, taps, chunk_size) for y in series]
+    else:
+        processed = [np.asarray(y[first_sample:last_sample], dtype=np.float64) for y in series]
+
+    info = {'first_sample': first_sample, 'last_sample': last_sample, 'n_cycles': n_cycles,
+        'factor': factor, 'settled': settled}
+
+    return processed, delta_t*factor, info
+
+
+def _decimate_periodic(y, first_sample, last_sample, factor, taps, chunk_size):
+
+    # Samples first_sample, first_sample+factor... of y[first_sample:last_sample]
+    # filtered with the (symmetric) taps, with the series extended
+    # periodically. The extended series is read in chunks and only the
+    # filtered samples that are kept are computed (the polyphase form): the
+    # samples still needed by the next outputs are carried between chunks.
+    n_samples = last_sample - first_sample
+    half_length = len(taps)//2
+    if n_samples >= half_length:
+        head = np.asarray(y[first_sample:first_sample+half_length], dtype=np.float64)
+        tail = np.asarray(y[last_sample-half_length:last_sample], dtype=np.float64)
+    else:
+        whole = np.asarray(y[first_sample:last_sample], dtype=np.float64)
+        head = np.take(whole, np.arange(half_length), mode='wrap')
+        tail = np.take(whole, np.arange(-half_length, 0), mode='wrap')
+
+    # Output k is centred on sample k*factor, which is sample
+    # k*factor + half_length of the extended series
+    n_outputs = -(-n_samples // factor)
+    processed = np.empty(n_outputs)
+    chunks = [tail] + [y[first:min(first+chunk_size, last_sample)]
+        for first in range(first_sample, last_sample, chunk_size)] + [head]
+    carried = np.zeros(0)
+    next_output = 0
+    for chunk in chunks:
+        carried = np.concatenate([carried, np.asarray(chunk, dtype=np.float64)])
+        n_windows = max((len(carried) - len(taps))//factor + 1, 0)
+        n_windows = min(n_windows, n_outputs - next_output)
+        if n_windows > 0:
+            windows = np.lib.stride_tricks.sliding_window_view(carried, len(taps))[:n_windows*factor:factor]
+            processed[next_output:next_output+n_windows] = windows @ taps
+            next_output += n_windows
+            carried = carried[n_windows*factor:]
+
+    return processed
+
+
+def _cos_sin_to_amplitude_phase(b, c):
+
+    # Amplitude, phase and the jacobian of (A, phi) with respect to (b, c)
+    ampl = np.hypot(b, c)
+    phi = np.arctan2(b, c)
+    jacobian = np.array([[b/ampl, c/ampl], [c/ampl**2, -b/ampl**2]])
+
+    return np.array([ampl, phi]), jacobian
+
+
+def _raise_function_not_recognised(function):
+
+    msg = "The function '" + str(function) + "' is not recognised. "
+    msg += "Choose one of the following: 'phase', 'sin_cos'."
+    raise Exception(msg)
+
+
 def GuessFrequency(time, motion):
 
-    # Generating frequency spectrum
-    spectrum = fft(motion)
+    # Main frequency of the time series (in Hz)
+    return estimate_frequency(time, motion)
+
+
+def estimate_frequency(time, y, zero_padding=1, interpolation='jacobsen', refine=True, band=None):
+
+    # Estimate the frequency (in Hz) of the main sinusoidal component:
+    #   1. Peak of the one-sided spectrum (rfft, optionally zero-padded),
+    #      ignoring the mean value and restricted to the band (f_min, f_max).
+    #   2. Sub-bin interpolation of the peak ('jacobsen', 'parabolic' or None).
+    #      Jacobsen's estimator assumes no zero-padding, the parabolic one
+    #      is more accurate for zero-padded spectra.
+    #   3. Optional refinement within one bin around the estimate, maximizing
+    #      the power explained by a sinusoidal fit (evaluated with the
+    #      Goertzel algorithm). This gives the least-squares frequency.
+    time = np.asarray(time, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(y) < 4:
+        raise Exception('At least 4 samples are needed to estimate the frequency.')
+
+    time_step = (time[-1]-time[0]) / (len(time)-1)
+    y = y - np.mean(y)
+
+    # One-sided spectrum
+    n_fft = int(zero_padding*len(y))
+    spectrum = np.fft.rfft(y, n_fft)
+    freq_domain = np.fft.rfftfreq(n_fft, time_step)
+    bin_width = freq_domain[1]
+
+    # Peak of the spectrum, within the band and without the DC bin
+    magnitude = np.abs(spectrum)
+    valid = np.zeros(len(magnitude), dtype=bool)
+    valid[1:-1] = True
+    if band is not None:
+        valid &= (freq_domain >= band[0]) & (freq_domain <= band[1])
+    if not valid.any():
+        raise Exception('The frequency band does not contain any frequency of the spectrum.')
+    peak = np.flatnonzero(valid)[np.argmax(magnitude[valid])]
+
+    # Fractional bin offset of the true peak
+    if interpolation == 'jacobsen':
+        denominator = 2*spectrum[peak] - spectrum[peak-1] - spectrum[peak+1]
+        delta = np.real((spectrum[peak-1] - spectrum[peak+1]) / denominator) if denominator != 0 else 0.0
+    elif interpolation == 'parabolic':
+        denominator = magnitude[peak-1] - 2*magnitude[peak] + magnitude[peak+1]
+        delta = 0.5*(magnitude[peak-1] - magnitude[peak+1]) / denominator if denominator != 0 else 0.0
+    elif interpolation is None:
+        delta = 0.0
+    else:
+        msg = "The interpolation '" + str(interpolation) + "' is not recognised. "
+        msg += "Choose one of the following: 'jacobsen', 'parabolic', None."
+        raise Exception(msg)
+    frequency = (peak + np.clip(delta, -0.5, 0.5)) * bin_width
+
+    if refine:
+        frequency = _refine_frequency(y, time_step, frequency, bin_width)
+
+    return frequency
+
+
+def goertzel(y, frequency, time_step):
+
+    # Discrete-time Fourier transform of y at a single frequency,
+    #   sum(y[n]*exp(-i*omega*n)),   omega = 2*pi*frequency*time_step,
+    # computed with the Goertzel recursion (run as an IIR filter)
+    from scipy.signal import lfilter
+
+    y = np.asarray(y, dtype=np.float64)
+    omega = 2*np.pi*frequency*time_step
+    state = lfilter([1.0], [1.0, -2*np.cos(omega), 1.0], y)
+
+    # Last value of the recursion, referred to the first sample
+    n_last = len(y) - 1
+    return (state[-1] - np.exp(-1j*omega)*state[-2]) * np.exp(-1j*omega*n_last)
+
+
+def _fit_power(y, frequency, time_step):
+
+    # Sum of squares explained by the least-squares fit of
+    #   y = a + b*cos(omega*t) + c*sin(omega*t)
+    # at the given frequency. Its maximum is the least-squares estimate of
+    # the frequency. The sums of the trigonometric terms are computed in
+    # closed form, so only the Goertzel evaluation depends on the data.
+    n = len(y)
+    omega = 2*np.pi*frequency*time_step
+
+    def geometric_sum(w):
+        # sum(exp(i*w*k)) for k = 0 ... n-1
+        if np.isclose(np.cos(w), 1, rtol=0, atol=1e-15):
+            return complex(n)
+        return (1 - np.exp(1j*w*n)) / (1 - np.exp(1j*w))
+
+    sum_1 = geometric_sum(omega)
+    sum_2 = geometric_sum(2*omega)
+    gram = np.array([
+        [n,           sum_1.real,            sum_1.imag],
+        [sum_1.real,  (n + sum_2.real)/2,    sum_2.imag/2],
+        [sum_1.imag,  sum_2.imag/2,          (n - sum_2.real)/2]])
+
+    dft = goertzel(y, frequency, time_step)
+    xty = np.array([np.sum(y), dft.real, -dft.imag])
+
+    return xty @ np.linalg.solve(gram, xty)
+
+
+def _refine_frequency(y, time_step, frequency, bin_width, tolerance=1e-4):
 
-    # Calculating frequency domain
-    N = len(time)-1
-    time_step = (time[-1]-time[0]) / N
-    freq_domain = np.linspace(0.0, 1.0/(time_step), N+1)
+    # Golden-section search of the maximum of the fit power in
+    # [frequency - bin_width, frequency + bin_width]
+    golden = (np.sqrt(5) - 1) / 2
+    lower = max(frequency - bin_width, 0.0)
+    upper = frequency + bin_width
 
-    # Getting maximum value of the spectrum (main frequency)
-    main_freqs = freq_domain[np.abs(spectrum)==max(np.abs(spectrum))]
+    f1 = upper - golden*(upper-lower)
+    f2 = lower + golden*(upper-lower)
+    p1 = _fit_power(y, f1, time_step)
+    p2 = _fit_power(y, f2, time_step)
+    while upper - lower > tolerance*bin_width:
+        if p1 > p2:
+            upper, f2, p2 = f2, f1, p1
+            f1 = upper - golden*(upper-lower)
+            p1 = _fit_power(y, f1, time_step)
+        else:
+            lower, f1, p1 = f1, f2, p2
+            f2 = lower + golden*(upper-lower)
+            p2 = _fit_power(y, f2, time_step)
 
-    # Only the first frequency, the second one is mirrored respect to the Nyquist frequency
-    return(main_freqs[0])
\ No newline at end of file
+    return (lower + upper) / 2
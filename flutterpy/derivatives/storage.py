@@ -0,0 +1,179 @@
+
+import os
+import json
+import numpy as np
+
+
+# Result stores of flutter derivatives. A store is a folder with:
+#   - 'metadata.json': format version, number of rows and runs, dtype of each
+#     column and the default settings (notation and simulation parameters).
+#   - One raw binary file per column of the derivative table ('<column>.bin'),
+#     which can be memory-mapped when loading and extended when appending.
+#   - 'diagnostics.jsonl': the fit diagnostics, one line per run.
+# The number of rows in the metadata is only updated after the data has been
+# written, so an interrupted append does not corrupt the store: the data after
+# the rows and runs of the metadata is discarded before the next append.
+store_format_version = 1
+
+
+def write_store(path, table, run_diagnostics, settings, append=False, position=None):
+
+    # Write the table and the run diagnostics to a store. The position tells
+    # which part of them is already in the store (as returned by this function
+    # or by store_position): with append, only the rows and runs after it are
+    # added. Without a position, all of them are added. The new position is
+    # returned.
+    metadata_path = os.path.join(path, 'metadata.json')
+    columns = {name: table.column(name) for name in table.columns}
+
+    if append:
+        metadata = read_metadata(path)
+        if set(metadata['columns']) != set(columns):
+            msg = "The columns of the store '" + str(path) + "' do not match the ones of the derivatives."
+            raise Exception(msg)
+
+        if position is None:
+            # Runs are numbered after the ones already in the store
+            # (rows without a run keep the index -1)
+            position = {'n_rows': metadata['n_rows'], 'n_runs': metadata['n_runs'],
+                'rows': 0, 'runs': 0, 'run_offset': metadata['n_runs']}
+        elif position['n_rows'] != metadata['n_rows'] or position['n_runs'] != metadata['n_runs']:
+            msg = "The store '" + str(path) + "' was modified after the derivatives were "
+            msg += 'loaded from or saved to it.'
+            raise Exception(msg)
+
+        if position['rows'] > len(table) or position['runs'] > len(run_diagnostics):
+            msg = 'The derivatives have less rows or runs than the ones already in the store.'
+            raise Exception(msg)
+
+        columns = {name: column[position['rows']:] for name, column in columns.items()}
+        runs = np.array(columns['run'])
+        runs[runs >= 0] += position['run_offset']
+        columns['run'] = runs
+        run_diagnostics = run_diagnostics[position['runs']:]
+
+        _truncate_store(path, metadata)
+        file_mode = 'ab'
+    else:
+        os.makedirs(path, exist_ok=True)
+        metadata = {'format_version': store_format_version, 'n_rows': 0, 'n_runs': 0,
+            'columns': {name: column.dtype.str for name, column in columns.items()}}
+        metadata.update(settings)
+        position = {'run_offset': 0}
+        file_mode = 'wb'
+
+    # Data first, metadata last. New files are written to temporary files
+    # and then moved into place: the columns of the store may be memory-mapped
+    # (e.g. by the derivatives being saved), so they must not be truncated.
+    file_paths = [os.path.join(path, name + '.bin') for name in columns] + [os.path.join(path, 'diagnostics.jsonl')]
+    if append:
+        write_paths = file_paths
+    else:
+        write_paths = [file_path + '.' + str(os.getpid()) + '.tmp' for file_path in file_paths]
+
+    for (name, column), write_path in zip(columns.items(), write_paths):
+        with open(write_path, file_mode) as file:
+            np.ascontiguousarray(column, dtype=np.dtype(metadata['columns'][name])).tofile(file)
+
+    with open(write_paths[-1], file_mode[0]) as file:
+        for diagnostics in run_diagnostics:
+            file.write(json.dumps(diagnostics, default=_to_json) + '\n')
+
+    if not append:
+        for write_path, file_path in zip(write_paths, file_paths):
+            os.replace(write_path, file_path)
+
+    metadata['n_rows'] += len(columns['run'])
+    metadata['n_runs'] += len(run_diagnostics)
+    temporary_path = metadata_path + '.tmp'
+    with open(temporary_path, 'w') as file:
+        json.dump(metadata, file, default=_to_json, indent=2)
+    os.replace(temporary_path, metadata_path)
+
+    position.update({'n_rows': metadata['n_rows'], 'n_runs': metadata['n_runs'],
+        'rows': len(table), 'runs': metadata['n_runs'] - position['run_offset']})
+
+    return position
+
+
+def store_position(metadata):
+
+    # Position of the data of a store that was loaded completely
+    return {'n_rows': metadata['n_rows'], 'n_runs': metadata['n_runs'],
+        'rows': metadata['n_rows'], 'runs': metadata['n_runs'], 'run_offset': 0}
+
+
+def read_store(path, mmap=True, diagnostics=True):
+
+    # Metadata, columns and run diagnostics of a store. With mmap the columns
+    # are copy-on-write memory maps: nothing is read until it is used and
+    # changes are never written back to the files. Without diagnostics, a
+    # placeholder (None) is given for each run.
+    metadata = read_metadata(path)
+    n_rows = metadata['n_rows']
+
+    columns = {}
+    for name, dtype in metadata['columns'].items():
+        file_path = os.path.join(path, name + '.bin')
+        if n_rows == 0:
+            columns[name] = np.zeros(0, dtype=dtype)
+        elif mmap:
+            columns[name] = np.memmap(file_path, dtype=dtype, mode='c', shape=(n_rows,))
+        else:
+            columns[name] = np.fromfile(file_path, dtype=dtype, count=n_rows)
+
+    if diagnostics:
+        run_diagnostics = []
+        with open(os.path.join(path, 'diagnostics.jsonl'), 'r') as file:
+            for _, line in zip(range(metadata['n_runs']), file):
+                run_diagnostics.append(json.loads(line))
+    else:
+        run_diagnostics = [None]*metadata['n_runs']
+
+    return metadata, columns, run_diagnostics
+
+
+def read_metadata(path):
+
+    metadata_path = os.path.join(path, 'metadata.json')
+    if not os.path.isfile(metadata_path):
+        msg = "The folder '" + str(path) + "' is not a store of flutter derivatives."
+        raise Exception(msg)
+
+    with open(metadata_path, 'r') as file:
+        metadata = json.load(file)
+
+    if metadata['format_version'] > store_format_version:
+        msg = 'The store was written with a newer version of the format ('
+        msg += str(metadata['format_version']) + ').'
+        raise Exception(msg)
+
+    return metadata
+
+
+def _truncate_store(path, metadata):
+
+    # Discard the data written after the rows and runs of the metadata (left
+    # by an interrupted append)
+    for name, dtype in metadata['columns'].items():
+        file_path = os.path.join(path, name + '.bin')
+        n_bytes = metadata['n_rows']*np.dtype(dtype).itemsize
+        if os.path.getsize(file_path) > n_bytes:
+            os.truncate(file_path, n_bytes)
+
+    diagnostics_path = os.path.join(path, 'diagnostics.jsonl')
+    with open(diagnostics_path, 'rb') as file:
+        for _ in range(metadata['n_runs']):
+            file.readline()
+        n_bytes = file.tell()
+    if os.path.getsize(diagnostics_path) > n_bytes:
+        os.truncate(diagnostics_path, n_bytes)
+
+
+def _to_json(value):
+
+    # NumPy scalars and arrays in the diagnostics and parameters
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+
+    raise TypeError('Object of type ' + type(value).__name__ + ' is not JSON serializable.')
@@ -0,0 +1,172 @@
+
+import numpy as np
+from collections import deque
+
+import flutterpy.derivatives.sinusoidal_utilities as util
+from flutterpy.derivatives.flutter_derivatives import FlutterDerivatives
+
+
+# Incremental estimator of flutter derivatives for live acquisition.
+# The motion and force samples are given block by block and the running
+# least-squares statistics of the sinusoidal model are updated, so the
+# derivatives can be evaluated at any time without fitting from scratch.
+class StreamingFlutterDerivatives():
+
+    def __init__(self, motion, forces, omega, U, B, delta_t, fluid_dens,
+        forgetting_factor=None, window=None):
+
+        # Check the motion and force names
+        if motion not in ('heave', 'pitch', 'sway'):
+            msg = "The motion '" + str(motion) + "' is not recognised. "
+            msg += "Choose one of the following: 'heave', 'pitch', 'sway'."
+            raise Exception(msg)
+        forces = list(forces)
+        if len(forces) == 0 or not set(forces).issubset({'lift', 'moment', 'drag'}):
+            msg = 'The forces must be a non-empty list with some of the following: '
+            msg += "'lift', 'moment', 'drag'."
+            raise Exception(msg)
+
+        # Only one way of discarding old samples can be used
+        if forgetting_factor is not None and window is not None:
+            msg = 'Provide either a forgetting factor or a sliding window, not both.'
+            raise Exception(msg)
+        if forgetting_factor is not None and not 0 < forgetting_factor <= 1:
+            raise Exception('The forgetting factor must be in the interval (0, 1].')
+
+        self.motion = motion
+        self.forces = forces
+        self.sim_params = {'U': U, 'B': B, 'delta_t': delta_t, 'fluid_dens': fluid_dens, 'omega': omega}
+        self.window = window
+
+        # Running statistics of the motion (series 0) and the forces
+        self.statistics = util.SinusoidalStatistics(omega, delta_t, n_series=1+len(forces),
+            forgetting_factor=forgetting_factor)
+
+        # Contributions of the blocks inside the sliding window
+        self._window_blocks = deque()
+
+        # Convergence history (one entry per block)
+        self.history = []
+
+
+    def update(self, **blocks):
+
+        # Add a new block of samples. The motion and all the forces must be
+        # given as keyword arguments with the same number of samples.
+        names = [self.motion] + self.forces
+        missing = [name for name in names if name not in blocks]
+        if len(missing) > 0:
+            msg = 'Missing time series in the block: ' + str(missing)[1:-1] + '.'
+            raise Exception(msg)
+
+        y_block = np.array([np.asarray(blocks[name], dtype=np.float64) for name in names])
+        if y_block.ndim != 2:
+            raise Exception('All the time series in the block must have the same length.')
+
+        # Update the statistics (and remove the blocks out of the window)
+        if self.window is None:
+            self.statistics.update(y_block)
+        else:
+            state_before = self.statistics.get_state()
+            self.statistics.update(y_block)
+            state_after = self.statistics.get_state()
+            self._window_blocks.append(tuple(after - before
+                for after, before in zip(state_after, state_before)))
+
+            while self.statistics.n_samples - self._window_blocks[0][3] >= self.window:
+                self.statistics.subtract_state(self._window_blocks.popleft())
+
+        # Save the convergence data of this block
+        self._update_history()
+
+
+    def get_derivatives(self):
+
+        # Current estimate of the derivatives: {deriv: value} and Ured
+        values, _, diagnostics = self._calculate_derivatives()
+
+        return values, diagnostics['Ured']
+
+
+    def get_convergence(self):
+
+        # Data of the last block: number of samples used, maximum relative
+        # change of the derivatives and RMS residuals of each time series
+        if len(self.history) == 0:
+            raise Exception('No samples have been provided yet.')
+
+        return self.history[-1]
+
+
+    def has_converged(self, tolerance=1e-3, n_blocks=3):
+
+        # True if the relative change of all the derivatives has been
+        # below the tolerance for the last n_blocks blocks
+        if len(self.history) < n_blocks + 1:
+            return False
+
+        return all(entry['max_change'] < tolerance for entry in self.history[-n_blocks:])
+
+
+    def store(self, fd):
+
+        # Save the current estimate (and its standard deviations) into a
+        # FlutterDerivatives object
+        values, std, diagnostics = self._calculate_derivatives()
+        fd._store_run_results(diagnostics['Ured'], diagnostics['omega'], diagnostics['motion_amplitude'],
+            values, [diagnostics], std=std)
+
+
+    def _calculate_derivatives(self):
+
+        # motion = ampl*sin(omega*t + phi)
+        motion_fit = self.statistics.solve(0, function='phase')
+        (motion_ampl, phi), _, motion_residual_norm = motion_fit
+        force_residual_norms = {}
+
+        values = {}
+        std = {}
+        for f_index, f_name in enumerate(self.forces):
+            # force = a + b*cos(omega*t) + c*sin(omega*t)
+            force_fit = self.statistics.solve(f_index+1, function='sin_cos')
+            (_, b, c), _, force_residual_norms[f_name] = force_fit
+
+            derivs = FlutterDerivatives._get_derivatives_to_calculate(self.motion, f_name)
+            ratio = FlutterDerivatives._force_motion_ratio(motion_ampl, phi, b, c)
+            values[derivs[0]], values[derivs[1]], Ured = FlutterDerivatives._derivative_pair_values(
+                self.motion, f_name, self.sim_params, self.sim_params['omega'], ratio)
+            std[derivs[0]], std[derivs[1]] = FlutterDerivatives._derivative_pair_std(self.motion, f_name,
+                self.sim_params, motion_fit, force_fit)
+
+        # Fit diagnostics, with the same format as FlutterDerivatives.run_diagnostics
+        diagnostics = {'motion': self.motion, 'forces': force_residual_norms,
+            'omega': self.sim_params['omega'], 'Ured': Ured,
+            'motion_amplitude': motion_ampl, 'motion_phase': phi,
+            'motion_residual_norm': motion_residual_norm}
+
+        return values, std, diagnostics
+
+
+    def _update_history(self):
+
+        # Not enough samples for a fit yet
+        if self.statistics.n_samples <= 3:
+            return
+
+        values, _, diagnostics = self._calculate_derivatives()
+        residual_norms = dict(diagnostics['forces'])
+        residual_norms[self.motion] = diagnostics['motion_residual_norm']
+
+        # Relative change with respect to the previous block
+        if len(self.history) == 0:
+            max_change = np.inf
+        else:
+            previous = self.history[-1]['values']
+            max_change = max(abs(values[deriv] - previous[deriv]) / max(abs(values[deriv]), np.finfo(float).tiny)
+                for deriv in values)
+
+        rms_residuals = {name: residual_norm / np.sqrt(self.statistics.n_samples)
+            for name, residual_norm in residual_norms.items()}
+
+        self.history.append({'n_samples': self.statistics.n_samples, 'values': values,
+            'max_change': max_change, 'rms_residuals': rms_residuals})
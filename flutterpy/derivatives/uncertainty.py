@@ -0,0 +1,71 @@
+
+import numpy as np
+
+
+# Uncertainty of the derivatives calculated from forced motion.
+# The derivatives are proportional to the real and imaginary parts of the
+# complex ratio force/motion,
+#   ratio = (c + i*b) / (c_m + i*b_m),
+# with b and c the cosine and sine coefficients of the force and motion fits,
+# so their standard deviations follow from the ones of the ratio, given as
+# std(Re(ratio)) + i*std(Im(ratio)).
+
+
+def ratio_standard_deviation(motion_coeffs, motion_cov, force_coeffs, force_cov):
+
+    # Linear propagation of the covariances of the cosine and sine
+    # coefficients (b, c) of the motion and force fits, shapes (..., 2) and
+    # (..., 2, 2), assuming that both fits are independent
+    motion = motion_coeffs[...,1] + 1j*motion_coeffs[...,0]
+    ratio = (force_coeffs[...,1] + 1j*force_coeffs[...,0]) / motion
+
+    force_jacobian = _product_jacobian(1/motion)
+    motion_jacobian = _product_jacobian(-ratio/motion)
+    cov = (force_jacobian @ force_cov @ np.swapaxes(force_jacobian, -1, -2)
+        + motion_jacobian @ motion_cov @ np.swapaxes(motion_jacobian, -1, -2))
+
+    return np.sqrt(cov[...,0,0]) + 1j*np.sqrt(cov[...,1,1])
+
+
+def amplitude_phase_to_cos_sin(ampl, phi, cov):
+
+    # Coefficients (b, c) = (ampl*sin(phi), ampl*cos(phi)) of the motion
+    # and their covariance, from the ones of (ampl, phi)
+    sin, cos = np.sin(phi), np.cos(phi)
+    jacobian = np.array([[sin, ampl*cos], [cos, -ampl*sin]])
+
+    return np.array([ampl*sin, ampl*cos]), jacobian @ cov @ jacobian.T
+
+
+def bootstrap_counts(n_blocks, n_resamples, seed=None):
+
+    # Number of times each block is drawn in each resample (with
+    # replacement), shape (n_resamples, n_blocks)
+    rng = np.random.default_rng(seed)
+
+    return rng.multinomial(n_blocks, np.full(n_blocks, 1/n_blocks), size=n_resamples)
+
+
+def resampled_coefficients(counts, block_grams, block_xty, columns):
+
+    # Least squares coefficients of all the resamples at once, shape
+    # (n_resamples, columns, series). The statistics of a resample are the
+    # sums of the ones of its blocks (X^T*X and X^T*y of each block, computed
+    # once with the fixed design matrix), so no fit is repeated on the data.
+    gram = np.tensordot(counts, block_grams[:,columns][:,:,columns], axes=1)
+    xty = np.tensordot(counts, block_xty[:,columns], axes=1)
+
+    return np.linalg.solve(gram, xty)
+
+
+def _product_jacobian(factor):
+
+    # Jacobian of the real and imaginary parts of factor*(c + i*b)
+    # with respect to (b, c)
+    jacobian = np.empty(np.shape(factor) + (2, 2))
+    jacobian[...,0,0] = -np.imag(factor)
+    jacobian[...,0,1] = np.real(factor)
+    jacobian[...,1,0] = np.real(factor)
+    jacobian[...,1,1] = np.imag(factor)
+
+    return jacobian
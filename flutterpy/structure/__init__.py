@@ -0,0 +1,2 @@
+
+from flutterpy.structure.structural_model import *
@@ -0,0 +1,85 @@
+
+import numpy as np
+
+
+# Degrees of freedom of the cross-section, in the order used in the
+# aeroelastic matrices (associated with lift, moment and drag)
+section_dofs = ['heave', 'pitch', 'sway']
+
+
+# Modal description of a structure for aeroelastic analyses.
+# Each mode has a generalized mass, a natural frequency (Hz) and a damping
+# ratio. The mode shapes give the heave, pitch and sway displacements of
+# each point along the span, and the weights are the lengths associated
+# with the points (used to integrate the aerodynamic forces). The positions
+# of the points along the span (used for the spatial coherence of the wind)
+# are by default the centres of consecutive segments with those lengths.
+class StructuralModel():
+
+    def __init__(self, modal_masses, frequencies, damping_ratios, mode_shapes=None, weights=None, positions=None):
+
+        self.modal_masses = np.atleast_1d(np.asarray(modal_masses, dtype=np.float64))
+        self.frequencies = np.atleast_1d(np.asarray(frequencies, dtype=np.float64))
+        self.damping_ratios = np.atleast_1d(np.asarray(damping_ratios, dtype=np.float64))
+        n_modes = len(self.modal_masses)
+
+        if self.frequencies.shape != (n_modes,) or self.damping_ratios.shape != (n_modes,):
+            msg = 'The modal masses, frequencies and damping ratios '
+            msg += 'must have one value per mode.'
+            raise Exception(msg)
+
+        # Mode shapes with shape (points, 3, modes)
+        if mode_shapes is None:
+            if n_modes > 3:
+                raise Exception('Mode shapes are needed for more than 3 modes.')
+            mode_shapes = np.eye(3)[np.newaxis,:,:n_modes]
+        self.mode_shapes = np.asarray(mode_shapes, dtype=np.float64)
+        if self.mode_shapes.ndim != 3 or self.mode_shapes.shape[1:] != (3, n_modes):
+            msg = 'The mode shapes must have shape (points, 3, modes), with the heave, '
+            msg += 'pitch and sway components of each mode at each point.'
+            raise Exception(msg)
+
+        if weights is None:
+            weights = np.ones(self.mode_shapes.shape[0])
+        self.weights = np.asarray(weights, dtype=np.float64)
+        if self.weights.shape != (self.mode_shapes.shape[0],):
+            raise Exception('There must be one weight per point of the mode shapes.')
+
+        if positions is None:
+            positions = np.cumsum(self.weights) - 0.5*self.weights
+        self.positions = np.asarray(positions, dtype=np.float64)
+        if self.positions.shape != self.weights.shape:
+            raise Exception('There must be one position per point of the mode shapes.')
+
+        # Modal integrals of the products of the mode shape components:
+        # integrals[i,j,k,l] = sum over points of weight*phi[i,k]*phi[j,l]
+        self.modal_integrals = np.einsum('p,pik,pjl->ijkl', self.weights, self.mode_shapes, self.mode_shapes)
+
+
+    @classmethod
+    def section(cls, mass, inertia, frequencies, damping_ratios, sway_mass=None):
+
+        # Rigid section model with heave and pitch (and sway if its mass is
+        # given). Frequencies and damping ratios are given in the same order.
+        masses = [mass, inertia]
+        if sway_mass is not None:
+            masses.append(sway_mass)
+
+        return cls(masses, frequencies, damping_ratios)
+
+
+    @property
+    def n_modes(self):
+
+        return len(self.modal_masses)
+
+
+    def get_matrices(self):
+
+        # Generalized mass, damping and stiffness matrices
+        omegas = 2*np.pi*self.frequencies
+        mass_matrix = np.diag(self.modal_masses)
+        damping_matrix = np.diag(2*self.damping_ratios*omegas*self.modal_masses)
+        stiffness_matrix = np.diag(omegas**2*self.modal_masses)
+
+        return mass_matrix, damping_matrix, stiffness_matrix
@@ -15,7 +15,7 @@ setup(
     url = "https://github.com/mtnzguillermo/flutterpy",
     python_requires = ">=3.7",
     install_requires = [
-        "numpy >= 1.17.4",
+        "numpy >= 1.20",
         "scipy >= 1.6.3",
         "sympy >= 1.5.1",
         "matplotlib >= 3.2.0"
@@ -26,7 +26,7 @@ setup(
         ]
     },
     keywords = "flutter, wind, aeroelasticity",
-    packages = find_packages(exclude=("tests","docs")),
+    packages = find_packages(exclude=("tests","docs","benchmarks")),
     classifiers = [
 
     ]
@@ -0,0 +1,92 @@
+import unittest
+import numpy as np
+from flutterpy.buffeting import BuffetingSolver, von_karman_spectra
+from flutterpy.derivatives.aerodynamic_matrices import derivative_matrices
+from flutterpy.structure import StructuralModel
+
+
+class TestBuffeting(unittest.TestCase):
+
+    def setUp(self):
+        self.B = 20.0
+        self.fluid_dens = 1.25
+        self.derivatives = {'l3': lambda Ured: -0.3*Ured, 'l4': lambda Ured: 0.05*np.ones_like(Ured),
+            'm3': lambda Ured: 0.02*Ured, 'm5': lambda Ured: -0.05*Ured, 'm6': lambda Ured: -0.01*Ured}
+        self.coefficients = {'C_D': 0.1, 'C_L': -0.2, 'dC_L': 4.0, 'dC_M': 1.2}
+        self.spectra = von_karman_spectra((0.1, 0.05), (120.0, 40.0))
+
+        # Span with heave and pitch modes
+        positions = np.linspace(0, 600, 4)
+        mode_shapes = np.zeros((4, 3, 2))
+        mode_shapes[:,0,0] = np.sin(np.pi*(positions + 100)/800)
+        mode_shapes[:,1,1] = np.sin(np.pi*(positions + 100)/800)
+        self.span = StructuralModel([2e6, 4e7], [0.2, 0.5], [0.005, 0.005], mode_shapes,
+            np.full(4, 200.0), positions)
+
+    def test_matches_reference(self):
+
+        U = 30.0
+        frequencies = np.array([0.1, 0.2, 0.35, 0.5, 1.0])
+        admittance = lambda K: 1/(1 + 2*K)[:,np.newaxis,np.newaxis]
+        solver = BuffetingSolver(self.derivatives, self.B, self.fluid_dens, self.coefficients, self.spectra,
+            admittance=admittance)
+        result = solver.solve(self.span, U, frequencies)
+
+        # Frequency by frequency, point by point
+        mass, damping, stiffness = self.span.get_matrices()
+        S_u, S_w = self.spectra(frequencies, U)
+        for index, frequency in enumerate(frequencies):
+            omega = 2*np.pi*frequency
+            Ured = U/(frequency*self.B)
+            velocity, displacement = derivative_matrices({deriv: function(Ured)
+                for deriv, function in self.derivatives.items()}, self.B)
+            pressure = 0.5*self.fluid_dens*U**2
+            impedance = -omega**2*mass + 1j*omega*damping + stiffness
+            force_spectra = np.zeros((2, 2))
+            load = solver.load_matrix*admittance(np.array([omega*self.B/U]))[0]
+            for p, (shape_p, weight_p, x_p) in enumerate(zip(self.span.mode_shapes, self.span.weights, self.span.positions)):
+                impedance -= weight_p*shape_p.T @ (pressure*(displacement + 1j*omega*self.B/U*velocity)) @ shape_p
+                for shape_q, weight_q, x_q in zip(self.span.mode_shapes, self.span.weights, self.span.positions):
+                    for component, spectrum in enumerate((S_u[index], S_w[index])):
+                        coherence = np.exp(-solver.coherence_decay[component]*frequency*abs(x_p - x_q)/U)
+                        force_spectra += (weight_p*weight_q*spectrum*coherence*(pressure/U)**2
+                            * np.outer(shape_p.T @ load[:,component], shape_q.T @ load[:,component]))
+            frequency_response = np.linalg.inv(impedance)
+            response = frequency_response @ force_spectra @ frequency_response.conj().T
+
+            np.testing.assert_allclose(result['modal_force_spectra'][index], force_spectra, rtol=1e-10)
+            np.testing.assert_allclose(result['modal_response_spectra'][index], response, rtol=1e-10)
+
+        # Response spectra at the points
+        expected = np.einsum('pim,fmm,pim->fpi', self.span.mode_shapes, result['modal_response_spectra'].real,
+            self.span.mode_shapes)
+        np.testing.assert_allclose(result['response_spectra'][:,:,:2], expected[:,:,:2], rtol=1e-10)
+
+    def test_full_coherence(self):
+
+        # With full coherence and uniform modes, the span is equivalent to a
+        # single point with the whole length
+        U = 25.0
+        frequencies = np.linspace(0.05, 2, 200)
+        mode_shapes = np.zeros((10, 3, 2))
+        mode_shapes[:,0,0] = 1
+        mode_shapes[:,1,1] = 1
+        span = StructuralModel([1e6, 1e7], [0.2, 0.5], [0.005, 0.005], mode_shapes, np.full(10, 50.0))
+        point = StructuralModel([1e6, 1e7], [0.2, 0.5], [0.005, 0.005], mode_shapes[:1], [500.0])
+
+        solver = BuffetingSolver(self.derivatives, self.B, self.fluid_dens, self.coefficients, self.spectra,
+            coherence_decay=(0, 0))
+        result_span = solver.solve(span, U, frequencies, max_chunk_memory=8000)
+        result_point = solver.solve(point, U, frequencies)
+        np.testing.assert_allclose(result_span['modal_response_spectra'], result_point['modal_response_spectra'], rtol=1e-10)
+        np.testing.assert_allclose(result_span['std'], np.repeat(result_point['std'], 10, axis=0), rtol=1e-10)
+        self.assertEqual(result_span['std'][0,2], 0)
+
+        with self.assertRaises(Exception):
+            solver.solve(span, U, np.linspace(0, 1, 10))
+        with self.assertRaises(Exception):
+            BuffetingSolver(self.derivatives, self.B, self.fluid_dens, {'CL': 1.0}, self.spectra)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+
+import unittest
+import warnings
+import numpy as np
+from flutterpy.criticalspeed import FlutterSolver, critical_flutter_speed
+from flutterpy.structure import StructuralModel
+
+
+class TestCriticalSpeed(unittest.TestCase):
+
+    def setUp(self):
+        self.B = 0.3
+        self.fluid_dens = 1.2
+        self.section = StructuralModel.section(5.0, 0.05, [1.5, 2.0], [0.005, 0.01])
+
+    def test_torsional_flutter(self):
+
+        # With a constant m5 only, the pitch damping vanishes when
+        # 0.5*dens*U*B^3*m5 = 2*zeta*omega*inertia
+        m5 = 2.0
+        result = critical_flutter_speed({'m5': lambda Ured: np.full_like(Ured, m5)},
+            self.section, self.B, self.fluid_dens, (0.1, 2))
+
+        expected = 4*0.01*2*np.pi*2.0*0.05/(self.fluid_dens*self.B**3*m5)
+        self.assertAlmostEqual(result['U'], expected, places=6)
+        self.assertAlmostEqual(result['frequency'], 2.0, places=6)
+        self.assertEqual(result['mode'], 1)
+
+    def test_modal_model_matches_section(self):
+
+        derivatives = {'l3': lambda Ured: -0.5*np.ones_like(Ured), 'l4': lambda Ured: 0.1*np.ones_like(Ured),
+            'm3': lambda Ured: 0.2*np.ones_like(Ured), 'm5': lambda Ured: 0.3 - 0.01*Ured,
+            'm6': lambda Ured: 0.05*Ured}
+        solver = FlutterSolver(derivatives, self.B, self.fluid_dens)
+        result_section = solver.solve(self.section, (1, 200))
+
+        # Same section, modelled as a span of 10 points with uniform modes
+        mode_shapes = np.zeros((10, 3, 2))
+        mode_shapes[:,0,0] = 1
+        mode_shapes[:,1,1] = 1
+        span = StructuralModel([50.0, 0.5], [1.5, 2.0], [0.005, 0.01], mode_shapes, np.ones(10))
+        result_span = solver.solve(span, (1, 200))
+
+        self.assertAlmostEqual(result_span['U'], result_section['U'], places=6)
+        self.assertAlmostEqual(result_span['frequency'], result_section['frequency'], places=6)
+
+        # The refined result is consistent with the grid sweep
+        sweep = solver.damping_sweep(self.section, [0.99*result_section['U'], 1.01*result_section['U']])
+        self.assertLess(sweep['damping'][0, result_section['mode']], 0)
+        self.assertGreater(sweep['damping'][1, result_section['mode']], 0)
+
+    def test_no_flutter(self):
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            result = critical_flutter_speed({'m5': lambda Ured: -np.ones_like(Ured)},
+                self.section, self.B, self.fluid_dens, (0.1, 50))
+        self.assertTrue(np.isnan(result['U']))
+        self.assertEqual(len(caught), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,789 @@
+
+import os
+import tempfile
+import unittest
+import warnings
+import numpy as np
+from flutterpy.derivatives import FlutterDerivatives, StreamingFlutterDerivatives
+from flutterpy.derivatives.derivative_table import DerivativeTable
+from benchmarks import generators
+
+
+def synthetic_forced_motion(m_name, derivs, noise=0.0, **kwargs):
+
+    # Forced motion time series from known base derivatives (see
+    # benchmarks.generators), without noise by default and with a mean force
+    return generators.synthetic_forced_motion(m_name, derivs=derivs, noise=noise, offset=0.2, **kwargs)
+
+
+class TestForcedMotion(unittest.TestCase):
+
+    def setUp(self):
+        self.derivs = {letter+str(number): (number - 3.5)*(1 + 'dlm'.index(letter))
+            for letter in 'dlm' for number in range(1,7)}
+        self.sim_params = {'U': 12.0, 'B': 0.5, 'delta_t': 0.002, 'fluid_dens': 1.2}
+        self.omega = 2*np.pi*2.5
+
+    def test_single_run(self):
+
+        fd = FlutterDerivatives()
+        data = synthetic_forced_motion('pitch', self.derivs, omega=self.omega,
+            n_samples=3000, **self.sim_params)
+        fd.calculate_derivatives_from_forced_motion(omega=self.omega, **self.sim_params, **data)
+
+        for deriv in ['l5', 'l6', 'm5', 'm6', 'd5', 'd6']:
+            np.testing.assert_allclose(fd.fd_data[deriv]['values'], [self.derivs[deriv]])
+            np.testing.assert_allclose(fd.fd_data[deriv]['Ured'], [12.0/2.5/0.5])
+        self.assertEqual(len(fd.fd_data['l3']['values']), 0)
+
+    def test_force_normalization(self):
+
+        # Forces per unit length 0.5*dens*U^2*B*(d_0*motion'/U + d_1*motion/B)
+        # (times B for the pitch motion and for the moment). For a unit
+        # motion sin(omega*t), the complex amplitude of the force is
+        # 0.5*dens*U^2*B*f1*f2*(d_1/B + i*omega*d_0/U).
+        U, B, fluid_dens = 12.0, 0.5, 1.2
+        sim_params = {'U': U, 'B': B, 'fluid_dens': fluid_dens}
+        for m_name, f_name, f1, f2 in [('heave', 'lift', 1, 1), ('pitch', 'moment', B, B)]:
+            ratio = 0.5*fluid_dens*U**2*B*f1*f2 * (-1.5/B + 1j*self.omega*0.7/U)
+            values_0, values_1, Ured = FlutterDerivatives._derivative_pair_values(m_name, f_name, sim_params,
+                self.omega, ratio)
+            self.assertAlmostEqual(values_0, 0.7)
+            self.assertAlmostEqual(values_1, -1.5)
+            self.assertAlmostEqual(Ured, 2*np.pi*U/(self.omega*B))
+
+    def test_multiple_motions(self):
+
+        # Heave, pitch and sway excited at once, at different frequencies
+        omegas = {'heave': self.omega, 'pitch': 1.4*self.omega, 'sway': 1.8*self.omega}
+        data = {}
+        for m_name, omega in omegas.items():
+            motion_data = synthetic_forced_motion(m_name, self.derivs, omega=omega,
+                n_samples=3000, **self.sim_params)
+            for name, series in motion_data.items():
+                data[name] = data.get(name, 0) + series
+
+        fd = FlutterDerivatives()
+        fd.calculate_derivatives_from_forced_motion(omega=omegas, **self.sim_params, **data)
+
+        # All the derivatives come from the same run, one row per motion
+        for deriv, value in self.derivs.items():
+            np.testing.assert_allclose(fd.fd_data[deriv]['values'], [value], rtol=1e-9)
+        np.testing.assert_array_equal(fd.table.column('run'), [0, 0, 0])
+        np.testing.assert_allclose(fd.fd_data['m6']['Ured'], [12.0/2.5/0.5/1.4])
+        self.assertEqual(fd.run_diagnostics[0]['motion'], ['heave', 'pitch', 'sway'])
+        self.assertEqual(len(fd.run_diagnostics[0]['omega']), 3)
+
+        # Frequencies in the order of the motions, or estimated
+        fd_sequence = FlutterDerivatives()
+        fd_sequence.calculate_derivatives_from_forced_motion(omega=list(omegas.values()), **self.sim_params, **data)
+        np.testing.assert_allclose(fd_sequence.fd_data['l4']['values'], fd.fd_data['l4']['values'])
+
+        # The frequencies must be given for all the motions and be separable
+        with self.assertRaises(Exception):
+            fd.calculate_derivatives_from_forced_motion(omega=self.omega, **self.sim_params, **data)
+        with self.assertRaises(Exception):
+            fd.calculate_derivatives_from_forced_motion(omega=[self.omega, self.omega+0.1, 2*self.omega],
+                **self.sim_params, **data)
+        with self.assertRaises(Exception):
+            fd.calculate_derivatives_from_forced_motion_batch(omega=self.omega, **self.sim_params, **data)
+
+    def test_batch_matches_single_runs(self):
+
+        U = np.array([4.0, 8.0, 12.0, 16.0])
+        omegas = np.array([self.omega, self.omega, 2*self.omega, self.omega])
+        sim_params = dict(self.sim_params)
+        sim_params.pop('U')
+
+        runs = []
+        fd_single = FlutterDerivatives()
+        for run_U, run_omega in zip(U, omegas):
+            data = synthetic_forced_motion('heave', self.derivs, U=run_U, omega=run_omega,
+                n_samples=2000, noise=0.01, **sim_params)
+            fd_single.calculate_derivatives_from_forced_motion(U=run_U, omega=run_omega, **sim_params, **data)
+            runs.append(dict(data, U=run_U, omega=run_omega))
+
+        # From a list of records
+        fd_records = FlutterDerivatives()
+        fd_records.calculate_derivatives_from_forced_motion_batch(runs, **sim_params)
+
+        # From stacked arrays
+        fd_arrays = FlutterDerivatives()
+        stacked = {key: np.array([run[key] for run in runs]) for key in runs[0]}
+        fd_arrays.calculate_derivatives_from_forced_motion_batch(**stacked, **sim_params)
+
+        for fd_batch in [fd_records, fd_arrays]:
+            for deriv in ['l3', 'l4', 'm3', 'm4', 'd3', 'd4']:
+                np.testing.assert_allclose(fd_batch.fd_data[deriv]['values'],
+                    fd_single.fd_data[deriv]['values'], rtol=1e-10)
+                np.testing.assert_allclose(fd_batch.fd_data[deriv]['Ured'],
+                    fd_single.fd_data[deriv]['Ured'])
+
+    def test_batch_wrong_parameter_length(self):
+
+        data = synthetic_forced_motion('heave', self.derivs, omega=self.omega,
+            n_samples=500, **self.sim_params)
+        stacked = {key: np.array([value, value]) for key, value in data.items()}
+
+        fd = FlutterDerivatives()
+        with self.assertRaises(Exception):
+            fd.calculate_derivatives_from_forced_motion_batch(omega=[1.0, 2.0, 3.0], **stacked, **self.sim_params)
+
+    def test_parallel_matches_serial(self):
+
+        runs = []
+        for index, run_U in enumerate([4.0, 8.0, 12.0, 16.0, 20.0]):
+            for m_name in ['heave', 'pitch']:
+                data = synthetic_forced_motion(m_name, self.derivs, U=run_U, omega=self.omega,
+                    B=0.5, fluid_dens=1.2, delta_t=0.002, n_samples=1000, noise=0.05, seed=index)
+                runs.append(dict(data, U=run_U, omega=self.omega))
+
+        fd_serial = FlutterDerivatives()
+        fd_serial.set_default_parameters(B=0.5, fluid_dens=1.2, delta_t=0.002)
+        for run in runs:
+            fd_serial.calculate_derivatives_from_forced_motion(**run)
+
+        fd_parallel = FlutterDerivatives()
+        fd_parallel.set_default_parameters(B=0.5, fluid_dens=1.2, delta_t=0.002)
+        fd_parallel.calculate_derivatives_from_forced_motion_parallel(runs, max_workers=2, chunksize=3)
+
+        for deriv in fd_serial.fd_data:
+            np.testing.assert_array_equal(fd_parallel.fd_data[deriv]['values'], fd_serial.fd_data[deriv]['values'])
+            np.testing.assert_array_equal(fd_parallel.fd_data[deriv]['Ured'], fd_serial.fd_data[deriv]['Ured'])
+        np.testing.assert_array_equal(fd_parallel.table.column('run'), fd_serial.table.column('run'))
+        self.assertEqual(len(fd_parallel.run_diagnostics), len(runs))
+        self.assertEqual([d['Ured'] for d in fd_parallel.run_diagnostics],
+            [d['Ured'] for d in fd_serial.run_diagnostics])
+
+    def test_time_series_from_files(self):
+
+        data = synthetic_forced_motion('heave', self.derivs, omega=self.omega,
+            n_samples=5000, noise=0.01, **self.sim_params)
+
+        fd_memory = FlutterDerivatives()
+        fd_memory.calculate_derivatives_from_forced_motion(omega=self.omega, **self.sim_params, **data)
+
+        with tempfile.TemporaryDirectory() as directory:
+            # Motion as .npy file, lift as raw binary and moment as memory map
+            np.save(os.path.join(directory, 'heave.npy'), data['heave'])
+            data['lift'].tofile(os.path.join(directory, 'lift.bin'))
+            np.save(os.path.join(directory, 'moment.npy'), data['moment'])
+            files = {'heave': os.path.join(directory, 'heave.npy'),
+                'lift': os.path.join(directory, 'lift.bin'),
+                'moment': np.load(os.path.join(directory, 'moment.npy'), mmap_mode='r')}
+
+            fd_files = FlutterDerivatives()
+            fd_files.chunk_size = 999
+            fd_files.calculate_derivatives_from_forced_motion(omega=self.omega, **self.sim_params, **files)
+            del files
+
+        for deriv in ['l3', 'l4', 'm3', 'm4']:
+            np.testing.assert_allclose(fd_files.fd_data[deriv]['values'],
+                fd_memory.fd_data[deriv]['values'], rtol=1e-9)
+
+    def test_different_lengths_raises(self):
+
+        data = synthetic_forced_motion('heave', self.derivs, omega=self.omega,
+            n_samples=500, **self.sim_params)
+        data['lift'] = data['lift'][:-1]
+
+        fd = FlutterDerivatives()
+        with self.assertRaises(Exception):
+            fd.calculate_derivatives_from_forced_motion(omega=self.omega, **self.sim_params, **data)
+
+    def test_notation_cache(self):
+
+        fd = FlutterDerivatives()
+        data = synthetic_forced_motion('heave', self.derivs, omega=self.omega,
+            n_samples=1000, **self.sim_params)
+        fd.calculate_derivatives_from_forced_motion(omega=self.omega, **self.sim_params, **data)
+
+        fd_scanlan = fd.get_all_derivatives('scanlan')
+        self.assertIs(fd.get_all_derivatives('scanlan')['H1']['values'], fd_scanlan['H1']['values'])
+        self.assertFalse(fd_scanlan['H1']['values'].flags.writeable)
+        self.assertEqual(len(fd_scanlan['H1']['values']), 1)
+
+        # Changes in the returned dictionaries do not reach the cache
+        fd_scanlan['H1']['values'] = np.zeros(1)
+        del fd_scanlan['H2']
+        fd_scanlan = fd.get_all_derivatives('scanlan')
+        self.assertIn('H2', fd_scanlan)
+        self.assertFalse(fd_scanlan['H1']['values'].flags.writeable)
+
+        # New data invalidates the cached conversions
+        fd.calculate_derivatives_from_forced_motion(omega=2*self.omega, **self.sim_params, **data)
+        self.assertEqual(len(fd.get_all_derivatives('scanlan')['H1']['values']), 2)
+
+        fd.reset_derivative('l3')
+        self.assertEqual(len(fd.get_all_derivatives('scanlan')['H1']['values']), 0)
+
+        fd.reset_all_derivatives()
+        self.assertEqual(len(fd.get_all_derivatives('classic')['A4']['values']), 0)
+
+    def test_profiling(self):
+
+        fd = FlutterDerivatives()
+        data = synthetic_forced_motion('heave', self.derivs, omega=self.omega,
+            n_samples=1000, **self.sim_params)
+        with self.assertRaises(Exception):
+            fd.get_profiling_report()
+
+        records = []
+        fd.enable_profiling(callback=records.append)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            fd.calculate_derivatives_from_forced_motion(**self.sim_params, **data)
+        fd.calculate_derivatives_from_forced_motion(omega=self.omega, **self.sim_params, **data)
+        fd.get_all_derivatives('scanlan')
+
+        report = fd.get_profiling_report()
+        self.assertEqual(report['stage'], ['load', 'frequency', 'fit', 'derivatives',
+            'load', 'fit', 'derivatives', 'notation_conversion'])
+        self.assertEqual(report['run'][:5], [0, 0, 0, 0, 1])
+        self.assertTrue(all(time >= 0 for time in report['time']))
+        self.assertEqual(report['n_samples'][1:3], [1000, 1000])
+        self.assertIn('lift', report['force_residual_norm'][3])
+        self.assertEqual(len(records), 8)
+        self.assertIn('notation_conversion', fd.profiler.total_times())
+
+        fd.disable_profiling()
+        fd.calculate_derivatives_from_forced_motion(omega=self.omega, **self.sim_params, **data)
+        self.assertEqual(len(records), 8)
+
+        # Records of the worker processes, merged with the results
+        records = []
+        fd_parallel = FlutterDerivatives()
+        fd_parallel.enable_profiling(callback=records.append)
+        fd_parallel.calculate_derivatives_from_forced_motion_parallel([dict(data, omega=self.omega,
+            **self.sim_params)]*2, max_workers=2)
+        report = fd_parallel.get_profiling_report()
+        self.assertEqual(report['stage'], ['load', 'fit', 'derivatives']*2)
+        self.assertEqual(report['run'], [0, 0, 0, 1, 1, 1])
+        self.assertTrue(all(pid is not None for pid in report['worker']))
+        self.assertEqual(len(records), 6)
+
+
+    def test_preprocessing(self):
+
+        # Finely sampled run with a decaying start-up transient in the forces
+        sim_params = dict(self.sim_params, delta_t=1/(2.5*2000))
+        data = synthetic_forced_motion('heave', self.derivs, omega=self.omega, n_samples=50000, **sim_params)
+        time = np.arange(50000)*sim_params['delta_t']
+        for f_name in ['lift', 'moment', 'drag']:
+            data[f_name] = data[f_name] + 20*np.exp(-time/1.5)*np.sin(3.1*self.omega*time)
+
+        fd = FlutterDerivatives()
+        fd.calculate_derivatives_from_forced_motion(omega=self.omega, **sim_params, **data)
+        fd.enable_preprocessing(samples_per_cycle=40)
+        fd.enable_profiling()
+        fd.calculate_derivatives_from_forced_motion(omega=self.omega, **sim_params, **data)
+
+        info = fd.run_diagnostics[1]['preprocessing']
+        self.assertEqual(info['factor'], 50)
+        self.assertTrue(info['settled'])
+        self.assertGreater(info['first_sample'], 0)
+        self.assertEqual(fd.get_profiling_report()['stage'][1], 'preprocess')
+        for deriv in ['l3', 'l4', 'm3', 'm4']:
+            errors = np.abs(fd.fd_data[deriv]['values'] - self.derivs[deriv])
+            self.assertLess(errors[1], 1e-2*abs(self.derivs[deriv]))
+            self.assertLess(errors[1], errors[0])
+
+
+class TestUncertainty(unittest.TestCase):
+
+    def setUp(self):
+        TestForcedMotion.setUp(self)
+        self.derivs_out = ['l5', 'l6', 'm5', 'm6', 'd5', 'd6']
+
+    def run_pitch(self, fd, seed, noise=0.05, n_samples=4000):
+
+        data = synthetic_forced_motion('pitch', self.derivs, omega=self.omega, n_samples=n_samples,
+            noise=noise, seed=seed, **self.sim_params)
+        fd.calculate_derivatives_from_forced_motion(omega=self.omega, **self.sim_params, **data)
+
+    def test_covariance_matches_scatter(self):
+
+        # Standard deviations from the fits vs the scatter of noisy repetitions
+        fd = FlutterDerivatives()
+        for seed in range(60):
+            self.run_pitch(fd, seed)
+
+        for deriv in self.derivs_out:
+            std = fd.fd_data[deriv]['std']
+            self.assertTrue(np.all(std > 0))
+            scatter = np.std(fd.fd_data[deriv]['values'], ddof=1)
+            self.assertLess(abs(np.mean(std)/scatter - 1), 0.3)
+
+    def test_bootstrap(self):
+
+        fd = FlutterDerivatives()
+        self.run_pitch(fd, 0)
+        fd_bootstrap = FlutterDerivatives()
+        fd_bootstrap.enable_bootstrap(n_resamples=500, cycles_per_block=1, seed=1)
+        self.run_pitch(fd_bootstrap, 0)
+
+        # Same values, standard deviations of the same size (white noise)
+        diagnostics = fd_bootstrap.run_diagnostics[0]['bootstrap']
+        self.assertEqual(diagnostics['n_resamples'], 500)
+        self.assertEqual(diagnostics['block_size'], 200)
+        for deriv in self.derivs_out:
+            np.testing.assert_allclose(fd_bootstrap.fd_data[deriv]['values'], fd.fd_data[deriv]['values'])
+            ratio = fd_bootstrap.fd_data[deriv]['std'][0]/fd.fd_data[deriv]['std'][0]
+            self.assertTrue(0.5 < ratio < 2, deriv)
+
+        # Reproducible with the same seed
+        fd_repeated = FlutterDerivatives()
+        fd_repeated.enable_bootstrap(n_resamples=500, cycles_per_block=1, seed=1)
+        self.run_pitch(fd_repeated, 0)
+        np.testing.assert_array_equal(fd_repeated.fd_data['m6']['std'], fd_bootstrap.fd_data['m6']['std'])
+
+    def test_batch_matches_single_runs(self):
+
+        fd_single = FlutterDerivatives()
+        runs = []
+        for seed in range(3):
+            data = synthetic_forced_motion('pitch', self.derivs, omega=self.omega, n_samples=2000,
+                noise=0.05, seed=seed, **self.sim_params)
+            fd_single.calculate_derivatives_from_forced_motion(omega=self.omega, **self.sim_params, **data)
+            runs.append(dict(data, omega=self.omega))
+
+        fd_batch = FlutterDerivatives()
+        fd_batch.calculate_derivatives_from_forced_motion_batch(runs, **self.sim_params)
+        for deriv in self.derivs_out:
+            np.testing.assert_allclose(fd_batch.fd_data[deriv]['std'], fd_single.fd_data[deriv]['std'], rtol=1e-6)
+
+        # Also with the bootstrap (run by run)
+        for fd in [fd_single, fd_batch]:
+            fd.reset_all_derivatives()
+            fd.enable_bootstrap(n_resamples=200, cycles_per_block=1, seed=2)
+        for run in runs:
+            fd_single.calculate_derivatives_from_forced_motion(**self.sim_params, **run)
+        fd_batch.calculate_derivatives_from_forced_motion_batch(runs, **self.sim_params)
+        for deriv in self.derivs_out:
+            np.testing.assert_allclose(fd_batch.fd_data[deriv]['std'], fd_single.fd_data[deriv]['std'], rtol=1e-6)
+        self.assertEqual(fd_batch.run_diagnostics[2]['bootstrap'], fd_single.run_diagnostics[2]['bootstrap'])
+
+    def test_notations_and_store(self):
+
+        fd = FlutterDerivatives()
+        self.run_pitch(fd, 0)
+        fd_data = fd.get_all_derivatives('scanlan')
+
+        # A2 = K*l5/(2*pi): same relative standard deviation as l5
+        np.testing.assert_allclose(fd_data['A2']['std']/np.abs(fd_data['A2']['values']),
+            fd.fd_data['m5']['std']/np.abs(fd.fd_data['m5']['values']))
+
+        # Rows without standard deviations (NaN) and round trip through a store
+        fd.reset_from_dictionary({'l4': {'values': [1.0], 'Ured': [2.0]}})
+        self.assertTrue(np.isnan(fd.fd_data['l4']['std'][0]))
+        fd.reset_from_dictionary(fd_data, notation='scanlan')
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'store')
+            fd.save(path)
+            fd_loaded = FlutterDerivatives.load(path)
+        for deriv in self.derivs_out:
+            np.testing.assert_allclose(fd_loaded.fd_data[deriv]['std'], fd.fd_data[deriv]['std'])
+
+
+class TestDerivativeTable(unittest.TestCase):
+
+    def test_growth_and_views(self):
+
+        table = DerivativeTable(capacity=2)
+        for run in range(5):
+            table.append(run, 2.0*run, 1.0, 0.1, {'l3': run, 'l4': -run})
+        table.append([5, 6], [10.0, 12.0], 1.0, 0.1, {'m5': [1.0, 2.0]})
+
+        self.assertEqual(len(table), 7)
+        self.assertGreaterEqual(table.capacity, 7)
+
+        # Complete columns are views of the table
+        runs = table.column('run')
+        np.testing.assert_array_equal(runs, np.arange(7))
+        self.assertTrue(np.shares_memory(runs, table.columns['run']))
+        self.assertFalse(runs.flags.writeable)
+
+        # Missing values are not returned
+        l3 = table.derivative('l3')
+        np.testing.assert_array_equal(l3['values'], np.arange(5))
+        np.testing.assert_array_equal(l3['Ured'], 2.0*np.arange(5))
+        np.testing.assert_array_equal(table.derivative('m5')['Ured'], [10.0, 12.0])
+        self.assertEqual(len(table.derivative('d1')['values']), 0)
+
+        table.clear_derivative('l3')
+        self.assertEqual(len(table.derivative('l3')['values']), 0)
+
+
+class TestStore(unittest.TestCase):
+
+    def setUp(self):
+        TestForcedMotion.setUp(self)
+        self.fd = FlutterDerivatives('classic')
+        self.fd.set_default_parameters(**self.sim_params)
+        for m_name, omega in [('heave', self.omega), ('pitch', 1.5*self.omega)]:
+            data = synthetic_forced_motion(m_name, self.derivs, omega=omega, n_samples=1000, **self.sim_params)
+            self.fd.calculate_derivatives_from_forced_motion(omega=omega, **data)
+
+    def test_save_and_load(self):
+
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'store')
+            self.fd.save(path)
+            fd = FlutterDerivatives.load(path)
+
+            self.assertEqual(fd.default_notation, 'classic')
+            self.assertEqual(fd.default_sim_params, self.sim_params)
+            self.assertIsInstance(fd.table.columns['l4'], np.memmap)
+            for deriv, deriv_data in self.fd.fd_data.items():
+                np.testing.assert_array_equal(fd.fd_data[deriv]['values'], deriv_data['values'])
+                np.testing.assert_array_equal(fd.fd_data[deriv]['Ured'], deriv_data['Ured'])
+            self.assertEqual(fd.run_diagnostics[1]['motion'], 'pitch')
+            self.assertAlmostEqual(fd.run_diagnostics[1]['omega'], 1.5*self.omega)
+
+            # Changes in the loaded object are not written to the store
+            fd.reset_derivative('l4')
+            data = synthetic_forced_motion('heave', self.derivs, omega=2*self.omega, n_samples=1000, **self.sim_params)
+            fd.calculate_derivatives_from_forced_motion(omega=2*self.omega, **data)
+            self.assertEqual(len(fd.table), 3)
+            self.assertEqual(len(FlutterDerivatives.load(path, mmap=False).fd_data['l4']['values']), 1)
+
+            # Incremental append of the new run
+            fd.save(path, append=True)
+            fd_all = FlutterDerivatives.load(path, diagnostics=False)
+            np.testing.assert_array_equal(fd_all.table.column('run'), [0, 1, 2])
+            self.assertEqual(len(fd_all.run_diagnostics), 3)
+            np.testing.assert_allclose(fd_all.fd_data['m4']['values'], [self.derivs['m4']]*2)
+
+            # Nothing new to append
+            fd.save(path, append=True)
+            self.assertEqual(len(FlutterDerivatives.load(path).table), 3)
+
+            # Data left by an interrupted append is discarded, and the runs of
+            # other derivatives are numbered after the ones in the store
+            with open(os.path.join(path, 'run.bin'), 'ab') as file:
+                file.write(b'\x00'*5)
+            with open(os.path.join(path, 'diagnostics.jsonl'), 'a') as file:
+                file.write('{"motion": "hea')
+            fd_new = FlutterDerivatives()
+            fd_new.calculate_derivatives_from_forced_motion(omega=2*self.omega, **self.sim_params, **data)
+            fd_new.save(path, append=True)
+            fd_all = FlutterDerivatives.load(path)
+            np.testing.assert_array_equal(fd_all.table.column('run'), [0, 1, 2, 3])
+            self.assertEqual([d['motion'] for d in fd_all.run_diagnostics], ['heave', 'pitch', 'heave', 'heave'])
+
+            # The store changed after the derivatives were loaded or saved
+            for fd_old in [self.fd, fd]:
+                with self.assertRaises(Exception):
+                    fd_old.save(path, append=True)
+
+            with self.assertRaises(Exception):
+                FlutterDerivatives.load(folder)
+
+    def test_save_to_loaded_store(self):
+
+        # The loaded columns are memory maps of the files being replaced
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'store')
+            self.fd.save(path)
+            fd = FlutterDerivatives.load(path)
+            fd.reset_derivative('m4')
+            fd.save(path)
+            fd = FlutterDerivatives.load(path)
+            self.assertEqual(len(fd.table), 2)
+            self.assertEqual(len(fd.fd_data['m4']['values']), 0)
+            np.testing.assert_array_equal(fd.fd_data['l6']['values'], self.fd.fd_data['l6']['values'])
+
+            data = synthetic_forced_motion('heave', self.derivs, omega=2*self.omega, n_samples=1000, **self.sim_params)
+            fd.calculate_derivatives_from_forced_motion(omega=2*self.omega, **data)
+            fd.save(path, append=True)
+            fd = FlutterDerivatives.load(path)
+            fd.save(path)
+            fd = FlutterDerivatives.load(path)
+            np.testing.assert_array_equal(fd.table.column('run'), [0, 1, 2])
+            np.testing.assert_allclose(fd.fd_data['m4']['values'], [self.derivs['m4']])
+            self.assertFalse(any(file_name.endswith('.tmp') for file_name in os.listdir(path)))
+
+    def test_reset_from_dictionary(self):
+
+        fd = FlutterDerivatives()
+        fd.reset_from_dictionary(self.fd.fd_data)
+        self.assertEqual(len(fd.table), 2)
+        np.testing.assert_array_equal(fd.table.column('run'), [-1, -1])
+        for deriv, deriv_data in self.fd.fd_data.items():
+            np.testing.assert_allclose(fd.fd_data[deriv]['values'], deriv_data['values'])
+
+        # From another notation, with the rows grouped by their Ured values
+        fd.reset_from_dictionary(self.fd.get_all_derivatives('starossek'), notation='starossek')
+        self.assertEqual(len(fd.table), 2)
+        np.testing.assert_allclose(fd.fd_data['m6']['values'], self.fd.fd_data['m6']['values'])
+
+        # Wrong formats do not modify the data
+        with self.assertRaises(Exception):
+            fd.reset_from_dictionary({'x1': {'values': [1.0], 'Ured': [2.0]}})
+        with self.assertRaises(Exception):
+            fd.reset_from_dictionary({'l3': {'values': [1.0, 2.0], 'Ured': [2.0]}})
+        with self.assertRaises(Exception):
+            fd.reset_from_dictionary({'l3': [1.0, 2.0]})
+        self.assertEqual(len(fd.table), 2)
+
+
+class TestRunCache(unittest.TestCase):
+
+    def setUp(self):
+        TestForcedMotion.setUp(self)
+        self.folder = tempfile.TemporaryDirectory()
+        self.runs = [synthetic_forced_motion('heave', self.derivs, omega=omega, n_samples=1000,
+            **self.sim_params) for omega in [self.omega, 1.5*self.omega, 2*self.omega]]
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def process(self, fd, runs, **kwargs):
+        fd.enable_profiling()
+        for run in runs:
+            fd.calculate_derivatives_from_forced_motion(omega=self.omega, **dict(self.sim_params, **kwargs), **run)
+        return fd.get_profiling_report()['stage'].count('fit')
+
+    def test_unchanged_runs_are_not_processed(self):
+
+        fd = FlutterDerivatives()
+        fd.enable_run_cache(self.folder.name)
+        self.assertEqual(self.process(fd, self.runs), 3)
+
+        # Same results from the cache, without fitting again
+        fd_cached = FlutterDerivatives()
+        fd_cached.enable_run_cache(self.folder.name)
+        self.assertEqual(self.process(fd_cached, self.runs), 0)
+        for name in fd.table.columns:
+            np.testing.assert_array_equal(fd_cached.table.column(name), fd.table.column(name))
+        self.assertEqual(fd_cached.run_diagnostics[2]['motion'], 'heave')
+
+        # Changes in the data or the parameters are processed again
+        self.runs[1]['lift'] = self.runs[1]['lift'] + 1e-6
+        fd_changed = FlutterDerivatives()
+        fd_changed.enable_run_cache(self.folder.name)
+        self.assertEqual(self.process(fd_changed, self.runs), 1)
+        self.assertEqual(self.process(fd_changed, self.runs[:1], fluid_dens=1.25), 1)
+
+    def test_corrupt_entries(self):
+
+        fd = FlutterDerivatives()
+        fd.enable_run_cache(self.folder.name)
+        self.process(fd, self.runs[:2])
+        entries = sorted(os.listdir(self.folder.name))
+
+        # Truncated and overwritten entries are processed again and replaced
+        for file_name, size in zip(entries, [100, 0]):
+            with open(os.path.join(self.folder.name, file_name), 'r+b') as file:
+                file.truncate(size)
+        with open(os.path.join(self.folder.name, entries[1]), 'wb') as file:
+            file.write(b'not a zip file')
+        fd_cached = FlutterDerivatives()
+        fd_cached.enable_run_cache(self.folder.name)
+        self.assertEqual(self.process(fd_cached, self.runs[:2]), 2)
+        for name in fd.table.columns:
+            np.testing.assert_array_equal(fd_cached.table.column(name), fd.table.column(name))
+        fd_cached = FlutterDerivatives()
+        fd_cached.enable_run_cache(self.folder.name)
+        self.assertEqual(self.process(fd_cached, self.runs[:2]), 0)
+
+    def test_eviction(self):
+
+        fd = FlutterDerivatives()
+        fd.enable_run_cache(self.folder.name)
+        self.process(fd, self.runs[:1])
+        entry_size = fd.run_cache.size()
+
+        # Room for two entries: the least recently used one is removed
+        fd.enable_run_cache(self.folder.name, max_size=2.5*entry_size)
+        self.process(fd, self.runs[1:2])
+        os.utime(os.path.join(self.folder.name, os.listdir(self.folder.name)[0]), (0, 0))
+        self.process(fd, self.runs[2:])
+        self.assertEqual(len(os.listdir(self.folder.name)), 2)
+        self.assertLessEqual(fd.run_cache.size(), 2.5*entry_size)
+
+
+class TestFittedFunctions(unittest.TestCase):
+
+    def setUp(self):
+
+        # Derivatives given by known functions of Ured
+        self.Ured = np.linspace(1, 20, 30)
+        self.fd = FlutterDerivatives()
+        self.fd.table.append(np.arange(30), self.Ured, 1.0, 0.1,
+            {'l3': -0.5*self.Ured + 0.01*self.Ured**3, 'l4': 0.2 + 0.1*self.Ured,
+             'm5': np.sqrt(self.Ured), 'm6': 0.3*self.Ured})
+
+    def test_polynomial(self):
+
+        Ured = np.linspace(0, 25, 7)
+        l3 = self.fd.get_fitted_function('l3')
+        np.testing.assert_allclose(l3(Ured), -0.5*Ured + 0.01*Ured**3, atol=1e-10)
+        self.assertEqual(l3.coefficients[-1], 0)
+
+        # The constant term is only fitted without fixed start
+        l4 = self.fd.get_fitted_function('l4', degree=1, fixed_start=False)
+        np.testing.assert_allclose(l4(Ured), 0.2 + 0.1*Ured, atol=1e-10)
+        self.assertNotAlmostEqual(self.fd.get_fitted_function('l4', degree=1)(0.0), 0.2)
+
+    def test_pchip(self):
+
+        m5 = self.fd.get_fitted_function('m5', method='pchip')
+        Ured = np.linspace(1, 20, 200)
+        values = m5(Ured)
+        np.testing.assert_allclose(values, np.sqrt(Ured), atol=1e-2)
+        self.assertTrue(np.all(np.diff(values) > 0))
+        self.assertEqual(m5(0.0), 0.0)
+
+        with self.assertRaises(Exception):
+            self.fd.get_fitted_function('m5', method='spline')
+
+    def test_notations_and_cache(self):
+
+        functions = self.fd.get_all_fitted_functions(notation='scanlan')
+        self.assertIn('H1', functions)
+        self.assertNotIn('P1', functions)
+        self.assertIs(self.fd.get_fitted_function('H1', notation='scanlan'), functions['H1'])
+
+        # Complex notations are fitted in the real and imaginary parts
+        c_hh = self.fd.get_fitted_function('c_hh', notation='starossek', method='pchip')
+        data = self.fd.get_all_derivatives('starossek')['c_hh']
+        np.testing.assert_allclose(c_hh(data['Ured']), data['values'], atol=1e-12)
+
+        # Missing data and changes in the data
+        with self.assertRaises(Exception):
+            self.fd.get_fitted_function('d1')
+        self.fd.reset_derivative('l3')
+        self.assertNotIn('H1', self.fd.get_all_fitted_functions(notation='scanlan'))
+
+
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        TestForcedMotion.setUp(self)
+        self.data = synthetic_forced_motion('heave', self.derivs, omega=self.omega,
+            n_samples=6000, noise=0.05, **self.sim_params)
+
+    def feed(self, estimator, block_size=500):
+        for first in range(0, 6000, block_size):
+            estimator.update(**{name: series[first:first+block_size] for name, series in self.data.items()})
+
+    def test_matches_full_record(self):
+
+        fd = FlutterDerivatives()
+        fd.calculate_derivatives_from_forced_motion(omega=self.omega, **self.sim_params, **self.data)
+
+        estimator = StreamingFlutterDerivatives('heave', ['lift', 'moment', 'drag'], self.omega, **self.sim_params)
+        self.feed(estimator)
+        values, Ured = estimator.get_derivatives()
+
+        for deriv, value in values.items():
+            np.testing.assert_allclose(value, fd.fd_data[deriv]['values'][0], rtol=1e-9)
+        np.testing.assert_allclose(Ured, fd.fd_data['l3']['Ured'][0])
+        self.assertEqual(estimator.get_convergence()['n_samples'], 6000)
+        self.assertTrue(estimator.has_converged(tolerance=0.05))
+
+        fd_streaming = FlutterDerivatives()
+        estimator.store(fd_streaming)
+        np.testing.assert_allclose(fd_streaming.fd_data['m4']['values'], fd.fd_data['m4']['values'], rtol=1e-9)
+
+    def test_window_and_forgetting(self):
+
+        window = StreamingFlutterDerivatives('heave', ['lift'], self.omega, window=2000, **self.sim_params)
+        self.feed(window)
+        self.assertEqual(window.statistics.n_samples, 2000)
+
+        # Same result as the last 2000 samples only
+        fd = FlutterDerivatives()
+        last = {name: series[-2000:] for name, series in self.data.items()}
+        fd.calculate_derivatives_from_forced_motion(omega=self.omega, **self.sim_params, **last)
+        values, _ = window.get_derivatives()
+        np.testing.assert_allclose(values['l4'], fd.fd_data['l4']['values'][0], rtol=1e-3)
+
+        forgetting = StreamingFlutterDerivatives('heave', ['lift'], self.omega, forgetting_factor=0.999, **self.sim_params)
+        self.feed(forgetting)
+        values, _ = forgetting.get_derivatives()
+        np.testing.assert_allclose(values['l4'], self.derivs['l4'], rtol=1e-2)
+
+        with self.assertRaises(Exception):
+            StreamingFlutterDerivatives('heave', ['lift'], self.omega, forgetting_factor=0.9, window=10, **self.sim_params)
+
+
+class TestBroadband(unittest.TestCase):
+
+    def setUp(self):
+        self.sim_params = {'U': 12.0, 'B': 0.5, 'fluid_dens': 1.2, 'delta_t': 0.002}
+        self.nperseg = 2**12
+        self.time = np.arange(2**16)*self.sim_params['delta_t']
+
+    def lift(self, motion, motion_dot, l3, l4):
+        U, B, fluid_dens = self.sim_params['U'], self.sim_params['B'], self.sim_params['fluid_dens']
+        return 0.5*fluid_dens*U**2*B*(l3*motion_dot/U + l4*motion/B)
+
+    def test_multisine(self):
+
+        # Frequencies at bins of the spectrum, derivatives depending on Ured
+        U, B = self.sim_params['U'], self.sim_params['B']
+        frequencies = np.array([8, 12, 16, 20, 28, 36])/(self.nperseg*self.sim_params['delta_t'])
+        phases = np.random.default_rng(0).uniform(0, 2*np.pi, len(frequencies))
+        heave = np.zeros(len(self.time))
+        lift = np.zeros(len(self.time))
+        for frequency, phase in zip(frequencies, phases):
+            omega = 2*np.pi*frequency
+            Ured = U/frequency/B
+            motion = 0.05*np.sin(omega*self.time + phase)
+            motion_dot = 0.05*omega*np.cos(omega*self.time + phase)
+            heave += motion
+            lift += self.lift(motion, motion_dot, -0.3*Ured, 0.1*Ured**1.5)
+
+        fd = FlutterDerivatives()
+        fd.calculate_derivatives_from_broadband_motion(excitation='multisine', nperseg=self.nperseg,
+            heave=heave, lift=lift, **self.sim_params)
+
+        Ured = fd.fd_data['l3']['Ured']
+        np.testing.assert_allclose(np.sort(Ured), np.sort(U/frequencies/B))
+        np.testing.assert_allclose(fd.fd_data['l3']['values'], -0.3*Ured, rtol=1e-9)
+        np.testing.assert_allclose(fd.fd_data['l4']['values'], 0.1*Ured**1.5, rtol=1e-9)
+
+        # A single run with all the frequencies
+        self.assertEqual(len(fd.run_diagnostics), 1)
+        self.assertEqual(fd.run_diagnostics[0]['method'], 'broadband')
+        self.assertNotIn('forces', fd.run_diagnostics[0])
+        self.assertEqual(len(fd.run_diagnostics[0]['coherence']['lift']), len(Ured))
+        np.testing.assert_array_equal(fd.table.column('run'), 0)
+
+    def test_chirp(self):
+
+        start, end = 0.5, 8.0
+        duration = self.time[-1]
+        phase = 2*np.pi*(start*self.time + (end - start)/(2*duration)*self.time**2)
+        heave = 0.05*np.sin(phase)
+        heave_dot = 0.05*2*np.pi*(start + (end - start)*self.time/duration)*np.cos(phase)
+        lift = self.lift(heave, heave_dot, -1.0, 0.5)
+
+        fd = FlutterDerivatives()
+        fd.calculate_derivatives_from_broadband_motion(nperseg=self.nperseg, band=(1, 7),
+            heave=heave, lift=lift, **self.sim_params)
+        self.assertGreater(len(fd.fd_data['l3']['values']), 20)
+        np.testing.assert_allclose(fd.fd_data['l3']['values'], -1.0, atol=0.02)
+        np.testing.assert_allclose(fd.fd_data['l4']['values'], 0.5, atol=0.02)
+
+        # Requested frequencies and unknown excitation
+        fd = FlutterDerivatives()
+        fd.calculate_derivatives_from_broadband_motion(frequencies=[2.0, 4.0], nperseg=self.nperseg,
+            heave=heave, lift=lift, **self.sim_params)
+        self.assertEqual(len(fd.fd_data['l3']['values']), 2)
+        with self.assertRaises(Exception):
+            fd.calculate_derivatives_from_broadband_motion(excitation='step', heave=heave, lift=lift, **self.sim_params)
+
+        # Band without frequencies, and conditions that no frequency fulfils
+        with self.assertRaisesRegex(Exception, 'band'):
+            fd.calculate_derivatives_from_broadband_motion(band=(300, 400), nperseg=self.nperseg,
+                heave=heave, lift=lift, **self.sim_params)
+        with self.assertRaisesRegex(Exception, 'min_coherence'):
+            fd.calculate_derivatives_from_broadband_motion(band=(1, 7), min_coherence=1.1, nperseg=self.nperseg,
+                heave=heave, lift=lift, **self.sim_params)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,7 @@
 
 import unittest
 import numpy as np
-from flutter_utilities import *
+from flutterpy.derivatives import complex2real_notation, base2notation
 
 class TestComplex2RealNotation(unittest.TestCase):
 
@@ -35,4 +35,27 @@ class TestComplex2RealNotation(unittest.TestCase):
             "A3":{"values":[2.4*np.pi/8, 2.8],"U_red":[np.pi/0.5, 10]},
             "A4":{"values":[0.0071*np.pi/4, 0.19],"U_red":[np.pi/0.5, 10]}}
 
-        self.assertDictEqual(fd_real, complex2real_notation(fd_complex))
\ No newline at end of file
+        fd_out = complex2real_notation(fd_complex)
+        self.assertEqual(set(fd_out), set(fd_real))
+        for deriv in fd_real:
+            np.testing.assert_allclose(fd_out[deriv]['values'], fd_real[deriv]['values'], rtol=1e-12)
+            np.testing.assert_allclose(fd_out[deriv]['U_red'], fd_real[deriv]['U_red'], rtol=1e-12)
+
+    def test_all_coefficients(self):
+
+        # Same result as the conversion from the starossek to the scanlan notation
+        Ureds = np.linspace(1, 20, 1000)
+        rng = np.random.default_rng(0)
+        fd_base = {letter+str(number): {'values': rng.standard_normal(len(Ureds)), 'Ured': Ureds}
+            for letter in 'dlm' for number in range(1,7)}
+        fd_starossek = base2notation(fd_base, 'starossek')
+        fd_scanlan = base2notation(fd_base, 'scanlan')
+
+        fd_complex = {coefficient: {'values': data['values'], 'k': np.pi/data['Ured']}
+            for coefficient, data in fd_starossek.items()}
+        fd_out = complex2real_notation(fd_complex)
+
+        self.assertEqual(set(fd_out), set(fd_scanlan))
+        for deriv, data in fd_scanlan.items():
+            np.testing.assert_allclose(fd_out[deriv]['values'], data['values'], rtol=1e-10)
+            np.testing.assert_allclose(fd_out[deriv]['U_red'], Ureds, rtol=1e-12)
\ No newline at end of file
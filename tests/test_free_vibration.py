@@ -0,0 +1,80 @@
+import unittest
+import numpy as np
+from flutterpy.derivatives import FlutterDerivatives, identify_modal_parameters
+from flutterpy.derivatives.aerodynamic_matrices import derivative_matrices
+from flutterpy.structure import StructuralModel
+
+
+class TestFreeVibration(unittest.TestCase):
+
+    def setUp(self):
+        self.sim_params = {'U': 10.0, 'B': 0.3, 'fluid_dens': 1.2, 'delta_t': 0.005}
+        self.section = StructuralModel.section(5.0, 0.05, [1.5, 2.2], [0.005, 0.01])
+        self.derivs = {'l3': -1.0, 'l4': 0.3, 'l5': -0.5, 'l6': -2.0, 'm3': 0.2, 'm4': 0.05, 'm5': -0.4, 'm6': -0.6}
+
+        # State matrix of the section in wind, with constant derivatives
+        U, B = self.sim_params['U'], self.sim_params['B']
+        dynamic_pressure = 0.5*self.sim_params['fluid_dens']*U**2
+        velocity, displacement = derivative_matrices({deriv: np.array(value) for deriv, value in self.derivs.items()}, B)
+        mass, damping, stiffness = self.section.get_matrices()
+        aero_damping = dynamic_pressure*velocity[:2,:2]*B/U
+        aero_stiffness = dynamic_pressure*displacement[:2,:2]
+        self.state_matrix = np.block([[np.zeros((2,2)), np.eye(2)],
+            [-np.linalg.solve(mass, stiffness - aero_stiffness), -np.linalg.solve(mass, damping - aero_damping)]])
+
+    def free_decay(self, n_samples, initial_state):
+        eigenvalues, eigenvectors = np.linalg.eig(self.state_matrix)
+        coefficients = np.linalg.solve(eigenvectors, initial_state)
+        time = np.arange(n_samples)*self.sim_params['delta_t']
+        return np.real((eigenvectors[:2] * coefficients) @ np.exp(np.outer(eigenvalues, time))).T
+
+    def test_modal_parameters(self):
+
+        eigenvalues = np.linalg.eigvals(self.state_matrix)
+        eigenvalues = np.sort_complex(eigenvalues[eigenvalues.imag > 0])
+        records = self.free_decay(4000, [0.02, 0.03, 0, 0])
+
+        for svd in ('full', 'truncated'):
+            identified = identify_modal_parameters(records, self.sim_params['delta_t'], svd=svd)
+            np.testing.assert_allclose(np.sort_complex(identified['eigenvalues']), eigenvalues, rtol=1e-6)
+
+        # Covariance-driven SSI of a single degree of freedom random response
+        rng = np.random.default_rng(0)
+        omega, damping_ratio, delta_t = 2*np.pi*1.5, 0.02, self.sim_params['delta_t']
+        poles = np.exp((-damping_ratio + 1j*np.sqrt(1 - damping_ratio**2))*omega*delta_t)
+        response = np.zeros(200000)
+        excitation = rng.standard_normal(200000)
+        for sample in range(2, 200000):
+            response[sample] = 2*poles.real*response[sample-1] - abs(poles)**2*response[sample-2] + excitation[sample]
+        identified = identify_modal_parameters(response, delta_t, method='ssi')
+        self.assertAlmostEqual(identified['frequencies'][0], 1.5, delta=0.01)
+        self.assertAlmostEqual(identified['damping_ratios'][0], damping_ratio, delta=0.003)
+
+        with self.assertRaises(Exception):
+            identify_modal_parameters(records, self.sim_params['delta_t'], method='pem')
+
+    def test_derivatives(self):
+
+        records = self.free_decay(4000, [0.02, 0.03, 0, 0])
+        fd = FlutterDerivatives()
+        fd.calculate_derivatives_from_free_vibration(self.section, heave=records[:,0], pitch=records[:,1],
+            **self.sim_params)
+
+        for deriv, value in self.derivs.items():
+            np.testing.assert_allclose(fd.fd_data[deriv]['values'], value, rtol=5e-3, atol=1e-4)
+
+        # Heave derivatives at the heave mode and pitch derivatives at the
+        # pitch mode, all in one run
+        frequencies = np.sort(np.abs(np.linalg.eigvals(self.state_matrix)))[::2]/(2*np.pi)
+        Ured = self.sim_params['U']/(frequencies*self.sim_params['B'])
+        np.testing.assert_allclose(fd.fd_data['l3']['Ured'], Ured[0], rtol=1e-6)
+        np.testing.assert_allclose(fd.fd_data['m6']['Ured'], Ured[1], rtol=1e-6)
+        self.assertEqual(len(fd.run_diagnostics), 1)
+        self.assertEqual(fd.run_diagnostics[0]['method'], 'era')
+
+        with self.assertRaises(Exception):
+            fd.calculate_derivatives_from_free_vibration(self.section, heave=records[:,0], **self.sim_params)
+
+
+if __name__ == '__main__':
+    unittest.main()
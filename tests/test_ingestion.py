@@ -0,0 +1,173 @@
+
+import os
+import json
+import tempfile
+import threading
+import unittest
+import numpy as np
+from flutterpy.derivatives import FlutterDerivatives, Campaign, read_table, prefetch
+from test_flutter_derivatives import synthetic_forced_motion
+
+
+class TestReadTable(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.time = np.arange(50)*0.01
+        self.values = np.sin(self.time)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.folder.name, name)
+        with open(path, 'w') as file:
+            file.write(text)
+        return path
+
+    def test_openfoam(self):
+
+        # Current format, with the column names in the header
+        lines = ['# Force', '# CofR : (0 0 0)', '# Time total_x total_y total_z']
+        lines += ['%.3f %.12e %.12e 0' % (t, 2*v, v) for t, v in zip(self.time, self.values)]
+        path = self.write('forces.dat', '\n'.join(lines) + '\n')
+        data = read_table(path, {'time': 'Time', 'lift': 'total_y', 'drag': ('total_x', -0.5)}, format='openfoam')
+        np.testing.assert_allclose(data['time'], self.time)
+        np.testing.assert_allclose(data['lift'], self.values, rtol=1e-11)
+        np.testing.assert_allclose(data['drag'], -self.values, rtol=1e-11)
+
+        # Format guessed from the extension or from the header
+        data = read_table(path, {'lift': 'total_y'})
+        np.testing.assert_allclose(data['lift'], self.values, rtol=1e-11)
+        path = self.write('forces.txt', '\n'.join(lines) + '\n')
+        data = read_table(path, {'lift': 'total_y'})
+        np.testing.assert_allclose(data['lift'], self.values, rtol=1e-11)
+        with self.assertRaisesRegex(Exception, 'openfoam'):
+            read_table(path, {'lift': 'total_y'}, format='whitespace')
+
+        # Older format, with vectors in parentheses (columns by index)
+        lines = ['# Time forces(pressure viscous porous) moment(pressure viscous porous)']
+        lines += ['%.3f\t((0 %.12e 0) (0 1 0) (0 0 0))\t((0 0 %.12e) (0 0 0) (0 0 0))' % (t, v, 3*v)
+            for t, v in zip(self.time, self.values)]
+        path = self.write('forces_old.dat', '\n'.join(lines))
+        data = read_table(path, {'lift': 2, 'moment': 12}, format='openfoam', block_size=100)
+        np.testing.assert_allclose(data['lift'], self.values, rtol=1e-11)
+        np.testing.assert_allclose(data['moment'], 3*self.values, rtol=1e-11)
+
+    def test_csv_and_whitespace(self):
+
+        lines = ['time,heave'] + ['%.3f,%.12e' % (t, v) for t, v in zip(self.time, self.values)]
+        path = self.write('motion.csv', '\n'.join(lines) + '\n')
+        data = read_table(path, {'heave': 'heave'}, block_size=64)
+        np.testing.assert_allclose(data['heave'], self.values, rtol=1e-11)
+
+        # Without names, by index (and comments in the middle)
+        lines = ['%.3f  %.12e' % (t, v) for t, v in zip(self.time, self.values)]
+        path = self.write('daq.txt', '\n'.join(lines[:20] + ['# restart'] + lines[20:]) + '\n')
+        data = read_table(path, {'pitch': 1})
+        np.testing.assert_allclose(data['pitch'], self.values, rtol=1e-11)
+
+        with self.assertRaises(Exception):
+            read_table(path, {'pitch': 'alpha'})
+        with self.assertRaises(Exception):
+            read_table(path, {'pitch': 1}, format='xlsx')
+
+    def test_prefetch(self):
+
+        # Items produced in a background thread, in order
+        threads = []
+        def produce():
+            for item in range(5):
+                threads.append(threading.current_thread())
+                yield item
+        self.assertEqual(list(prefetch(produce(), n_prefetch=2)), list(range(5)))
+        self.assertTrue(all(thread is not threading.current_thread() for thread in threads))
+
+        def fail():
+            yield 1
+            raise ValueError('read error')
+        with self.assertRaises(ValueError):
+            list(prefetch(fail()))
+
+
+class TestCampaign(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.derivs = {letter+str(number): (number - 3.5)*(1 + 'dlm'.index(letter))
+            for letter in 'dlm' for number in range(1,7)}
+        self.sim_params = {'B': 0.5, 'delta_t': 0.002, 'fluid_dens': 1.2}
+        self.omega = 2*np.pi*2.5
+
+        # One folder per wind speed, with the forces, the motion and the parameters
+        for U in [4.0, 8.0, 12.0]:
+            run_path = os.path.join(self.folder.name, 'U%02d' % U, 'case')
+            os.makedirs(run_path)
+            data = synthetic_forced_motion('pitch', self.derivs, U=U, omega=self.omega, n_samples=2000,
+                **self.sim_params)
+            time = np.arange(2000)*self.sim_params['delta_t']
+            np.savetxt(os.path.join(run_path, 'forces.dat'), np.column_stack([time, data['lift'], data['moment']]),
+                header='Time total_y total_mz', fmt='%.12e')
+            np.savetxt(os.path.join(run_path, 'motion.csv'), data['pitch'], header='alpha', comments='',
+                fmt='%.12e')
+            with open(os.path.join(run_path, 'parameters.json'), 'w') as file:
+                json.dump({'U': U}, file)
+
+        self.files = {'forces.dat': {'time': 'Time', 'lift': 'total_y', 'moment': 'total_mz'},
+            'motion.csv': {'pitch': 'alpha'}}
+        self.parameters = {'B': 0.5, 'fluid_dens': 1.2, 'omega': self.omega}
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_load_runs(self):
+
+        campaign = Campaign(self.folder.name, self.files, parameters=self.parameters)
+        self.assertEqual(len(campaign), 3)
+        self.assertEqual(os.path.relpath(campaign.run_paths[0], self.folder.name), os.path.join('U04', 'case'))
+
+        run = campaign.load_run(campaign.run_paths[1])
+        self.assertEqual(run['U'], 8.0)
+        self.assertAlmostEqual(run['delta_t'], 0.002)
+        self.assertNotIn('time', run)
+        self.assertEqual(len(run['moment']), 2000)
+
+        # The time column overrides a different time step in the parameters
+        campaign = Campaign(self.folder.name, self.files, parameters=dict(self.parameters, delta_t=0.001))
+        with self.assertWarns(UserWarning):
+            run = campaign.load_run(campaign.run_paths[1])
+        self.assertAlmostEqual(run['delta_t'], 0.002)
+
+        # Without parameter files
+        campaign = Campaign(self.folder.name, self.files, parameters=self.parameters, parameter_file=None)
+        self.assertNotIn('U', campaign.load_run(campaign.run_paths[1]))
+
+        with self.assertRaises(Exception):
+            Campaign(self.folder.name, {'missing.dat': {'lift': 1}})
+
+    def test_serial_and_parallel(self):
+
+        campaign = Campaign(self.folder.name, self.files, parameters=self.parameters,
+            formats={'forces.dat': 'openfoam'})
+        fd = FlutterDerivatives()
+        fd.calculate_derivatives_from_campaign(campaign)
+        np.testing.assert_allclose(fd.fd_data['m5']['values'], [self.derivs['m5']]*3, rtol=1e-8)
+        np.testing.assert_allclose(fd.fd_data['m5']['Ured'], np.array([4.0, 8.0, 12.0])/2.5/0.5)
+
+        fd_parallel = FlutterDerivatives()
+        fd_parallel.enable_profiling()
+        fd_parallel.calculate_derivatives_from_campaign(campaign, parallel=True, max_workers=2)
+        np.testing.assert_array_equal(fd_parallel.fd_data['l6']['values'], fd.fd_data['l6']['values'])
+        self.assertEqual(fd_parallel.get_profiling_report()['stage'].count('read'), 3)
+
+        # Parameters from a function which cannot be pickled
+        campaign = Campaign(self.folder.name, self.files, parameter_file=None,
+            parameters=lambda run_path: dict(self.parameters, U=float(os.path.basename(os.path.dirname(run_path))[1:])))
+        fd_parallel = FlutterDerivatives()
+        fd_parallel.calculate_derivatives_from_campaign(campaign, parallel=True, max_workers=2)
+        np.testing.assert_array_equal(fd_parallel.fd_data['l6']['values'], fd.fd_data['l6']['values'])
+        np.testing.assert_array_equal(fd_parallel.fd_data['l6']['Ured'], fd.fd_data['l6']['Ured'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+
+import subprocess
+import sys
+import unittest
+import numpy as np
+import flutterpy.derivatives.notations.notation as ntt
+
+
+def build_base_set(Ureds):
+
+    # Base derivatives with arbitrary (but different) values
+    fd_base = {}
+    for index, letter in enumerate('dlm'):
+        for number in range(1,7):
+            fd_base[letter+str(number)] = {
+                'values': list(np.linspace(-1, 1, len(Ureds)) + 0.1*number + index),
+                'Ured': list(Ureds)}
+
+    return fd_base
+
+
+class TestBase2Notation(unittest.TestCase):
+
+    def setUp(self):
+        self.Ureds = np.linspace(1, 20, 50)
+        self.fd_base = build_base_set(self.Ureds)
+
+    def test_scanlan_values(self):
+
+        fd_scanlan = ntt.base2notation(self.fd_base, 'scanlan')
+
+        expected = self.Ureds/2/np.pi*np.array(self.fd_base['l3']['values'])
+        np.testing.assert_allclose(fd_scanlan['H1']['values'], expected)
+
+        expected = (self.Ureds/2/np.pi)**2*np.array(self.fd_base['m2']['values'])
+        np.testing.assert_allclose(fd_scanlan['A6']['values'], expected)
+
+        np.testing.assert_array_equal(fd_scanlan['H1']['Ured'], self.Ureds)
+        self.assertEqual(fd_scanlan['H1']['values'].dtype, np.float64)
+
+    def test_starossek_values(self):
+
+        fd_starossek = ntt.base2notation(self.fd_base, 'starossek')
+
+        l3 = np.array(self.fd_base['l3']['values'])
+        l4 = np.array(self.fd_base['l4']['values'])
+        expected = self.Ureds/np.pi**2 * ((self.Ureds/2/np.pi)*l4 + 1j*l3)
+        np.testing.assert_allclose(fd_starossek['c_hh']['values'], expected)
+        self.assertEqual(fd_starossek['c_hh']['values'].dtype, np.complex128)
+
+    def test_different_Ured_raises(self):
+
+        self.fd_base['l4']['Ured'] = list(self.Ureds + 1)
+        with self.assertRaises(Exception):
+            ntt.base2notation(self.fd_base, 'starossek')
+
+    def test_empty_set(self):
+
+        fd_starossek = ntt.base2notation(build_base_set([]), 'starossek')
+        self.assertEqual(len(fd_starossek['c_aa']['values']), 0)
+
+
+class TestNotation2Base(unittest.TestCase):
+
+    def setUp(self):
+        self.Ureds = np.linspace(1, 20, 50)
+        self.fd_base = build_base_set(self.Ureds)
+
+    def test_round_trip(self):
+
+        for name in ntt.available_notations:
+            fd_base = ntt.notation2base(ntt.base2notation(self.fd_base, name), name)
+            for deriv, deriv_data in self.fd_base.items():
+                np.testing.assert_allclose(fd_base[deriv]['values'], deriv_data['values'], rtol=1e-12)
+                np.testing.assert_array_equal(fd_base[deriv]['Ured'], self.Ureds)
+
+    def test_notation2notation(self):
+
+        fd_scanlan = ntt.base2notation(self.fd_base, 'scanlan')
+        expected = ntt.base2notation(self.fd_base, 'starossek')
+
+        fd_starossek = ntt.notation2notation(fd_scanlan, 'scanlan', 'starossek')
+        for deriv in expected:
+            np.testing.assert_allclose(fd_starossek[deriv]['values'], expected[deriv]['values'], rtol=1e-12)
+
+        # Without the drag derivatives, through the base derivatives
+        for deriv in ['P'+str(number) for number in range(1,7)]:
+            fd_scanlan[deriv] = {'values': [], 'Ured': []}
+        fd_starossek = ntt.notation2notation(fd_scanlan, 'scanlan', 'starossek')
+        np.testing.assert_allclose(fd_starossek['c_aa']['values'], expected['c_aa']['values'], rtol=1e-12)
+        self.assertEqual(len(fd_starossek['c_pp']['values']), 0)
+
+    def test_partial_data(self):
+
+        # Blocks without data give empty base derivatives
+        fd_starossek = ntt.base2notation(self.fd_base, 'starossek')
+        del fd_starossek['c_hh']
+        fd_base = ntt.notation2base(fd_starossek, 'starossek')
+        self.assertEqual(len(fd_base['l3']['values']), 0)
+        np.testing.assert_allclose(fd_base['m5']['values'], self.fd_base['m5']['values'], rtol=1e-12)
+
+        # Each block can have its own Ured values
+        fd_classic = ntt.base2notation(self.fd_base, 'classic')
+        fd_classic['H1']['Ured'] = fd_classic['H1']['Ured'] + 1
+        fd_base = ntt.notation2base(fd_classic, 'classic')
+        np.testing.assert_array_equal(fd_base['l3']['Ured'], self.Ureds + 1)
+
+    def test_standard_deviations(self):
+
+        # Propagated only when given. The starossek derivatives have one base
+        # derivative in each part, so the round trips recover them exactly.
+        self.assertNotIn('std', ntt.base2notation(self.fd_base, 'starossek')['c_hh'])
+        for index, deriv_data in enumerate(self.fd_base.values()):
+            deriv_data['std'] = np.full(len(self.Ureds), 0.01*(index + 1))
+
+        fd_starossek = ntt.base2notation(self.fd_base, 'starossek')
+        l3_std, l4_std = self.fd_base['l3']['std'], self.fd_base['l4']['std']
+        expected = self.Ureds/np.pi**2 * ((self.Ureds/2/np.pi)*l4_std + 1j*l3_std)
+        np.testing.assert_allclose(fd_starossek['c_hh']['std'], expected)
+
+        fd_scanlan = ntt.notation2notation(fd_starossek, 'starossek', 'scanlan')
+        for fd_data, name in [(fd_starossek, 'starossek'), (fd_scanlan, 'scanlan')]:
+            fd_base = ntt.notation2base(fd_data, name)
+            for deriv, deriv_data in self.fd_base.items():
+                np.testing.assert_allclose(fd_base[deriv]['std'], deriv_data['std'], rtol=1e-12)
+
+    def test_incomplete_block_raises(self):
+
+        # Two derivatives combining the same base derivatives
+        notation = ntt.Notation('test', {'X': [('l3', 0, 1.0), ('l4', 1, 1.0)],
+            'Y': [('l3', 0, 1.0), ('l4', 1, -1.0)]})
+        fd_test = notation.convert(self.fd_base)
+        fd_base = notation.deconvert(fd_test)
+        np.testing.assert_allclose(fd_base['l4']['values'], self.fd_base['l4']['values'], rtol=1e-12)
+
+        del fd_test['Y']
+        with self.assertRaises(Exception):
+            notation.deconvert(fd_test)
+
+
+class TestRealComplex(unittest.TestCase):
+
+    def test_round_trip(self):
+
+        from flutterpy.derivatives import complex2real_notation, real2complex_notation
+
+        k = np.array([0.5, np.pi/10])
+        fd_complex = {'c_aa': {'values': np.array([2.4-0.36j, 1.1+0.2j]), 'k': k},
+            'c_ah': {'values': np.array([0.0071+1.2j, -0.3+0.5j]), 'k': k},
+            'c_ha': {'values': np.array([-3.6-0.45j, 0.7-0.1j]), 'k': k},
+            'c_hh': {'values': np.array([0.063-1.6j, 2.0+0.4j]), 'k': k}}
+
+        fd_back = real2complex_notation(complex2real_notation(fd_complex))
+        for deriv, deriv_data in fd_complex.items():
+            np.testing.assert_allclose(fd_back[deriv]['values'], deriv_data['values'], rtol=1e-12)
+            np.testing.assert_allclose(fd_back[deriv]['k'], k, rtol=1e-12)
+
+
+class TestNotationTables(unittest.TestCase):
+
+    def test_tables_match_definition(self):
+
+        # The precomputed tables must be regenerated if the definitions change
+        from flutterpy.derivatives.notations._notation_tables import notation_tables
+        self.assertEqual(ntt.build_notation_tables(), notation_tables)
+
+    def test_same_result_as_symbolic_relations(self):
+
+        import sympy as sym
+
+        Ureds = np.linspace(1, 20, 5)
+        fd_base = build_base_set(Ureds)
+        for name, notation in ntt.available_notations.items():
+            fd_out = notation.convert(fd_base)
+            for deriv, formula in notation.relations.items():
+                for index, Ured in enumerate(Ureds):
+                    substitutions = {sym.Symbol(base): fd_base[base]['values'][index] for base in fd_base}
+                    substitutions[sym.Symbol('Ured')] = Ured
+                    expected = complex(formula.subs(substitutions).evalf())
+                    self.assertAlmostEqual(complex(fd_out[deriv]['values'][index]), expected, places=10)
+
+    def test_import_without_heavy_dependencies(self):
+
+        code = 'import sys, flutterpy.derivatives; print(sorted(m for m in ("sympy", "scipy") if m in sys.modules))'
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), '[]')
+
+
+if __name__ == '__main__':
+    unittest.main()
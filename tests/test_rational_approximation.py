@@ -0,0 +1,65 @@
+import unittest
+import numpy as np
+from flutterpy.derivatives import FlutterDerivatives, RationalApproximation, fit_rational_approximation
+from flutterpy.derivatives.aerodynamic_matrices import derivative_matrices
+import flutterpy.derivatives.notations.notation as ntt
+
+
+class TestRationalApproximation(unittest.TestCase):
+
+    def setUp(self):
+        self.B = 0.4
+        rng = np.random.default_rng(0)
+        self.exact = RationalApproximation(rng.standard_normal((5, 3, 3)), [0.3, 1.2], self.B)
+        self.Ured = np.linspace(2, 20, 15)
+        values = self.exact.get_derivatives(self.Ured)
+        self.fd_data = {deriv: {'values': value, 'Ured': self.Ured} for deriv, value in values.items()}
+
+    def test_fit(self):
+
+        # Same scaling as derivative_matrices
+        velocity, displacement = derivative_matrices({deriv: data['values'] for deriv, data in self.fd_data.items()}, self.B)
+        K = 2*np.pi/self.Ured
+        np.testing.assert_allclose(self.exact.evaluate(K), displacement + 1j*K[:,np.newaxis,np.newaxis]*velocity, atol=1e-12)
+
+        # Exact with the right lags, in any notation
+        approximation = fit_rational_approximation(self.fd_data, self.B, lags=[0.3, 1.2])
+        np.testing.assert_allclose(approximation.matrices, self.exact.matrices, atol=1e-10)
+        fd_scanlan = ntt.base2notation(self.fd_data, 'scanlan')
+        approximation = fit_rational_approximation(fd_scanlan, self.B, lags=[0.3, 1.2], notation='scanlan')
+        np.testing.assert_allclose(approximation.matrices, self.exact.matrices, atol=1e-10)
+
+        # Without the acceleration term and with only some derivatives
+        fd = FlutterDerivatives()
+        fd.reset_from_dictionary({deriv: self.fd_data[deriv] for deriv in ('l3', 'l4', 'm5', 'm6')})
+        approximation = fd.get_rational_approximation(B=self.B, n_lags=1, acceleration_term=False)
+        self.assertEqual(approximation.n_lags, 1)
+        np.testing.assert_array_equal(approximation.matrices[2], 0)
+        np.testing.assert_array_equal(approximation.matrices[:,2], 0)
+        self.assertEqual(approximation.matrices[0,0,1], 0)
+        with self.assertRaises(Exception):
+            fd.get_rational_approximation()
+
+    def test_simulation(self):
+
+        # Harmonic motions of a batch of sections: in the steady state the
+        # forces are 0.5*dens*U^2*Q(i*K)*x
+        U, fluid_dens, Ured = 10.0, 1.2, 8.0
+        K = 2*np.pi/Ured
+        omega = K*U/self.B
+        delta_t = 2*np.pi/omega/200
+        time = np.arange(3000)*delta_t
+        amplitudes = np.random.default_rng(1).standard_normal((20, 3))
+        displacement = np.sin(omega*time)[:,np.newaxis,np.newaxis]*amplitudes
+        velocity = omega*np.cos(omega*time)[:,np.newaxis,np.newaxis]*amplitudes
+
+        forces, states = self.exact.simulate(displacement, U, delta_t, fluid_dens, velocity=velocity,
+            acceleration=-omega**2*displacement)
+        self.assertEqual(states.shape, (20, 2, 3))
+        expected = 0.5*fluid_dens*U**2*np.imag(np.exp(1j*omega*time)[:,np.newaxis,np.newaxis]
+            * (amplitudes @ self.exact.evaluate(K).T))
+        np.testing.assert_allclose(forces[-200:], expected[-200:], atol=1e-4*np.abs(expected).max())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,228 @@
+
+import unittest
+import numpy as np
+from scipy.optimize import curve_fit
+import flutterpy.derivatives.sinusoidal_utilities as util
+
+
+class TestLinearSinusoidalFit(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.omega = 2*np.pi*1.3
+        self.time = np.arange(4000)*0.005
+        self.noise = 0.05*rng.standard_normal(len(self.time))
+
+    def test_phase(self):
+
+        y = 2.5*np.sin(self.omega*self.time + 0.7) + self.noise
+        params, cov, residual_norm = util.linear_sinusoidal_fit(self.time, y, self.omega)
+
+        np.testing.assert_allclose(params, [2.5, 0.7], atol=1e-2)
+        self.assertEqual(cov.shape, (2,2))
+        np.testing.assert_allclose(residual_norm, np.linalg.norm(self.noise), rtol=1e-2)
+
+        # Same result as the nonlinear fit it replaces
+        def custom_func(t, A, phi):
+            return A*np.sin(self.omega*t+phi)
+        params_ref, cov_ref = curve_fit(custom_func, self.time, y, p0=params)
+        np.testing.assert_allclose(params, params_ref, rtol=1e-6)
+        np.testing.assert_allclose(cov, cov_ref, rtol=1e-4, atol=1e-12)
+
+    def test_sin_cos(self):
+
+        y = 0.3 - 1.2*np.cos(self.omega*self.time) + 0.8*np.sin(self.omega*self.time) + self.noise
+        params = util.extract_sinusoidal_parameters(self.time, y, omega=self.omega, function='sin_cos')
+
+        np.testing.assert_allclose(params, [0.3, -1.2, 0.8], atol=1e-2)
+
+    def test_unknown_function(self):
+
+        with self.assertRaises(Exception):
+            util.linear_sinusoidal_fit(self.time, self.noise, self.omega, function='cosine')
+
+
+class TestSinusoidalStatistics(unittest.TestCase):
+
+    def test_chunked_matches_direct_fit(self):
+
+        rng = np.random.default_rng(1)
+        omega, delta_t = 2*np.pi*0.7, 0.01
+        time = np.arange(10007)*delta_t
+        motion = 1.5*np.sin(omega*time - 2.0) + 0.01*rng.standard_normal(len(time))
+        force = 0.4 + 3*np.cos(omega*time) - np.sin(omega*time) + 0.1*rng.standard_normal(len(time))
+
+        statistics = util.sinusoidal_statistics([motion, force], delta_t, omega, chunk_size=1000)
+        self.assertEqual(statistics.n_samples, len(time))
+
+        for series, y, function in [(0, motion, 'phase'), (1, force, 'sin_cos')]:
+            params, cov, residual_norm = statistics.solve(series, function=function)
+            params_ref, cov_ref, residual_norm_ref = util.linear_sinusoidal_fit(time, y, omega, function=function)
+            np.testing.assert_allclose(params, params_ref, rtol=1e-9)
+            np.testing.assert_allclose(cov, cov_ref, rtol=1e-6, atol=1e-14)
+            np.testing.assert_allclose(residual_norm, residual_norm_ref, rtol=1e-6)
+
+    def test_multiple_harmonics(self):
+
+        # Two harmonics with close frequencies, separated by the joint fit
+        omegas, delta_t = 2*np.pi*np.array([0.7, 0.9]), 0.01
+        time = np.arange(5000)*delta_t
+        y = 0.4 + 3*np.cos(omegas[0]*time) - np.sin(omegas[0]*time) + 2*np.sin(omegas[1]*time + 0.5)
+
+        statistics = util.sinusoidal_statistics([y], delta_t, omegas, chunk_size=1000)
+        np.testing.assert_allclose(statistics.solve(0, 'sin_cos', harmonic=0)[0], [0.4, 3, -1], atol=1e-9)
+        np.testing.assert_allclose(statistics.solve(0, 'sin_cos', harmonic=1)[0],
+            [0.4, 2*np.sin(0.5), 2*np.cos(0.5)], atol=1e-9)
+        self.assertLess(statistics.solve(0, 'sin_cos')[2], 1e-8)
+
+
+class TestFrequencyEstimation(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.time = np.arange(3000)*0.01
+        self.noise = 0.1*rng.standard_normal(len(self.time))
+
+    def test_sub_bin_accuracy(self):
+
+        # Frequency between bins and a large mean value
+        y = 5 + np.sin(2*np.pi*0.7771*self.time + 0.4) + self.noise
+
+        frequency = util.estimate_frequency(self.time, y)
+        self.assertAlmostEqual(frequency, 0.7771, delta=1e-4)
+
+        # Same frequency as the nonlinear least-squares fit
+        params, _ = curve_fit(util.sin_cos_func, self.time, y, p0=[5, 0, 1, 2*np.pi*frequency])
+        self.assertAlmostEqual(frequency, params[-1]/2/np.pi, delta=1e-5)
+
+        for zero_padding, interpolation in [(1, 'jacobsen'), (4, 'parabolic')]:
+            frequency = util.estimate_frequency(self.time, y, zero_padding=zero_padding,
+                interpolation=interpolation, refine=False)
+            self.assertAlmostEqual(frequency, 0.7771, delta=1e-3)
+
+    def test_band(self):
+
+        y = 2*np.sin(2*np.pi*0.5*self.time) + np.sin(2*np.pi*3.1*self.time) + self.noise
+
+        self.assertAlmostEqual(util.GuessFrequency(self.time, y), 0.5, delta=1e-3)
+        self.assertAlmostEqual(util.estimate_frequency(self.time, y, band=(2, 4)), 3.1, delta=1e-3)
+
+    def test_free_omega_fit(self):
+
+        y = 1.5*np.sin(2*np.pi*1.234*self.time + 0.2) + self.noise
+        ampl, phi, omega = util.extract_sinusoidal_parameters(self.time, y)
+
+        np.testing.assert_allclose([ampl, phi, omega], [1.5, 0.2, 2*np.pi*1.234], rtol=1e-2)
+
+        # Fit information instead of printed output
+        info = {}
+        params = util.extract_sinusoidal_parameters(self.time, y, refine_omega=True, info=info)
+        self.assertEqual(info['n_samples'], len(y))
+        self.assertGreater(info['nfev'], 0)
+        self.assertEqual(info['omega'], params[-1])
+        self.assertAlmostEqual(info['omega_guess'], params[-1], delta=1e-2)
+        self.assertLess(info['residual_norm'], 0.2*np.sqrt(len(y)))
+
+    def test_goertzel(self):
+
+        frequency, time_step = 1.37, 0.01
+        exponential = np.exp(-2j*np.pi*frequency*self.time)
+        np.testing.assert_allclose(util.goertzel(self.noise, frequency, time_step),
+            self.noise @ exponential, rtol=1e-9)
+
+
+
+class TestPreprocessing(unittest.TestCase):
+
+    def setUp(self):
+        # 2000 samples per cycle and a decaying start-up transient
+        self.omega = 2*np.pi*2.0
+        self.delta_t = 1/4000
+        self.time = np.arange(60000)*self.delta_t
+        self.motion = 0.1*np.sin(self.omega*self.time + 0.3)
+        self.force = (0.5 + 2*np.cos(self.omega*self.time) + 1.2*np.sin(self.omega*self.time)
+            + 3*np.exp(-self.time/1.0)*(1 + np.sin(2.7*self.omega*self.time)))
+
+    def test_cycle_coefficients(self):
+
+        coeffs, boundaries = util.cycle_coefficients(self.motion, self.delta_t, self.omega)
+        self.assertEqual(len(coeffs), 30)
+        np.testing.assert_array_equal(boundaries[:3], [0, 2000, 4000])
+        np.testing.assert_allclose(coeffs[:,1:], [[0.1*np.sin(0.3), 0.1*np.cos(0.3)]]*30, atol=1e-12)
+
+        # Read in chunks (of less than a cycle too)
+        for chunk_size in [4500, 1000]:
+            chunk_coeffs, chunk_boundaries = util.cycle_coefficients(self.force, self.delta_t, self.omega,
+                chunk_size=chunk_size)
+            np.testing.assert_allclose(chunk_coeffs, util.cycle_coefficients(self.force, self.delta_t,
+                self.omega)[0], rtol=1e-9, atol=1e-12)
+            np.testing.assert_array_equal(chunk_boundaries, boundaries)
+
+    def test_steady_state(self):
+
+        self.assertEqual(util.detect_steady_state(self.motion, self.delta_t, self.omega), 0)
+        start = util.detect_steady_state(self.force, self.delta_t, self.omega, tolerance=1e-3)
+        self.assertEqual(start % 2000, 0)
+        self.assertGreater(start, 0)
+        self.assertLess(3*np.exp(-self.time[start]), 5e-3*np.hypot(2, 1.2))
+
+        # Never settles
+        self.assertIsNone(util.detect_steady_state(self.force[:16000], self.delta_t, self.omega))
+
+    def test_steady_state_several_frequencies(self):
+
+        # Two motions (1:1.4) and a force with both harmonics and a transient.
+        # The harmonics are fitted jointly on each cycle of the slowest one.
+        omegas = [self.omega, 1.4*self.omega]
+        motion = 0.1*np.sin(omegas[0]*self.time + 0.3) + 0.05*np.sin(omegas[1]*self.time)
+        force = (self.force + 0.8*np.cos(omegas[1]*self.time) - 0.6*np.sin(omegas[1]*self.time))
+        coeffs, _ = util.cycle_coefficients(motion, self.delta_t, omegas)
+        np.testing.assert_allclose(coeffs[:,1:], [[0.1*np.sin(0.3), 0.1*np.cos(0.3), 0, 0.05]]*30, atol=1e-12)
+
+        series, delta_t, info = util.preprocess_periodic_series([motion, force], self.delta_t, omegas,
+            samples_per_cycle=25)
+        self.assertTrue(info['settled'])
+        self.assertEqual(info['first_sample'], util.detect_steady_state(force, self.delta_t, omegas))
+        self.assertGreater(info['first_sample'], 0)
+        self.assertEqual(info['first_sample'] % 2000, 0)
+
+        # Transient removed from the decimated force (the amplitudes do not
+        # depend on the time origin of the trimmed series)
+        statistics = util.SinusoidalStatistics(omegas, delta_t)
+        statistics.update(series[1][np.newaxis])
+        for harmonic, amplitude in enumerate([np.hypot(2, 1.2), 1.0]):
+            coeffs, _, _ = statistics.solve(function='sin_cos', harmonic=harmonic)
+            self.assertAlmostEqual(coeffs[0], 0.5, delta=5e-3)
+            self.assertAlmostEqual(np.hypot(coeffs[1], coeffs[2]), amplitude, delta=5e-3)
+
+    def test_trim_and_decimate(self):
+
+        series, delta_t, info = util.preprocess_periodic_series([self.motion, self.force], self.delta_t,
+            self.omega, samples_per_cycle=25)
+        self.assertEqual(info['factor'], 80)
+        self.assertAlmostEqual(delta_t, 0.02)
+        self.assertEqual((info['last_sample'] - info['first_sample']) % 2000, 0)
+        self.assertEqual(len(series[0]), info['n_cycles']*25)
+
+        # Fits on the decimated series: transient removed, exact harmonic
+        time = np.arange(len(series[1]))*delta_t
+        coeffs, _, _ = util.linear_sinusoidal_fit(time, series[1], self.omega, function='sin_cos')
+        np.testing.assert_allclose(coeffs, [0.5, 2, 1.2], atol=5e-3)
+        params, _, _ = util.linear_sinusoidal_fit(time, series[0], self.omega)
+        np.testing.assert_allclose(params, [0.1, 0.3], rtol=1e-5)
+
+        # Same filter as scipy's resample_poly, also when read in chunks
+        from scipy.signal import resample_poly
+        first, last = info['first_sample'], info['last_sample']
+        for chunk_size in [2**16, 1234, 50]:
+            chunk_series, _, _ = util.preprocess_periodic_series([self.force], self.delta_t, self.omega,
+                samples_per_cycle=25, chunk_size=chunk_size)
+            np.testing.assert_allclose(chunk_series[0], resample_poly(self.force[first:last], 1, 80,
+                window=('kaiser', 10.0), padtype='wrap'), rtol=1e-10, atol=1e-12)
+
+        with self.assertWarns(UserWarning):
+            util.preprocess_periodic_series([self.force[:16000]], self.delta_t, self.omega)
+
+
+if __name__ == '__main__':
+    unittest.main()